@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Any, Dict
 
@@ -5,3 +6,8 @@ class BaseAgent(ABC):
     @abstractmethod
     def run(self, input_data: Any) -> Dict[str, Any]:
         pass
+
+    async def arun(self, input_data: Any) -> Dict[str, Any]:
+        # Default async path: run the sync implementation in a worker thread.
+        # Agents that wait on I/O (LLM calls) override this with native coroutines.
+        return await asyncio.to_thread(self.run, input_data)
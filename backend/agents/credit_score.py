@@ -1,63 +1,88 @@
+from typing import Any, Dict, List
+
 from .base_agent import BaseAgent
 from ..models import CreditScoreInput, CreditScoreOutput
 
+# Outcome codes: 0-3 from the probability model, 4-7 from a reported CIBIL score
+OUTCOMES = [
+    {"score_band": "Excellent", "approval_probability": None, "predicted_impact": "Minimal Impact"},
+    {"score_band": "Good", "approval_probability": None, "predicted_impact": "Low Impact"},
+    {"score_band": "Fair", "approval_probability": None, "predicted_impact": "Moderate Drop"},
+    {"score_band": "Poor", "approval_probability": None, "predicted_impact": "Severe Drop"},
+    {"score_band": "Excellent", "approval_probability": 0.95, "predicted_impact": "None"},
+    {"score_band": "Good", "approval_probability": 0.85, "predicted_impact": "Low Impact"},
+    {"score_band": "Fair", "approval_probability": 0.60, "predicted_impact": "Moderate Impact"},
+    {"score_band": "Poor", "approval_probability": 0.20, "predicted_impact": "Severe Impact"},
+]
+
+# Probability model, shared by run() and run_batch: base probability, penalized by bad behavior
+BASE_PROBABILITY = 0.95
+MISSED_PAYMENT_PENALTY = 0.20 # 1 missed payment takes it down to ~0.75 immediately
+UTILIZATION_LIMIT = 0.3 # Util > 30% is standard warning
+UTILIZATION_PENALTY = 0.5 # 80% util -> 0.5 * 0.5 = 0.25 penalty
+SHORT_HISTORY_YEARS, SHORT_HISTORY_PENALTY = 2, 0.1
+LONG_HISTORY_YEARS, LONG_HISTORY_BONUS = 5, 0.05
+MANY_ACTIVE_LOANS, MANY_LOANS_PENALTY = 3, 0.05
+PROBABILITY_RANGE = (0.1, 0.99)
+# (probability above, outcome); else 3 (Poor)
+PROBABILITY_BANDS = [(0.8, 0), (0.6, 1), (0.4, 2)]
+# A reported CIBIL score above CIBIL_MIN overrides the model: (score at least, outcome); else 7 (Poor)
+CIBIL_MIN = 300
+CIBIL_BANDS = [(750, 4), (700, 5), (650, 6)]
+
 class CreditScoreAgent(BaseAgent):
     def run(self, input_data: CreditScoreInput) -> CreditScoreOutput:
+        # Plain arithmetic: a single applicant shouldn't pay for importing numpy (run_batch mirrors these rules)
         # 0. Override if CIBIL provided
-        if input_data.cibil_score and input_data.cibil_score > 300:
-            cibil = input_data.cibil_score
-            if cibil >= 750:
-                 return CreditScoreOutput(score_band="Excellent", approval_probability=0.95, predicted_impact="None")
-            elif cibil >= 700:
-                 return CreditScoreOutput(score_band="Good", approval_probability=0.85, predicted_impact="Low Impact")
-            elif cibil >= 650:
-                 return CreditScoreOutput(score_band="Fair", approval_probability=0.60, predicted_impact="Moderate Impact")
-            else:
-                 return CreditScoreOutput(score_band="Poor", approval_probability=0.20, predicted_impact="Severe Impact")
-
-        # Base Probability starts high, penalized by bad behavior
-        prob = 0.95
-        
+        if input_data.cibil_score and input_data.cibil_score > CIBIL_MIN:
+            outcome = next((o for minimum, o in CIBIL_BANDS if input_data.cibil_score >= minimum), 7)
+            return CreditScoreOutput(**OUTCOMES[outcome])
+
+        prob = BASE_PROBABILITY
+
         # 1. Missed Payments (Heavy Penalty)
-        # 1 missed payment takes it down to ~0.75 immediately. 
-        prob -= (input_data.missed_payments * 0.20)
-        
+        prob -= (input_data.missed_payments * MISSED_PAYMENT_PENALTY)
+
         # 2. Credit Utilization (Moderate Penalty)
-        # Util > 30% is standard warning. 
-        if input_data.credit_utilization_ratio > 0.3:
-            excess_util = input_data.credit_utilization_ratio - 0.3
-            prob -= (excess_util * 0.5) # If 80% util -> 0.5 * 0.5 = 0.25 penalty
-            
-        # 3. Credit Age (Bonus/Penalty)
-        # Short history (< 2 years) is risky? Maybe just smaller penalty.
-        if input_data.credit_age_years < 2:
-            prob -= 0.1
-        elif input_data.credit_age_years > 5:
-            prob += 0.05
-            
+        if input_data.credit_utilization_ratio > UTILIZATION_LIMIT:
+            prob -= (input_data.credit_utilization_ratio - UTILIZATION_LIMIT) * UTILIZATION_PENALTY
+
+        # 3. Credit Age (Bonus/Penalty): short history is risky
+        if input_data.credit_age_years < SHORT_HISTORY_YEARS:
+            prob -= SHORT_HISTORY_PENALTY
+        elif input_data.credit_age_years > LONG_HISTORY_YEARS:
+            prob += LONG_HISTORY_BONUS
+
         # 4. Active Loans
-        if input_data.active_loans > 3:
-            prob -= 0.05
-            
-        # Clamp 0.1 to 0.99
-        final_prob = max(0.1, min(0.99, prob))
-        
-        # Determine Band based on 'virtual' score logic or just map probability
-        if final_prob > 0.8:
-            score_band = "Excellent"
-            impact = "Minimal Impact"
-        elif final_prob > 0.6:
-            score_band = "Good"
-            impact = "Low Impact"
-        elif final_prob > 0.4:
-            score_band = "Fair"
-            impact = "Moderate Drop"
-        else:
-            score_band = "Poor"
-            impact = "Severe Drop"
-
-        return CreditScoreOutput(
-            score_band=score_band,
-            approval_probability=round(final_prob, 2),
-            predicted_impact=impact
-        )
+        if input_data.active_loans > MANY_ACTIVE_LOANS:
+            prob -= MANY_LOANS_PENALTY
+
+        final_prob = max(PROBABILITY_RANGE[0], min(PROBABILITY_RANGE[1], prob))
+
+        # Determine Band by mapping the probability
+        outcome = next((o for floor, o in PROBABILITY_BANDS if final_prob > floor), 3)
+        return CreditScoreOutput(**{**OUTCOMES[outcome], "approval_probability": round(final_prob, 2)})
+
+    def run_batch(self, columns: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """run() over columns of validated inputs (see utils.batch); one dict per row."""
+        import numpy as np
+
+        prob = BASE_PROBABILITY - columns["missed_payments"] * MISSED_PAYMENT_PENALTY
+        utilization = columns["credit_utilization_ratio"]
+        prob = np.where(utilization > UTILIZATION_LIMIT, prob - (utilization - UTILIZATION_LIMIT) * UTILIZATION_PENALTY, prob)
+        age = columns["credit_age_years"]
+        prob = np.where(age < SHORT_HISTORY_YEARS, prob - SHORT_HISTORY_PENALTY,
+                        np.where(age > LONG_HISTORY_YEARS, prob + LONG_HISTORY_BONUS, prob))
+        prob = np.where(columns["active_loans"] > MANY_ACTIVE_LOANS, prob - MANY_LOANS_PENALTY, prob)
+        final_prob = np.clip(prob, *PROBABILITY_RANGE)
+
+        modelled = np.select([final_prob > floor for floor, _ in PROBABILITY_BANDS], [o for _, o in PROBABILITY_BANDS], 3)
+        # NaN: no CIBIL score reported
+        cibil = columns["cibil_score"]
+        reported = np.select([cibil >= minimum for minimum, _ in CIBIL_BANDS], [o for _, o in CIBIL_BANDS], 7)
+        outcome = np.where(cibil > CIBIL_MIN, reported, modelled)
+
+        return [
+            dict(OUTCOMES[o]) if o >= 4 else {**OUTCOMES[o], "approval_probability": round(p, 2)}
+            for o, p in zip(outcome.tolist(), final_prob.tolist())
+        ]
@@ -26,8 +26,8 @@ class DebtConsolidationAgent(BaseAgent):
         current_total_emi = sum(d.monthly_payment for d in input_data.existing_debts)
         
         # Calculate New EMI (P * r * (1+r)^n) / ((1+r)^n - 1)
-        # Rate per month
-        r = input_data.new_loan_interest_rate / (12 * 100)
+        from ..utils import amortization
+
         n = input_data.new_loan_tenure_months
         P = input_data.new_loan_amount # Assuming we borrow enough to cover debts
         
@@ -37,10 +37,7 @@ class DebtConsolidationAgent(BaseAgent):
             # For MVP, assume P ~= Total Debt for consolidation analysis
             pass
 
-        if r > 0:
-            new_emi = (P * r * ((1 + r) ** n)) / (((1 + r) ** n) - 1)
-        else:
-            new_emi = P / n
+        new_emi = float(amortization.emi(P, input_data.new_loan_interest_rate, n))
 
         if current_total_emi == 0:
             # Fallback: If user didn't provide current EMI, likely they just want rate comparison.
@@ -1,24 +1,97 @@
 from .base_agent import BaseAgent
 from ..models import DecisionSynthesisInput, DecisionSynthesisOutput
-from typing import Dict, Any
+from ..utils.metrics import metrics
+from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import asyncio
+import os
+
+# Latency budget for the Gemini verdict. Past it, the user gets the deterministic verdict right away.
+LLM_BUDGET_S = float(os.getenv("DECISION_LLM_BUDGET_S", "8"))
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="decision")
+
+# Deterministic fallback score, shared by the per-request fallback and fallback_batch
+STABILITY_WEIGHT = 1.0 # Increased from 0.8
+BURDEN_WEIGHT = 0.8
+CREDIT_IMPACT = {"Excellent": 20, "Good": 10, "Fair": -15, "Poor": -40}
+NECESSITY_IMPACT = {"High": 10, "Medium": 0, "Low": -10}
+UNFAIR_MARKET_IMPACT = -20
+BURDEN_CAP = (80, 35) # Burden > 80 (loan basically unaffordable): score at most 35
+STABILITY_CAP = (20, 30) # Stability < 20 ('Broken'): score at most 30
+# Verdict Thresholds (More Conservative): (minimum score, verdict, confidence), first match wins
+VERDICT_BANDS = [(85, "Safe", 0.95), (65, "Safe", 0.85), (45, "Risky", 0.80)]
+DEFAULT_VERDICT = ("Dangerous", 0.90)
 
 class DecisionSynthesisAgent(BaseAgent):
     def __init__(self):
-        from ..utils.llm_client import LLMClient
-        self.llm = LLMClient()
+        from ..utils.llm_client import get_llm_client, breaker
+        self.llm = get_llm_client()
+        self.breaker = breaker
+        self.budget_s = LLM_BUDGET_S
         
     def run(self, input_data: DecisionSynthesisInput) -> DecisionSynthesisOutput:
+        decided = self._short_circuit(input_data)
+        if decided is not None:
+            return decided
+
+        if not self.breaker.allow():
+            return self._fallback(input_data, "breaker_open")
+
         # Context Construction
         context = input_data.dict() # Pydantic helper
         
         # Call LLM
-        llm_result = self.llm.generate_verdict_json(context)
-        
+        future = _executor.submit(self.llm.generate_verdict_json, context, self.budget_s)
+        try:
+            llm_result = future.result(timeout=self.budget_s)
+        except FutureTimeout:
+            self.breaker.record_failure()
+            return self._fallback(input_data, "timeout")
+        except BaseException:
+            # Every allowed call must report back, or a half-open trial would hold the breaker open for good
+            self.breaker.record_failure()
+            raise
+        return self._to_output(input_data, llm_result)
+
+    async def arun(self, input_data: DecisionSynthesisInput) -> DecisionSynthesisOutput:
+        decided = self._short_circuit(input_data)
+        if decided is not None:
+            return decided
+
+        if not self.breaker.allow():
+            return self._fallback(input_data, "breaker_open")
+
+        try:
+            llm_result = await asyncio.wait_for(
+                self.llm.agenerate_verdict_json(input_data.dict(), self.budget_s),
+                self.budget_s
+            )
+        except asyncio.TimeoutError:
+            self.breaker.record_failure()
+            return self._fallback(input_data, "timeout")
+        except asyncio.CancelledError:
+            # The caller went away (disconnect, a failed sibling stage); that says nothing about Gemini
+            self.breaker.release()
+            raise
+        except BaseException:
+            self.breaker.record_failure()
+            raise
+        return self._to_output(input_data, llm_result)
+
+    def _to_output(self, input_data: DecisionSynthesisInput, llm_result: Dict[str, Any]) -> DecisionSynthesisOutput:
         # Check if LLM return valid data (it returns a fallback dict if it fails/no key)
         # If explanation is "AI Analysis Failed...", we use our robust manual logic.
-        if "AI Analysis Failed" in llm_result.get("explanation", "") or "Mock decision" in llm_result.get("explanation", ""):
-             return self._fallback_logic(input_data)
-             
+        explanation = llm_result.get("explanation", "")
+        if "Mock decision" in explanation:
+             self.breaker.record_success() # No key configured; nothing wrong upstream
+             return self._fallback(input_data, "no_key")
+        if "AI Analysis Failed" in explanation:
+             self.breaker.record_failure()
+             return self._fallback(input_data, "error")
+
+        self.breaker.record_success()
+        metrics.incr("decision.source.llm")
         # Map to Output
         return DecisionSynthesisOutput(
             verdict=llm_result.get("verdict", "Risky"),
@@ -26,62 +99,106 @@ class DecisionSynthesisAgent(BaseAgent):
             explanation=llm_result.get("explanation", "No explanation provided."),
             score=llm_result.get("score", 50),
             suggestions=llm_result.get("suggestions", []),
-            financial_tips=llm_result.get("financial_tips", [])
+            financial_tips=llm_result.get("financial_tips", []),
+            source="llm"
         )
 
+    def _fallback(self, input_data: DecisionSynthesisInput, reason: str) -> DecisionSynthesisOutput:
+        metrics.incr("decision.source.fallback")
+        metrics.incr(f"decision.fallback.{reason}")
+        return self._fallback_logic(input_data)
+
     def _fallback_logic(self, input_data: DecisionSynthesisInput) -> DecisionSynthesisOutput:
         print("Fallback logic triggered.")
+        final_score = self._fallback_score(input_data)
+        verdict, confidence = self._verdict_for_score(final_score)
+        expl = self._explain(verdict, input_data.financial_stability_score, input_data.loan_burden_score)
+
+        return DecisionSynthesisOutput(
+            verdict=verdict,
+            confidence=confidence,
+            explanation=expl,
+            score=round(final_score, 1),
+            suggestions=[],
+            financial_tips=["(Fallback) Secure API connection for personalized tips."],
+            source="fallback"
+        )
+
+    @staticmethod
+    def _fallback_score(input_data: DecisionSynthesisInput) -> float:
+        # Plain Python, so a fallback verdict doesn't import numpy; _score_batch applies the same tables to arrays
         stability = input_data.financial_stability_score
         burden = input_data.loan_burden_score
-        necessity_level = input_data.loan_necessity_level 
-        credit_band = input_data.credit_score_band
-        market_fair = input_data.market_is_fair
-        
+
+        raw_score = (50 + (stability - 50) * STABILITY_WEIGHT + (50 - burden) * BURDEN_WEIGHT
+                     + CREDIT_IMPACT.get(input_data.credit_score_band, 0)
+                     + NECESSITY_IMPACT.get(input_data.loan_necessity_level, 0)
+                     + (0 if input_data.market_is_fair else UNFAIR_MARKET_IMPACT))
+        final_score = max(0, min(100, raw_score))
+
+        # Critical Overrides: an unaffordable loan or 'Broken' stability caps the score
+        if burden > BURDEN_CAP[0]:
+            final_score = min(final_score, BURDEN_CAP[1])
+        if stability < STABILITY_CAP[0]:
+            final_score = min(final_score, STABILITY_CAP[1])
+        return final_score
+
+    @staticmethod
+    def _score_batch(stability, burden, credit_band, necessity_level, market_fair):
+        """_fallback_score (unrounded) over arrays that broadcast together."""
+        import numpy as np
+
+        stability, burden = np.asarray(stability, dtype=float), np.asarray(burden, dtype=float)
+        credit_band, necessity_level = np.asarray(credit_band), np.asarray(necessity_level)
+
         # 1. Continuous Scoring Formula (Resurrected for Fallback)
         # Tuning: Make Burden and Stability dominant.
-        
-        stability_impact = (stability - 50) * 1.0 # Increased from 0.8
-        
+        stability_impact = (stability - 50) * STABILITY_WEIGHT
+
         # Burden Impact: 
         # If Burden is 80 (High), (50-80)*0.8 = -24. 
         # If Burden is 20 (Low), (50-20)*0.8 = +24.
-        burden_impact = (50 - burden) * 0.8 
-        
-        credit_map = {"Excellent": 20, "Good": 10, "Fair": -15, "Poor": -40}
-        credit_impact = credit_map.get(credit_band, 0)
-        
-        necessity_map = {"High": 10, "Medium": 0, "Low": -10}
-        necessity_impact = necessity_map.get(necessity_level, 0)
-        
-        market_impact = 0 if market_fair else -20
-        
+        burden_impact = (50 - burden) * BURDEN_WEIGHT
+
+        credit_impact = np.select([credit_band == band for band in CREDIT_IMPACT], list(CREDIT_IMPACT.values()), 0)
+        necessity_impact = np.select([necessity_level == level for level in NECESSITY_IMPACT], list(NECESSITY_IMPACT.values()), 0)
+        market_impact = np.where(np.asarray(market_fair, dtype=bool), 0, UNFAIR_MARKET_IMPACT)
+
         raw_score = 50 + stability_impact + burden_impact + credit_impact + necessity_impact + market_impact
-        final_score = max(0, min(100, raw_score)) 
-        
-        # Critical Override: If Burden is > 80 (Meaning loan is basically unaffordable), cap score at 40 (Dangerous/Risky)
-        if burden > 80:
-             final_score = min(final_score, 35)
+        final_score = np.clip(raw_score, 0, 100)
 
-        # Critical Override: If Stability is 'Broken' (<20), cap score.
-        if stability < 20:
-             final_score = min(final_score, 30)
-        
-        # Verdict Thresholds (More Conservative)
-        if final_score >= 85:
-            verdict = "Safe"
-            confidence = 0.95
-        elif final_score >= 65:
-            verdict = "Safe" 
-            confidence = 0.85
-        elif final_score >= 45:
-            verdict = "Risky"
-            confidence = 0.80
-        else:
-            verdict = "Dangerous"
-            confidence = 0.90
+        # Critical Overrides: an unaffordable loan or 'Broken' stability caps the score
+        final_score = np.where(burden > BURDEN_CAP[0], np.minimum(final_score, BURDEN_CAP[1]), final_score)
+        final_score = np.where(stability < STABILITY_CAP[0], np.minimum(final_score, STABILITY_CAP[1]), final_score)
+        return final_score
+
+    @staticmethod
+    def fallback_batch(stability, burden, credit_band, necessity_level, market_fair) -> Dict[str, Any]:
+        """
+        _fallback_score and _verdict_for_score over arrays that broadcast together
+        (for bulk scoring and what-if grids, where there's no LLM call to fall back
+        from). Returns arrays: score (rounded as in _fallback_logic), verdict and confidence.
+        """
+        import numpy as np
+
+        final_score = DecisionSynthesisAgent._score_batch(stability, burden, credit_band, necessity_level, market_fair)
+        reached = [final_score >= minimum for minimum, _, _ in VERDICT_BANDS]
+        return {
+            "score": np.round(final_score, 1),
+            "verdict": np.select(reached, [verdict for _, verdict, _ in VERDICT_BANDS], DEFAULT_VERDICT[0]),
+            "confidence": np.select(reached, [confidence for _, _, confidence in VERDICT_BANDS], DEFAULT_VERDICT[1]),
+        }
+
+    @staticmethod
+    def _verdict_for_score(final_score: float):
+        for minimum, verdict, confidence in VERDICT_BANDS:
+            if final_score >= minimum:
+                return verdict, confidence
+        return DEFAULT_VERDICT
 
+    @staticmethod
+    def _explain(verdict: str, s: float, b: float) -> str:
         # Manual Explanation Gen
-        s, b = stability, burden
         reasons = []
         if s > 75: reasons.append("strong financial health")
         elif s < 40: reasons.append("weak financial stability")
@@ -92,17 +209,78 @@ class DecisionSynthesisAgent(BaseAgent):
         reason_str = f" {joiner} ".join(reasons)
         
         if verdict == "Safe":
-            expl = f"This loan appears safe due to your {reason_str}. You have sufficient buffer."
+            return f"This loan appears safe due to your {reason_str}. You have sufficient buffer."
         elif verdict == "Risky":
-            expl = f"Proceed with caution. While manageable, this loan creates {reason_str}."
+            return f"Proceed with caution. While manageable, this loan creates {reason_str}."
         else:
-            expl = f"Not Recommended. The {reason_str} suggests a high risk of default or stress."
+            return f"Not Recommended. The {reason_str} suggests a high risk of default or stress."
+
+    # --- Rules-first short-circuit ---
+    # Mirrors the hard rules spelled out in LLMClient._verdict_prompt. When they
+    # settle the verdict on their own, the Gemini round trip adds nothing but latency.
+
+    @staticmethod
+    def _rules_verdict(input_data: DecisionSynthesisInput) -> Optional[Tuple[str, List[str]]]:
+        stability = input_data.financial_stability_score
+        burden = input_data.loan_burden_score
+        poor_credit = input_data.credit_score_band == "Poor"
+
+        triggers = []
+        if burden > 70: triggers.append("a loan repayment burden above 70/100")
+        if stability < 30: triggers.append("financial stability below 30/100")
+        if poor_credit: triggers.append("a poor credit history")
+        if triggers:
+            return "Dangerous", triggers
+
+        income = input_data.monthly_income or 0
+        oversized = income > 0 and (input_data.loan_amount or 0) > 5 * income
+        if stability > 70 and burden < 30 and input_data.market_is_fair and not oversized:
+            return "Safe", ["strong financial stability", "a light repayment burden"]
+
+        # Borderline, or other risk factors the model should weigh
+        return None
+
+    def _rules_output(self, input_data: DecisionSynthesisInput, verdict: str, reasons: List[str]) -> DecisionSynthesisOutput:
+        score = self._fallback_score(input_data)
+        # Keep the score inside the band the verdict implies
+        if verdict == "Dangerous":
+            score = min(score, 44)
+            explanation = f"Not Recommended. This loan is classified as high risk because of {' and '.join(reasons)}."
+        else:
+            score = max(score, 65)
+            explanation = f"This loan appears safe due to your {' combined with '.join(reasons)}. You have sufficient buffer."
+        _, confidence = self._verdict_for_score(score)
 
         return DecisionSynthesisOutput(
             verdict=verdict,
             confidence=confidence,
-            explanation=expl,
-            score=round(final_score, 1),
+            explanation=explanation,
+            score=round(score, 1),
             suggestions=[],
-            financial_tips=["(Fallback) Secure API connection for personalized tips."]
+            financial_tips=self._rules_tips(input_data, verdict),
+            source="rules"
         )
+
+    @staticmethod
+    def _rules_tips(input_data: DecisionSynthesisInput, verdict: str) -> List[str]:
+        if verdict == "Safe":
+            return ["Keep at least six months of expenses in your emergency fund before taking this loan.",
+                    "Use any bonus or surplus for part-prepayment to cut the total interest."]
+        tips = []
+        if input_data.loan_burden_score > 70:
+            tips.append("Borrow less or choose a longer tenure to bring the monthly EMI down.")
+        if input_data.financial_stability_score < 30:
+            tips.append("Cut discretionary spending and build an emergency fund before borrowing.")
+        if input_data.credit_score_band == "Poor":
+            tips.append("Pay every EMI and card bill on time for a few months to rebuild your credit score.")
+        return tips
+
+    def _short_circuit(self, input_data: DecisionSynthesisInput) -> Optional[DecisionSynthesisOutput]:
+        # The rule templates are English only; other languages need the model's translation
+        if input_data.detailed_explanation or input_data.language != "en":
+            return None
+        decided = self._rules_verdict(input_data)
+        if decided is None:
+            return None
+        metrics.incr("decision.source.rules")
+        return self._rules_output(input_data, *decided)
@@ -1,14 +1,80 @@
 from .base_agent import BaseAgent
 from ..models import DecisionSynthesisOutput, FinancialMentorOutput, FinancialMentorInput
-from typing import Dict, Any
+from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+import time
+
+# Each generation gets its own deadline; a slow one must not hold back the other
+EXPLANATION_TIMEOUT_S = float(os.getenv("MENTOR_EXPLANATION_TIMEOUT_S", "20"))
+SCRIPT_TIMEOUT_S = float(os.getenv("MENTOR_SCRIPT_TIMEOUT_S", "20"))
+
+# Small shared pool for the sync path (two generations per request)
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="mentor")
 
 class FinancialMentorAgent(BaseAgent):
     def __init__(self):
         # Lazy load LLM client to avoid circular imports or init issues
-        from ..utils.llm_client import LLMClient
-        self.llm = LLMClient()
+        from ..utils.llm_client import get_llm_client
+        self.llm = get_llm_client()
+        self.explanation_timeout = EXPLANATION_TIMEOUT_S
+        self.script_timeout = SCRIPT_TIMEOUT_S
 
     def run(self, input_data: FinancialMentorInput) -> FinancialMentorOutput:
+        context, script_context, advice_list = self._prepare(input_data)
+
+        # Generate Human-Readable Explanation/Advice and the script side by side
+        explanation_future = _executor.submit(self.llm.generate_explanation, context)
+        script_future = _executor.submit(self.llm.generate_negotiation_script, script_context)
+
+        # Both deadlines count from submission, the same as the async path
+        started = time.monotonic()
+        missing = []
+        llm_explanation = self._collect(explanation_future, started + self.explanation_timeout, "recovery_plan", missing)
+        negotiation_script = self._collect(script_future, started + self.script_timeout, "negotiation_script", missing)
+
+        return FinancialMentorOutput(
+            advice=advice_list,
+            recovery_plan=llm_explanation,
+            negotiation_script=negotiation_script,
+            missing_sections=missing
+        )
+
+    async def arun(self, input_data: FinancialMentorInput) -> FinancialMentorOutput:
+        context, script_context, advice_list = self._prepare(input_data)
+
+        llm_explanation, negotiation_script = await asyncio.gather(
+            asyncio.wait_for(self.llm.agenerate_explanation(context), self.explanation_timeout),
+            asyncio.wait_for(self.llm.agenerate_negotiation_script(script_context), self.script_timeout),
+            return_exceptions=True
+        )
+
+        missing = []
+        if isinstance(llm_explanation, BaseException):
+            missing.append("recovery_plan")
+            llm_explanation = ""
+        if isinstance(negotiation_script, BaseException):
+            missing.append("negotiation_script")
+            negotiation_script = ""
+
+        return FinancialMentorOutput(
+            advice=advice_list,
+            recovery_plan=llm_explanation,
+            negotiation_script=negotiation_script,
+            missing_sections=missing
+        )
+
+    @staticmethod
+    def _collect(future, deadline: float, section: str, missing: List[str]) -> str:
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except Exception as e:
+            print(f"Mentor {section} unavailable: {e!r}")
+            missing.append(section)
+            return ""
+
+    def _prepare(self, input_data: FinancialMentorInput):
         decision = input_data.decision_synthesis
         profile = input_data.financial_profile
         
@@ -25,9 +91,6 @@ class FinancialMentorAgent(BaseAgent):
         if decision.verdict == "Dangerous":
             advice_list.append("Immediate freeze on new debt recommended.")
         
-        # Generate Human-Readable Explanation/Advice
-        llm_explanation = self.llm.generate_explanation(context)
-        
         # Prepare Context for Negotiation Script (Needs more specific details)
         # We try to extract lender/loan details from 'profile' if they were passed in a loose dict, 
         # but ideally we should have passed them explicitly. 
@@ -48,11 +111,5 @@ class FinancialMentorAgent(BaseAgent):
             "offered_rate": profile.get("interest_rate", "the offered rate"),
             "verdict": decision.verdict
         }
-        
-        negotiation_script = self.llm.generate_negotiation_script(script_context)
-        
-        return FinancialMentorOutput(
-            advice=advice_list,
-            recovery_plan=llm_explanation,
-            negotiation_script=negotiation_script 
-        )
+
+        return context, script_context, advice_list
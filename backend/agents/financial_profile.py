@@ -1,8 +1,22 @@
+from typing import Any, Dict, List
+
 from .base_agent import BaseAgent
 from ..models import FinancialProfileInput, FinancialProfileOutput
 
+# Scoring rules, shared by run() and run_batch. Coefficients tuned for a conservative "Bank-Grade" assessment.
+EXPENSE_PENALTY = 50 # Expenses at 50% of income cost 25 points, at 100% cost 50
+EMI_PENALTY = 70 # Debt is riskier than lifestyle expenses
+SAVINGS_TARGET_MONTHS = 6 # Target: 6 months of income in savings
+SAVINGS_BOOST_MAX = 20 # Full boost at the target
+DEPENDENT_PENALTY = 2
+HIGH_EXPENSE_RATIO = 0.7
+HIGH_EMI_RATIO = 0.4
+LOW_SAVINGS_RATIO = 0.2 # Less than ~1 month income
+FRAGILE_SCORE = 40
+
 class FinancialProfileAgent(BaseAgent):
     def run(self, input_data: FinancialProfileInput) -> FinancialProfileOutput:
+        # Plain arithmetic: a single profile shouldn't pay for importing numpy (run_batch mirrors these rules)
         # 1. Calculate Ratios (Continuous)
         monthly_income = input_data.income
         if monthly_income <= 0:
@@ -10,45 +24,65 @@ class FinancialProfileAgent(BaseAgent):
 
         expense_ratio = input_data.expenses / monthly_income
         emi_ratio = input_data.existing_emis / monthly_income
-        savings_ratio = input_data.savings / (monthly_income * 6) # Target: 6 months of income in savings
-        
+        savings_ratio = input_data.savings / (monthly_income * SAVINGS_TARGET_MONTHS)
+
         # 2. Weighted Scoring Model (0-100)
         # Base starts at 100, penalized by committed outflows, boosted by savings
-        # Coefficients tuned for conservative "Bank-Grade" assessment
-        
         score = 100.0
-        
-        # Penalty: Fixed Expenses (High impact)
-        # If expenses are 50% of income, penalize 25 points. If 100%, penalize 50.
-        score -= (expense_ratio * 50) 
-        
-        # Penalty: Existing Debt (Very High impact)
-        # Debt is riskier than lifestyle expenses.
-        score -= (emi_ratio * 70) 
-        
-        # Boost: Savings Coverage (Cap at 20 points boost)
-        # If you have 6 months income saved, full boost.
-        savings_boost = min(savings_ratio * 20, 20)
-        score += savings_boost
-        
-        # Penalty: Dependents (Small adjustment for liability)
-        score -= (input_data.dependents * 2)
-        
+        score -= (expense_ratio * EXPENSE_PENALTY)
+        score -= (emi_ratio * EMI_PENALTY)
+        score += min(savings_ratio * SAVINGS_BOOST_MAX, SAVINGS_BOOST_MAX)
+        score -= (input_data.dependents * DEPENDENT_PENALTY)
+
         # Clamp Score 0-100
         final_score = max(0, min(100, score))
-        
+
         # 3. Dynamic Flagging
         risk_flags = []
-        if expense_ratio > 0.7:
+        if expense_ratio > HIGH_EXPENSE_RATIO:
             risk_flags.append(f"High Fixed Expenses ({int(expense_ratio*100)}%)")
-        if emi_ratio > 0.4:
+        if emi_ratio > HIGH_EMI_RATIO:
             risk_flags.append(f"High Existing Debt ({int(emi_ratio*100)}%)")
-        if savings_ratio < 0.2: # Less than ~1 month income
+        if savings_ratio < LOW_SAVINGS_RATIO:
             risk_flags.append("Low Liquid Savings")
-        if final_score < 40:
+        if final_score < FRAGILE_SCORE:
              risk_flags.append("Overall Financial Fragility")
-            
+
         return FinancialProfileOutput(
             stability_score=round(final_score, 1),
             risk_flags=risk_flags
         )
+
+    def run_batch(self, columns: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """run() over columns of validated inputs (see utils.batch); same scores and flags, one dict per row."""
+        import numpy as np
+
+        income = columns["income"]
+        has_income = income > 0
+        safe_income = np.where(has_income, income, 1.0)
+
+        expense_ratio = columns["expenses"] / safe_income
+        emi_ratio = columns["existing_emis"] / safe_income
+        savings_ratio = columns["savings"] / (safe_income * SAVINGS_TARGET_MONTHS)
+
+        score = 100.0 - expense_ratio * EXPENSE_PENALTY - emi_ratio * EMI_PENALTY
+        score += np.minimum(savings_ratio * SAVINGS_BOOST_MAX, SAVINGS_BOOST_MAX)
+        score -= columns["dependents"] * DEPENDENT_PENALTY
+        final_score = np.where(has_income, np.clip(score, 0, 100), 0.0)
+
+        risk_flags: List[List[str]] = [[] for _ in range(len(income))]
+        for i in np.flatnonzero(~has_income):
+            risk_flags[i].append("No Income")
+        for i in np.flatnonzero(has_income & (expense_ratio > HIGH_EXPENSE_RATIO)):
+            risk_flags[i].append(f"High Fixed Expenses ({int(expense_ratio[i]*100)}%)")
+        for i in np.flatnonzero(has_income & (emi_ratio > HIGH_EMI_RATIO)):
+            risk_flags[i].append(f"High Existing Debt ({int(emi_ratio[i]*100)}%)")
+        for i in np.flatnonzero(has_income & (savings_ratio < LOW_SAVINGS_RATIO)):
+            risk_flags[i].append("Low Liquid Savings")
+        for i in np.flatnonzero(has_income & (final_score < FRAGILE_SCORE)):
+            risk_flags[i].append("Overall Financial Fragility")
+
+        return [
+            {"stability_score": round(s, 1), "risk_flags": flags}
+            for s, flags in zip(final_score.tolist(), risk_flags)
+        ]
@@ -1,60 +1,324 @@
 from .base_agent import BaseAgent
-from ..models import LegalReviewOutput, RiskClause
-# import pypdf # Lazy import to avoid startup errors if missing
-from io import BytesIO
+from ..models import LegalReviewOutput, RiskClause, ExtractionStats
+from ..utils.pdf_text import extract_text, PDFLimitError
+from ..utils.clauses import prefilter, dedupe, select_for_review, chunk_clauses, CATEGORY_ADVICE, LEGAL_CHUNK_TOKENS
+from ..utils.metrics import metrics
+from ..utils.cache import TTLCache, SqliteCache, TieredCache, canonical_hash
+from ..utils.uploads import SpooledUpload
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Union
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+
+RISK_ORDER = {"High": 0, "Medium": 1, "Low": 2}
+OVERALL_ORDER = {"Danger": 0, "Caution": 1, "Safe": 2}
+CLAUSE_TEXT_PREVIEW = 400
+
+# Chunks of one agreement reviewed at the same time, and each chunk's deadline
+LEGAL_MAX_PARALLEL_CHUNKS = int(os.getenv("LEGAL_MAX_PARALLEL_CHUNKS", "4"))
+LEGAL_CHUNK_TIMEOUT_S = float(os.getenv("LEGAL_CHUNK_TIMEOUT_S", "30"))
+
+# Shared pool for the sync path; per-request parallelism is bounded separately
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="legal")
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+# Review cache: users often upload the same lender template. Keyed on the raw
+# bytes and, separately, on the normalized text (so a re-saved or re-exported
+# copy of the same agreement still hits).
+LEGAL_CACHE_SIZE = int(os.getenv("LEGAL_CACHE_SIZE", "256"))
+LEGAL_CACHE_TTL_S = float(os.getenv("LEGAL_CACHE_TTL_S", str(30 * 24 * 3600)))
+LEGAL_CACHE_DB = os.getenv("LEGAL_CACHE_DB", os.path.join(tempfile.gettempdir(), "credguard_legal.sqlite")) # "" = memory only
+# Bump when the prefilter or review prompt changes so older reviews aren't served
+LEGAL_REVIEW_VERSION = "1"
+
+review_cache = TieredCache(
+    "legal.review_cache",
+    TTLCache(max_size=LEGAL_CACHE_SIZE, ttl=LEGAL_CACHE_TTL_S),
+    SqliteCache(LEGAL_CACHE_DB, ttl=LEGAL_CACHE_TTL_S) if LEGAL_CACHE_DB else None
+)
+
+def _hit_rate():
+    hits = metrics.counter("legal.cache.hit.raw") + metrics.counter("legal.cache.hit.text")
+    lookups = hits + metrics.counter("legal.cache.miss")
+    return round(hits / lookups, 4) if lookups else None
+
+metrics.gauge("legal.cache.hit_rate", _hit_rate)
 
 class LegalGuardianAgent(BaseAgent):
     def __init__(self):
-        from ..utils.llm_client import LLMClient
-        self.llm = LLMClient()
+        from ..utils.llm_client import get_llm_client
+        self.llm = get_llm_client()
+        self.max_parallel = LEGAL_MAX_PARALLEL_CHUNKS
+        self.chunk_timeout = LEGAL_CHUNK_TIMEOUT_S
+        self.chunk_tokens = LEGAL_CHUNK_TOKENS
+
+    def run(self, file_content: Union[bytes, SpooledUpload], on_progress: Optional[ProgressCallback] = None,
+            force: bool = False) -> LegalReviewOutput:
+        upload = self._as_upload(file_content)
+
+        # 0. Same upload as before? (`force` skips the lookup, not the store)
+        raw_key = self._raw_key(upload)
+        cached = None if force else self._lookup(raw_key, "raw", upload)
+        if cached:
+            return cached
+
+        # 1. Extract Text (whole agreement)
+        extracted = self._extract_text(upload)
+        if isinstance(extracted, LegalReviewOutput):
+            return extracted
+
+        text_key = self._text_key(extracted.text)
+        cached = None if force else self._lookup(text_key, "text", upload, also=raw_key)
+        if cached:
+            return cached
+
+        # 2. Split into clauses and flag the predatory ones locally
+        clauses, chunks = self._prefilter(extracted.text)
+
+        # 3. Map: flagged clauses go to Gemini chunk by chunk, a few chunks at a time
+        slots = threading.BoundedSemaphore(self.max_parallel)
+        futures = {}
+        for i, chunk in enumerate(chunks):
+            slots.acquire()
+            future = _executor.submit(self._review_chunk, chunk)
+            future.add_done_callback(lambda _: slots.release())
+            futures[future] = i
+
+        responses: List[Optional[Dict[str, Any]]] = [None] * len(chunks)
+        for future in as_completed(futures):
+            i = futures[future]
+            responses[i], ms = future.result()
+            self._report(on_progress, i, chunks, responses[i], ms)
+
+        # 4. Reduce
+        output = self._to_output(clauses, responses, extracted)
+        self._remember(responses, output, raw_key, text_key)
+        return output
+
+    async def arun(self, file_content: Union[bytes, SpooledUpload], on_progress: Optional[ProgressCallback] = None,
+                   force: bool = False) -> LegalReviewOutput:
+        # Hashing, PDF parsing and clause scoring are CPU-bound, keep them off the event loop; the LLM waits are coroutines
+        upload = await asyncio.to_thread(self._as_upload, file_content)
+        raw_key = self._raw_key(upload)
+        cached = None if force else await asyncio.to_thread(self._lookup, raw_key, "raw", upload)
+        if cached:
+            return cached
+
+        extracted = await asyncio.to_thread(self._extract_text, upload)
+        if isinstance(extracted, LegalReviewOutput):
+            return extracted
+
+        text_key = await asyncio.to_thread(self._text_key, extracted.text)
+        cached = None if force else await asyncio.to_thread(self._lookup, text_key, "text", upload, raw_key)
+        if cached:
+            return cached
+
+        clauses, chunks = await asyncio.to_thread(self._prefilter, extracted.text)
+
+        slots = asyncio.Semaphore(self.max_parallel)
+        responses: List[Optional[Dict[str, Any]]] = [None] * len(chunks)
+
+        async def review(i: int):
+            async with slots:
+                responses[i], ms = await self._areview_chunk(chunks[i])
+            self._report(on_progress, i, chunks, responses[i], ms)
+
+        await asyncio.gather(*(review(i) for i in range(len(chunks))))
+        output = self._to_output(clauses, responses, extracted)
+        await asyncio.to_thread(self._remember, responses, output, raw_key, text_key)
+        return output
+
+    def _cache_key(self, kind: str, digest: str) -> str:
+        return canonical_hash({
+            "kind": kind,
+            "digest": digest,
+            "version": LEGAL_REVIEW_VERSION,
+            "model": getattr(self.llm, "model_name", None)
+        })
+
+    @staticmethod
+    def _as_upload(file_content: Union[bytes, SpooledUpload]) -> SpooledUpload:
+        # Streamed uploads arrive already hashed (and possibly on disk); raw bytes are wrapped without a copy
+        return file_content if isinstance(file_content, SpooledUpload) else SpooledUpload.from_bytes(file_content)
 
-    def run(self, file_content: bytes) -> LegalReviewOutput:
+    def _raw_key(self, upload: SpooledUpload) -> str:
+        return self._cache_key("raw", upload.sha256)
+
+    def _text_key(self, text: str) -> str:
+        # Case, spacing, line breaks and punctuation differ between exports of the same document
+        normalized = " ".join(re.findall(r"\w+", text.lower()))
+        return self._cache_key("text", hashlib.sha256(normalized.encode("utf-8")).hexdigest())
+
+    @staticmethod
+    def _lookup(key: str, kind: str, upload: SpooledUpload, also: Optional[str] = None) -> Optional[LegalReviewOutput]:
+        value = review_cache.get(key)
+        if value is None:
+            if kind == "text":
+                metrics.incr("legal.cache.miss")
+            return None
+        metrics.incr(f"legal.cache.hit.{kind}")
+        metrics.incr("legal.cache.bytes_saved", upload.size)
+        if also:
+            review_cache.set(also, value) # Next time this exact file hits before extraction
+        return LegalReviewOutput(**{**value, "cached": kind})
+
+    @staticmethod
+    def _remember(responses, output: LegalReviewOutput, raw_key: str, text_key: str) -> None:
+        # Only complete reviews: a chunk that fell back to local scoring would be stuck that way
+        if not all(responses):
+            return
+        value = output.dict()
+        review_cache.set(raw_key, value)
+        review_cache.set(text_key, value)
+
+    def _review_chunk(self, chunk):
+        started = time.perf_counter()
+        response = self.llm.generate_clause_review_json(self._review_context(chunk), timeout=self.chunk_timeout)
+        return response, (time.perf_counter() - started) * 1000
+
+    async def _areview_chunk(self, chunk):
+        started = time.perf_counter()
+        response = await self.llm.agenerate_clause_review_json(self._review_context(chunk), timeout=self.chunk_timeout)
+        return response, (time.perf_counter() - started) * 1000
+
+    @staticmethod
+    def _report(on_progress: Optional[ProgressCallback], i: int, chunks, response, ms: float) -> None:
+        metrics.observe("legal.chunk", ms)
+        if on_progress is None:
+            return
         try:
-            import pypdf
-        except ImportError:
-            return LegalReviewOutput(risk_clauses=[], overall_risk="Error", summary="pypdf library not installed.")
+            on_progress({
+                "chunk": i + 1,
+                "chunks": len(chunks),
+                "clauses": [c.number for c in chunks[i]],
+                "status": "done" if response else "local", # 'local': LLM unavailable, prefilter result kept
+                "ms": round(ms, 2)
+            })
+        except Exception as e:
+            print(f"Legal review progress callback failed: {e}")
 
-        # 1. Extract Text
+    def _extract_text(self, upload: SpooledUpload):
+        """Returns the ExtractionResult, or an error LegalReviewOutput."""
         try:
-            pdf_reader = pypdf.PdfReader(BytesIO(file_content))
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
+            extracted = extract_text(upload.source())
+        except ImportError:
+            return LegalReviewOutput(risk_clauses=[], overall_risk="Error", summary="pypdf library not installed.")
+        except PDFLimitError as e:
+            return LegalReviewOutput(risk_clauses=[], overall_risk="Error", summary=str(e))
         except Exception as e:
             return LegalReviewOutput(risk_clauses=[], overall_risk="Error", summary=f"Failed to read PDF: {str(e)}")
 
-        if not text.strip():
-             return LegalReviewOutput(risk_clauses=[], overall_risk="Error", summary="PDF appears to be empty or scanned images (no text found).")
-
-        # 2. Analyze with Gemini
-        prompt = f"""
-        Analyze the following Loan Agreement text for predatory terms, hidden traps, or "gotchas".
-        Focus on:
-        - Variable interest rate shocks.
-        - Prepayment penalties.
-        - Arbitration clauses (waiver of court rights).
-        - Late fee structures.
-        
-        Text:
-        {text[:10000]} # Limit text length to avoid token limits
-        
-        Output format: JSON with 'clauses' (list of {{clause_text, risk_level, explanation, recommendation}}) and 'overall_risk', 'summary'.
+        if not extracted.text.strip():
+             return LegalReviewOutput(risk_clauses=[], overall_risk="Error", summary="PDF appears to be empty or scanned images (no text found).",
+                                      extraction=ExtractionStats(**extracted.stats()))
+
+        return extracted
+
+    def _prefilter(self, text: str):
+        """(all scored clauses, token-budgeted chunks of the flagged ones for the LLM)."""
+        clauses = prefilter(text)
+        review = select_for_review(clauses)
+        metrics.incr("legal.clauses.total", len(clauses))
+        metrics.incr("legal.clauses.flagged", len(dedupe(clauses)))
+        metrics.incr("legal.llm_chars", sum(len(c.text) for c in review))
+        return clauses, chunk_clauses(review, self.chunk_tokens)
+
+    @staticmethod
+    def _review_context(review):
+        return {"clauses": [
+            {"id": f"C{c.index}", "number": c.number, "categories": sorted(c.categories), "text": c.text}
+            for c in review
+        ]}
+
+    @staticmethod
+    def _local_clause(clause) -> RiskClause:
+        categories = sorted(clause.categories, key=lambda c: -clause.categories[c])
+        return RiskClause(
+            clause_text=LegalGuardianAgent._preview(clause.text),
+            risk_level=clause.risk_level,
+            explanation=" ".join(CATEGORY_ADVICE[c][0] for c in categories),
+            recommendation=" ".join(CATEGORY_ADVICE[c][1] for c in categories),
+            clause_number=clause.number,
+            categories=categories
+        )
+
+    @staticmethod
+    def _preview(text: str) -> str:
+        return text if len(text) <= CLAUSE_TEXT_PREVIEW else text[:CLAUSE_TEXT_PREVIEW].rsplit(" ", 1)[0] + "…"
+
+    @staticmethod
+    def _merge(responses):
+        """Per-clause findings from every chunk by clause id; a clause reported twice keeps its riskiest reading."""
+        reviewed = {}
+        for response in responses:
+            for item in (response or {}).get("clauses") or []:
+                if not isinstance(item, dict) or not item.get("id"):
+                    continue
+                key = str(item["id"])
+                previous = reviewed.get(key)
+                if previous is None or RISK_ORDER.get(item.get("risk_level"), 3) < RISK_ORDER.get(previous.get("risk_level"), 3):
+                    reviewed[key] = item
+        return reviewed
+
+    def _to_output(self, clauses, responses, extracted) -> LegalReviewOutput:
+        """
+        Reduce: one RiskClause per distinct flagged clause, riskiest first.
+        Gemini's review is used where a chunk covered the clause; anything it
+        skipped (or everything, if it was unavailable) keeps the local
+        prefilter's level and advice.
         """
-        
-        # We need a structured response. Assuming LLMClient can handle it or we parse string.
-        # For MVP, we'll ask for a summary and regex parse or rely on JSON mode if available.
-        # Let's assume standard generate_explanation returns string and we try to parse or just return text.
-        # To strictly use our Model, we mock the parsing or improve LLMClient.
-        # I will assume LLMClient has a generate_json or similar? No, only generate_explanation.
-        # I will implement a basic "mock" parser or trust the prompt text return for the "summary" field 
-        # but for specific clauses it's hard without structured output.
-        # I'll stick to a summarized text response for now but mapped to the model roughly.
-        
-        analysis = self.llm.generate_explanation({"prompt": prompt}) # Passing custom prompt dict if supported or modify method
-        
-        # Since I can't guarantee JSON parsing without seeing LLMClient guts, I'll return a "Narrative" mode
+        flagged = dedupe(clauses)
+        reviewed = self._merge(responses)
+        answered = [r for r in responses if r]
+
+        risk_clauses = []
+        for clause in sorted(flagged, key=lambda c: -c.score):
+            local = self._local_clause(clause)
+            item = reviewed.get(f"C{clause.index}")
+            if item:
+                level = item.get("risk_level")
+                local = local.copy(update={
+                    "risk_level": level if level in RISK_ORDER else local.risk_level,
+                    "explanation": item.get("explanation") or local.explanation,
+                    "recommendation": item.get("recommendation") or local.recommendation
+                })
+            risk_clauses.append(local)
+        # Stable: equal levels stay ordered by local score
+        risk_clauses.sort(key=lambda rc: RISK_ORDER.get(rc.risk_level, len(RISK_ORDER)))
+
+        if any(rc.risk_level == "High" for rc in risk_clauses):
+            overall = "Danger"
+        elif risk_clauses:
+            overall = "Caution"
+        else:
+            overall = "Safe"
+        chunk_overalls = [r["overall_risk"] for r in answered if r.get("overall_risk") in OVERALL_ORDER]
+        if chunk_overalls and risk_clauses:
+            overall = min(chunk_overalls, key=OVERALL_ORDER.get)
+
+        summaries = [r["summary"] for r in sorted(answered, key=lambda r: OVERALL_ORDER.get(r.get("overall_risk"), 3)) if r.get("summary")]
+        if len(summaries) == 1:
+            summary = summaries[0]
+        elif risk_clauses:
+            summary = f"{len(risk_clauses)} of {len(clauses)} clauses need attention before you sign."
+            if summaries:
+                summary += " " + summaries[0]
+        else:
+            summary = f"No prepayment, floating-rate, arbitration or late-fee terms were found in {len(clauses)} clauses."
+
         return LegalReviewOutput(
-            risk_clauses=[RiskClause(clause_text="Full Analysis", risk_level="Info", explanation=analysis, recommendation="Please review the full summary.")],
-            overall_risk="Review Required",
-            summary="Analysis generated. Please see details."
+            risk_clauses=risk_clauses,
+            overall_risk=overall,
+            summary=summary,
+            extraction=ExtractionStats(**extracted.stats()),
+            clauses_total=len(clauses),
+            clauses_flagged=len(flagged),
+            chunks=len(responses),
+            source="llm" if reviewed else "local"
         )
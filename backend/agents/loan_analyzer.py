@@ -1,67 +1,101 @@
+import math
+from typing import Any, Dict, List, Tuple
+
 from .base_agent import BaseAgent
 from ..models import LoanDetailsInput, LoanAnalyzerOutput
 
+# Burden score rules (0-100, higher is heavier), shared by run() and assess_batch
+# Factor A: Affordability (EMI to Income Ratio) - CRITICAL. EMI at 10% of income -> Burden 20, 30% -> 60, 50% -> 100 (Unsafe)
+AFFORDABILITY_SCALE = 200
+EXTREME_EMI_RATIO = 0.5
+HIGH_EMI_RATIO = 0.3
+NO_INCOME_BURDEN = 50.0 # Fallback if income missing (shouldn't happen with the current flow)
+COSTLY_INTEREST_RATIO = 0.5 # Factor B: Cost of Credit. Paying double the principal is burdensome too
+LONG_TENURE_MONTHS = 60 # Factor C: Tenure Drag
+HIGH_RATE = 18 # Factor D: High Rate
+
+
+def _burden_factors(has_income, no_income, emi_income_ratio, interest_burden, months, rate):
+    """(applies, burden added, trap) per factor; `applies` is a bool for run() and a mask for assess_batch."""
+    return [
+        (has_income & (emi_income_ratio > EXTREME_EMI_RATIO), 0, "EMI is >50% of Income (Extremely Risky)"),
+        (has_income & (emi_income_ratio > HIGH_EMI_RATIO) & (emi_income_ratio <= EXTREME_EMI_RATIO), 0, "EMI eats 30%+ of monthly income"),
+        (no_income, 0, "Income data missing for burden check"),
+        (interest_burden > COSTLY_INTEREST_RATIO, 10, "Total Interest is >50% of Principal"),
+        (months > LONG_TENURE_MONTHS, 5, "Long Tenure increases total cost"),
+        (rate > HIGH_RATE, 10, "Very High Interest Rate"),
+    ]
+
+
 class LoanAnalyzerAgent(BaseAgent):
     def run(self, input_data: LoanDetailsInput) -> LoanAnalyzerOutput:
+        # Plain Python for a single loan (no numpy import); assess_batch applies the same factors to arrays
+        from ..utils import amortization
+
+        amount, rate, months, income = input_data.amount, input_data.interest_rate, input_data.tenure_months, input_data.monthly_income
         # 1. Precise EMI Calculation (P x R x (1+R)^N)/((1+R)^N - 1)
-        monthly_rate = (input_data.interest_rate / 12) / 100
-        months = input_data.tenure_months
-        
-        if monthly_rate == 0:
-             emi = input_data.amount / months
-        else:
-             emi = (input_data.amount * monthly_rate * ((1 + monthly_rate) ** months)) / (((1 + monthly_rate) ** months) - 1)
-             
-        total_payable = emi * months
-        
-        # 2. Burden Score Calculation (Now Affordability Focused)
-        # We calculate a score 0-100 where higher is heavier burden.
-        
-        burden_score = 0.0
+        emi = amortization.emi_one(amount, rate, months)
+        total_payable = amortization.total_payable_one(amount, rate, months)
+
+        # 2. Burden Score Calculation
+        has_income = income > 0
+        emi_income_ratio = emi / income if has_income else 0.0
+        # A zero amount has no interest ratio: not flagged
+        interest_burden = (total_payable - amount) / amount if amount else math.nan
+        burden_score = min(emi_income_ratio * AFFORDABILITY_SCALE, 100) if has_income else NO_INCOME_BURDEN
+
         hidden_traps = []
+        for applies, penalty, trap in _burden_factors(has_income, not has_income, emi_income_ratio, interest_burden, months, rate):
+            if applies:
+                burden_score += penalty
+                hidden_traps.append(trap)
 
-        # Factor A: Affordability (EMI to Income Ratio) - CRITICAL
-        # If Income is provided (should be), this is the main driver.
-        if input_data.monthly_income > 0:
-            emi_income_ratio = emi / input_data.monthly_income
-            # If EMI is 10% of income -> Burden 20
-            # If EMI is 30% of income -> Burden 60
-            # If EMI is 50% of income -> Burden 100 (Unsafe)
-            affordability_burden = min(emi_income_ratio * 200, 100)
-            
-            burden_score = affordability_burden
-            
-            if emi_income_ratio > 0.5:
-                hidden_traps.append(f"EMI is >50% of Income (Extremely Risky)")
-            elif emi_income_ratio > 0.3:
-                hidden_traps.append(f"EMI eats 30%+ of monthly income")
-        else:
-            # Fallback if income missing (shouldn't happen with new flow)
-            burden_score = 50.0 
-            hidden_traps.append("Income data missing for burden check")
-
-        # Factor B: Cost of Credit (Interest Ratio) - Secondary
-        # If you pay double the principal, that's burdensome too.
-        interest_burden = (total_payable - input_data.amount) / input_data.amount
-        if interest_burden > 0.5:
-             burden_score += 10
-             hidden_traps.append("Total Interest is >50% of Principal")
-            
-        # Factor C: Tenure Drag
-        if months > 60:
-            burden_score += 5
-            hidden_traps.append("Long Tenure increases total cost")
-            
-        # Factor D: High Rate
-        if input_data.interest_rate > 18:
-            burden_score += 10
-            hidden_traps.append("Very High Interest Rate")
-            
         # Clamp 0-100
         final_burden = max(0, min(100, burden_score))
-            
+
         return LoanAnalyzerOutput(
             burden_score=round(final_burden, 1),
             total_payable=round(total_payable, 2),
             hidden_traps=hidden_traps
         )
+
+    @staticmethod
+    def assess_batch(amount, rate, months, income) -> Tuple[Any, Any, Any, List[Tuple[Any, str]]]:
+        """
+        run()'s arithmetic over arrays that broadcast together (a column, or a
+        what-if grid): (emi, total_payable, clamped burden score, [(mask, trap)]).
+        """
+        import numpy as np
+        from ..utils import amortization
+
+        emi = amortization.emi(amount, rate, months)
+        total_payable = amortization.total_payable(amount, rate, months)
+
+        has_income = income > 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            emi_income_ratio = emi / np.where(has_income, income, 1.0)
+            interest_burden = (total_payable - amount) / amount # NaN for a zero amount: not flagged
+        burden = np.where(has_income, np.minimum(emi_income_ratio * AFFORDABILITY_SCALE, 100), NO_INCOME_BURDEN)
+
+        factors = _burden_factors(has_income, ~has_income, emi_income_ratio, interest_burden, months, rate)
+        for mask, penalty, _ in factors:
+            burden = burden + np.where(mask, penalty, 0)
+        return emi, total_payable, np.clip(burden, 0, 100), [(mask, trap) for mask, _, trap in factors]
+
+    def run_batch(self, columns: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """run() over columns of validated inputs (see utils.batch); one dict per row."""
+        import numpy as np
+
+        amount = columns["amount"]
+        _, total_payable, final_burden, traps = self.assess_batch(
+            amount, columns["interest_rate"], columns["tenure_months"], columns["monthly_income"]
+        )
+        hidden_traps: List[List[str]] = [[] for _ in range(len(amount))]
+        for mask, trap in traps:
+            for i in np.flatnonzero(mask):
+                hidden_traps[i].append(trap)
+
+        return [
+            {"burden_score": round(b, 1), "total_payable": round(t, 2), "hidden_traps": h}
+            for b, t, h in zip(final_burden.tolist(), total_payable.tolist(), hidden_traps)
+        ]
@@ -1,60 +1,92 @@
+from typing import Any, Dict, List
+
 from .base_agent import BaseAgent
 from ..models import LoanNecessityInput, LoanNecessityOutput
 
+CRITICAL_KEYWORDS = ["education", "medical", "health", "tuition", "school", "hospital"]
+BUSINESS_KEYWORDS = ["business", "startups", "equipment", "capital"]
+HOME_KEYWORDS = ["home", "renovation", "house"]
+# Purpose kinds, first match wins: 0 critical, 1 business, 2 home, 3 discretionary (personal, vacation, gadgets, etc.)
+PURPOSE_KEYWORDS = [CRITICAL_KEYWORDS, BUSINESS_KEYWORDS, HOME_KEYWORDS]
+STABLE_BUSINESS_SCORE = 70 # Business loans above this stability count as High necessity
+SELF_FUND_MULTIPLE = 1.5 # Liquid cash covering the loan this many times over: why borrow?
+EMERGENCY_FUND_SHARE = 0.2 # Below this share of the loan, the emergency fund is thin
+
+
+def _purpose_kind(purpose: str) -> int:
+    return next((kind for kind, keywords in enumerate(PURPOSE_KEYWORDS) if any(kw in purpose for kw in keywords)), 3)
+
+
+def _necessity_level(kind: int, stability_score: float) -> str:
+    if kind == 0 or (kind == 1 and stability_score > STABLE_BUSINESS_SCORE):
+        return "High"
+    return "Medium" if kind <= 2 else "Low"
+
+
+def _assess(purpose: str, kind: int, level: str, liquid_cash: float, amount: float, emergency_fund: float) -> Dict[str, Any]:
+    """Reasoning, flags and confidence for one loan, once its purpose kind and level are known (shared by run and run_batch)."""
+    confidence = 0.8
+    reasoning = []
+    risk_flags = []
+
+    # 1. Base Logic based on Purpose
+    if kind == 0:
+        reasoning.append(f"Loan for '{purpose}' is considered a critical need.")
+    elif kind == 1:
+        reasoning.append(f"Loan for '{purpose}' can be productive but carries risk.")
+        if level == "High":
+            reasoning.append("High financial stability supports this business investment.")
+    elif kind == 2:
+        reasoning.append("Home improvement is a valid asset appreciation strategy.")
+    else:
+        reasoning.append(f"Loan for '{purpose}' is considered discretionary spending.")
+
+    # 2. Financial Buffer Check
+    if liquid_cash > amount * SELF_FUND_MULTIPLE:
+        reasoning.append(f"You have sufficient liquid assets ({liquid_cash}) to cover this loan ({amount}).")
+        if level == "Low":
+            risk_flags.append("Unnecessary borrowing: Self-funding is recommended.")
+            confidence = 0.95
+        elif level == "Medium":
+            reasoning.append("Consider self-funding a portion to reduce debt burden.")
+
+    # 3. Emergency Fund Warning
+    if emergency_fund < amount * EMERGENCY_FUND_SHARE and level == "Low":
+        risk_flags.append("Taking a discretionary loan without a solid emergency fund is risky.")
+
+    return {
+        "necessity_level": level,
+        "is_necessary": level in ["High", "Medium"],
+        "confidence": confidence,
+        "reasoning": " ".join(reasoning),
+        "risk_flags": risk_flags
+    }
+
+
 class LoanNecessityAgent(BaseAgent):
     def run(self, input_data: LoanNecessityInput) -> LoanNecessityOutput:
+        # Plain Python for a single loan; run_batch only vectorizes the keyword matching around the same _assess
         purpose = input_data.loan_purpose.lower()
-        amount = input_data.loan_amount
-        savings = input_data.savings
-        emergency_fund = input_data.emergency_fund
-        stability_score = input_data.financial_stability_score
-
-        necessity_level = "Low"
-        confidence = 0.8
-        reasoning = []
-        risk_flags = []
-
-        # 1. Base Logic based on Purpose
-        if any(kw in purpose for kw in ["education", "medical", "health", "tuition", "school", "hospital"]):
-            necessity_level = "High"
-            reasoning.append(f"Loan for '{purpose}' is considered a critical need.")
-        elif any(kw in purpose for kw in ["business", "startups", "equipment", "capital"]):
-            necessity_level = "Medium"
-            reasoning.append(f"Loan for '{purpose}' can be productive but carries risk.")
-            if stability_score > 70:
-                necessity_level = "High"
-                reasoning.append("High financial stability supports this business investment.")
-        elif any(kw in purpose for kw in ["home", "renovation", "house"]):
-            necessity_level = "Medium"
-            reasoning.append("Home improvement is a valid asset appreciation strategy.")
-        else:
-            # Personal, Vacation, Gadgets, etc.
-            necessity_level = "Low"
-            reasoning.append(f"Loan for '{purpose}' is considered discretionary spending.")
-
-        # 2. Financial Buffer Check
-        total_liquid_cash = savings + emergency_fund
-        if total_liquid_cash > amount * 1.5:
-            # If they have enough cash to cover loan 1.5x over, why borrow?
-            reasoning.append(f"You have sufficient liquid assets ({total_liquid_cash}) to cover this loan ({amount}).")
-            if necessity_level == "Low":
-                risk_flags.append("Unnecessary borrowing: Self-funding is recommended.")
-                confidence = 0.95
-            elif necessity_level == "Medium":
-                reasoning.append("Consider self-funding a portion to reduce debt burden.")
-        
-        # 3. Emergency Fund Warning
-        if emergency_fund < amount * 0.2:
-            if necessity_level == "Low":
-                 risk_flags.append("Taking a discretionary loan without a solid emergency fund is risky.")
-
-        # Determine boolean is_necessary
-        is_necessary = necessity_level in ["High", "Medium"]
-
-        return LoanNecessityOutput(
-            necessity_level=necessity_level,
-            is_necessary=is_necessary,
-            confidence=confidence,
-            reasoning=" ".join(reasoning),
-            risk_flags=risk_flags
-        )
+        kind = _purpose_kind(purpose)
+        level = _necessity_level(kind, input_data.financial_stability_score)
+        return LoanNecessityOutput(**_assess(
+            purpose, kind, level, input_data.savings + input_data.emergency_fund, input_data.loan_amount, input_data.emergency_fund
+        ))
+
+    def run_batch(self, columns: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """run() over columns of validated inputs (see utils.batch); one dict per row."""
+        import numpy as np
+
+        purpose = np.char.lower(columns["loan_purpose"])
+
+        def mentions(keywords):
+            return np.logical_or.reduce([np.char.find(purpose, kw) >= 0 for kw in keywords])
+
+        kind = np.select([mentions(keywords) for keywords in PURPOSE_KEYWORDS], [0, 1, 2], 3)
+        stable_business = (kind == 1) & (columns["financial_stability_score"] > STABLE_BUSINESS_SCORE)
+        level = np.select([(kind == 0) | stable_business, kind <= 2], ["High", "Medium"], "Low")
+        liquid = columns["savings"] + columns["emergency_fund"]
+
+        rows = zip(purpose.tolist(), kind.tolist(), level.tolist(), liquid.tolist(),
+                   columns["loan_amount"].tolist(), columns["emergency_fund"].tolist())
+        return [_assess(*row) for row in rows]
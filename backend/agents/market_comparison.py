@@ -1,19 +1,27 @@
+from typing import Any, Dict, List
+
 from .base_agent import BaseAgent
 from ..models import LoanDetailsInput, MarketComparisonOutput
 
+MARKET_AVERAGE_RATE = 12.0
+FAIR_RATE_MARGIN = 5 # Rates more than this above the market average are unfair
+ALTERNATIVE = "Try Credit Union Loans (approx 10%)"
+
 class MarketComparisonAgent(BaseAgent):
     def run(self, input_data: LoanDetailsInput) -> MarketComparisonOutput:
         # Dummy Logic
-        market_average_rate = 12.0
-        is_fair = True
-        alternatives = []
-        
-        if input_data.interest_rate > market_average_rate + 5:
-            is_fair = False
-            alternatives.append("Try Credit Union Loans (approx 10%)")
-            
+        unfair = input_data.interest_rate > MARKET_AVERAGE_RATE + FAIR_RATE_MARGIN
         return MarketComparisonOutput(
-            is_fair=is_fair,
-            market_average_rate=market_average_rate,
-            alternatives=alternatives
+            is_fair=not unfair,
+            market_average_rate=MARKET_AVERAGE_RATE,
+            alternatives=[ALTERNATIVE] if unfair else []
         )
+
+    def run_batch(self, columns: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """run() over columns of validated inputs (see utils.batch); one dict per row."""
+        unfair = (columns["interest_rate"] > MARKET_AVERAGE_RATE + FAIR_RATE_MARGIN).tolist()
+        return [
+            {"is_fair": not u, "market_average_rate": MARKET_AVERAGE_RATE,
+             "alternatives": [ALTERNATIVE] if u else []}
+            for u in unfair
+        ]
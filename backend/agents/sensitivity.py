@@ -0,0 +1,95 @@
+import base64
+import time
+from typing import Any, Dict
+
+from .base_agent import BaseAgent
+from .credit_score import CreditScoreAgent
+from .decision_synthesis import DecisionSynthesisAgent
+from .financial_profile import FinancialProfileAgent
+from .loan_analyzer import LoanAnalyzerAgent
+from .loan_necessity import LoanNecessityAgent
+from .market_comparison import FAIR_RATE_MARGIN, MARKET_AVERAGE_RATE
+from ..models import GridRange, LoanNecessityInput, SensitivityInput
+
+VERDICT_LABELS = ["Dangerous", "Risky", "Safe"]
+# How each metric is packed: (dtype, scale). Scores are 0-100 in steps of 0.1, so uint16 tenths are exact.
+PACKING = {
+    "emi": ("float32", 1.0),
+    "burden_score": ("uint16", 0.1),
+    "dti": ("float32", 1.0),
+    "score": ("uint16", 0.1),
+    "verdict": ("uint8", 1.0),
+}
+
+
+def grid_axis(grid: GridRange, integer: bool = False):
+    import numpy as np
+
+    values = np.linspace(grid.start, grid.stop, max(grid.steps, 1))
+    # Whole months; a narrow range can round several steps onto the same month
+    return np.unique(np.round(values)) if integer else values
+
+
+def pack(name: str, values) -> Dict[str, Any]:
+    import numpy as np
+
+    dtype, scale = PACKING[name]
+    stored = values / scale if scale != 1.0 else values
+    if dtype != "float32":
+        stored = np.round(stored)
+    raw = np.ascontiguousarray(stored, dtype=np.dtype(dtype).newbyteorder("<")).tobytes()
+    return {"dtype": dtype, "scale": scale, "data": base64.b64encode(raw).decode("ascii")}
+
+
+class SensitivityAgent(BaseAgent):
+    """
+    What-if grid over loan amount x tenure x rate for one applicant. The parts of
+    the chain that don't depend on the loan terms (stability, credit band,
+    necessity level) run once; burden, EMI, DTI and the fallback verdict score are
+    computed for every cell in one broadcast pass.
+    """
+
+    def run(self, input_data: SensitivityInput, packed: bool = True) -> Dict[str, Any]:
+        import numpy as np
+
+        started = time.perf_counter()
+        profile = input_data.profile
+        stability = FinancialProfileAgent().run(profile).stability_score
+        band = input_data.credit_score_band or CreditScoreAgent().run(input_data.credit).score_band
+
+        amounts = grid_axis(input_data.amount)
+        tenures = grid_axis(input_data.tenure_months, integer=True)
+        rates = grid_axis(input_data.interest_rate)
+        # The necessity level depends on purpose and stability only; the amount just adds flags
+        necessity = LoanNecessityAgent().run(LoanNecessityInput(
+            loan_purpose=input_data.loan_purpose, loan_amount=float(amounts[0]), financial_stability_score=stability,
+            savings=profile.savings, emergency_fund=profile.emergency_fund
+        )).necessity_level
+
+        A, T, R = amounts[:, None, None], tenures[None, :, None], rates[None, None, :]
+        emi, _, burden, _ = LoanAnalyzerAgent.assess_batch(A, R, T, profile.income)
+        burden = np.round(burden, 1) # The pipeline hands the rounded burden_score to the verdict
+        if profile.income > 0:
+            dti = (profile.existing_emis + emi) / profile.income * 100
+        else:
+            dti = np.zeros_like(emi)
+        decision = DecisionSynthesisAgent.fallback_batch(stability, burden, band, necessity, R <= MARKET_AVERAGE_RATE + FAIR_RATE_MARGIN)
+        verdict = np.select([decision["verdict"] == "Safe", decision["verdict"] == "Risky"], [2, 1], 0)
+
+        metrics = {
+            "emi": np.round(emi, 2),
+            "burden_score": burden,
+            "dti": np.round(dti, 2),
+            "score": decision["score"],
+            "verdict": verdict,
+        }
+        return {
+            "axes": {"amount": amounts.tolist(), "tenure_months": tenures.tolist(), "interest_rate": rates.tolist()},
+            "shape": list(emi.shape),
+            "metrics": {k: pack(k, v) if packed else v.ravel().tolist() for k, v in metrics.items()},
+            "verdict_labels": VERDICT_LABELS,
+            "stability_score": stability,
+            "credit_score_band": band,
+            "necessity_level": necessity,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
@@ -0,0 +1,76 @@
+"""
+Throughput of backend.utils.amortization on a large synthetic loan book,
+against the per-loan scalar formula it replaced.
+
+    python -m backend.benchmarks.amortization                  # 1M loans
+    python -m backend.benchmarks.amortization --loans 200000 --schedule-loans 5000
+
+EMI and total interest run over the whole book; full month-by-month schedules
+(loans x tenure arrays) over a smaller slice of it. The scalar baseline is
+timed on --scalar-loans and reported per loan.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from backend.utils import amortization
+
+
+def scalar_emi(amount, rate, months):
+    r = rate / 1200
+    if r == 0:
+        return amount / months
+    return (amount * r * ((1 + r) ** months)) / (((1 + r) ** months) - 1)
+
+
+def loan_book(size: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    return (
+        rng.uniform(10_000, 5_000_000, size),
+        rng.choice([0.0, 8.5, 9.9, 10.75, 12.5, 14.0, 18.0, 24.0, 36.0], size),
+        rng.integers(6, 361, size)
+    )
+
+
+def timed(fn, repeat: int) -> float:
+    """Best of `repeat` runs, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--loans", type=int, default=1_000_000)
+    parser.add_argument("--schedule-loans", type=int, default=10_000)
+    parser.add_argument("--scalar-loans", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    amounts, rates, months = loan_book(args.loans)
+
+    emi_s = timed(lambda: amortization.emi(amounts, rates, months), args.repeat)
+    interest_s = timed(lambda: amortization.total_interest(amounts, rates, months), args.repeat)
+
+    n = min(args.scalar_loans, args.loans)
+    book = list(zip(amounts[:n].tolist(), rates[:n].tolist(), months[:n].tolist()))
+    scalar_s = timed(lambda: [scalar_emi(*loan) for loan in book], args.repeat) * args.loans / n
+
+    k = min(args.schedule_loans, args.loans)
+    schedule_s = timed(lambda: amortization.schedule(amounts[:k], rates[:k], months[:k]), args.repeat)
+
+    print(f"{args.loans:,} loans")
+    print(f"  emi (vectorized)     {emi_s * 1000:9.1f} ms  {args.loans / emi_s / 1e6:8.1f} M loans/s")
+    print(f"  total interest       {interest_s * 1000:9.1f} ms  {args.loans / interest_s / 1e6:8.1f} M loans/s")
+    print(f"  emi (scalar loop)    {scalar_s * 1000:9.1f} ms  {args.loans / scalar_s / 1e6:8.1f} M loans/s"
+          f"  (timed on {n:,}, {scalar_s / emi_s:.0f}x slower)")
+    print(f"  schedules            {schedule_s * 1000:9.1f} ms  for {k:,} loans, {k / schedule_s:,.0f} loans/s"
+          f"  ({int(months[:k].max())} months each)")
+
+
+if __name__ == "__main__":
+    main()
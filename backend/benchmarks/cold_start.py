@@ -0,0 +1,93 @@
+"""
+Cold-start benchmark for backend.main.
+
+Each run is a fresh Python process that measures
+  - import time of backend.main
+  - time from process start of the import to the first successful
+    POST /agents/financial-profile response (in-process ASGI client)
+  - which heavy dependencies ended up loaded.
+
+    python -m backend.benchmarks.cold_start --runs 5
+    python -m backend.benchmarks.cold_start --max-import-ms 1000 --max-first-response-ms 1500
+
+Exits non-zero when a threshold is exceeded or a heavy dependency is loaded
+by the arithmetic-only request, so it can gate CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ("google.genai", "edge_tts", "fpdf", "yfinance", "pandas", "pypdf", "numpy")
+
+CHILD = r"""
+import json, sys, time
+started = time.perf_counter()
+import backend.main
+imported = time.perf_counter()
+
+from fastapi.testclient import TestClient
+client = TestClient(backend.main.app)
+res = client.post("/agents/financial-profile", json={
+    "income": 80000, "expenses": 30000, "savings": 200000, "assets": 500000,
+    "existing_emis": 5000, "dependents": 1
+})
+assert res.status_code == 200, res.text
+responded = time.perf_counter()
+
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_response_ms": (responded - started) * 1000,
+    "heavy_loaded": [m for m in HEAVY if m in sys.modules],
+}))
+"""
+
+
+def run_once(root: str) -> dict:
+    env = dict(os.environ)
+    # Background startup work is irrelevant to the first request and would need network
+    env.setdefault("TTS_PRERENDER_POLICIES", "0")
+    env.setdefault("ASSET_PRICE_BACKGROUND_REFRESH", "0")
+    env.setdefault("WARMUP_ON_STARTUP", "0")
+    code = f"HEAVY = {HEAVY_MODULES!r}\n{CHILD}"
+    out = subprocess.run([sys.executable, "-c", code], cwd=root, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float)
+    parser.add_argument("--max-first-response-ms", type=float)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    results = [run_once(root) for _ in range(args.runs)]
+
+    import_ms = [r["import_ms"] for r in results]
+    first_ms = [r["first_response_ms"] for r in results]
+    heavy = sorted({m for r in results for m in r["heavy_loaded"]})
+
+    print(f"runs:               {args.runs}")
+    print(f"import backend.main median {statistics.median(import_ms):7.0f} ms  (min {min(import_ms):.0f}, max {max(import_ms):.0f})")
+    print(f"first response      median {statistics.median(first_ms):7.0f} ms  (min {min(first_ms):.0f}, max {max(first_ms):.0f})")
+    print(f"heavy deps loaded:  {', '.join(heavy) or 'none'}")
+
+    failed = False
+    if args.max_import_ms is not None and statistics.median(import_ms) > args.max_import_ms:
+        print(f"FAIL: import median above {args.max_import_ms} ms")
+        failed = True
+    if args.max_first_response_ms is not None and statistics.median(first_ms) > args.max_first_response_ms:
+        print(f"FAIL: first response median above {args.max_first_response_ms} ms")
+        failed = True
+    if heavy:
+        print("FAIL: heavy dependencies loaded by an arithmetic-only request")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
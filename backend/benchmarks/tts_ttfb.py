@@ -0,0 +1,80 @@
+"""
+Time-to-first-byte and total time for /tts/speak synthesis:
+single edge-tts job vs sentence-parallel chunked mode.
+
+    python -m backend.benchmarks.tts_ttfb              # real edge-tts (needs network)
+    python -m backend.benchmarks.tts_ttfb --simulate   # offline latency model
+
+Each run uses a fresh audio cache so nothing is served from disk.
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+
+import edge_tts
+
+from backend.utils import tts_service
+from backend.utils.audio_cache import AudioCache
+from backend.utils.policy_knowledge_base import POLICY_KNOWLEDGE_BASE
+
+
+class SimulatedCommunicate:
+    """Rough edge-tts model: fixed session setup plus synthesis time proportional to text length."""
+    SETUP_S = 0.25
+    PER_CHAR_S = 0.003
+
+    def __init__(self, text, voice):
+        self.text = text
+
+    async def stream(self):
+        await asyncio.sleep(self.SETUP_S + self.PER_CHAR_S * len(self.text))
+        for i in range(0, len(self.text), 40):
+            await asyncio.sleep(0.005)
+            yield {"type": "audio", "data": b"\xff\xf3" + self.text[i:i + 40].encode("utf-8")}
+
+
+async def measure(text: str, lang: str, chunked: bool):
+    tts_service.audio_cache = AudioCache(tempfile.mkdtemp(prefix="tts_bench_"))
+    started = time.perf_counter()
+    stream = await tts_service.TTSService.generate_audio_stream(text, lang, chunked=chunked)
+    ttfb = time.perf_counter() - started
+    size = 0
+    async for chunk in stream:
+        size += len(chunk)
+    return ttfb, time.perf_counter() - started, size
+
+
+async def main(simulate: bool, repeats: int):
+    if simulate:
+        edge_tts.Communicate = SimulatedCommunicate
+
+    # Recovery-plan-sized English text and long Malayalam texts. A closing sentence keeps
+    # them from ending in a policy body, which would take the pre-rendered path instead.
+    closing = {"en": "Please read the agreement carefully.", "ml": "കരാർ ശ്രദ്ധാപൂർവ്വം വായിക്കുക."}
+    en = " ".join(p["en"] for p in POLICY_KNOWLEDGE_BASE.values())
+    ml = max((p["ml"] for p in POLICY_KNOWLEDGE_BASE.values()), key=len)
+    cases = [
+        ("en", f"{en} {closing['en']}"),
+        ("ml", f"{ml} {closing['ml']}"),
+        ("ml", f"{' '.join([ml] * 3)} {closing['ml']}"),
+    ]
+
+    print(f"{'lang':<5}{'chars':>7}  {'mode':<8}{'ttfb_ms':>9}{'total_ms':>10}{'bytes':>9}")
+    for lang, text in cases:
+        for chunked in (False, True):
+            best = None
+            for _ in range(repeats):
+                result = await measure(text, lang, chunked)
+                best = result if best is None or result[0] < best[0] else best
+            ttfb, total, size = best
+            mode = "chunked" if chunked else "single"
+            print(f"{lang:<5}{len(text):>7}  {mode:<8}{ttfb * 1000:>9.0f}{total * 1000:>10.0f}{size:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--simulate", action="store_true", help="Use an offline latency model instead of edge-tts")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per case (best TTFB is reported)")
+    args = parser.parse_args()
+    asyncio.run(main(args.simulate, args.repeats))
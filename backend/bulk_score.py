@@ -0,0 +1,360 @@
+"""
+Bulk portfolio scoring: runs the deterministic CredGuard pipeline
+(financial profile -> loan analyzer -> loan necessity -> fallback verdict) over
+an applicant dump, in bounded-memory chunks spread across a process pool.
+
+    python -m backend.bulk_score applicants.csv scored.csv
+    python -m backend.bulk_score applicants.parquet scored.parquet --workers 4 --chunk-rows 100000
+    python -m backend.bulk_score applicants.csv scored.csv --resume      # after a crash
+
+Input columns (one row per application):
+    income, expenses, savings, assets, existing_emis, dependents, [emergency_fund]
+    amount, interest_rate, tenure_months, purpose, [lender_name], [monthly_income]
+    credit_score_band, or missed_payments, credit_utilization_ratio,
+    credit_age_years, active_loans, [cibil_score]
+    [id] - copied to the output as is
+
+Results are written in input order as chunks finish: a CSV file, or for
+.parquet a directory of part files (a Parquet dataset). Progress goes to a
+checkpoint file next to the output, so --resume continues from the last
+completed chunk. Parquet needs pyarrow, which is optional.
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+BULK_CHUNK_ROWS = int(os.getenv("BULK_CHUNK_ROWS", "50000"))
+BULK_WORKERS = int(os.getenv("BULK_WORKERS", str(os.cpu_count() or 1)))
+
+OUTPUT_COLUMNS = [
+    "row", "id", "stability_score", "credit_score_band", "burden_score", "total_payable",
+    "necessity_level", "market_is_fair", "score", "verdict", "confidence", "error"
+]
+CREDIT_COLUMNS = ("missed_payments", "credit_utilization_ratio", "credit_age_years", "active_loans")
+
+Chunk = Tuple[int, int, List[Dict[str, Any]]] # (chunk index, first row number, records)
+
+
+class Applicant(BaseModel):
+    # Union of the agents' inputs, as one flat row
+    income: float
+    expenses: float
+    savings: float
+    emergency_fund: float = 0.0
+    assets: float
+    existing_emis: float
+    dependents: int
+    amount: float
+    interest_rate: float
+    tenure_months: int
+    purpose: str
+    lender_name: str = ""
+    monthly_income: float = 0.0 # Defaults to `income`, as in /pipeline/evaluate
+    credit_score_band: Optional[str] = None
+    missed_payments: Optional[int] = None
+    credit_utilization_ratio: Optional[float] = None
+    credit_age_years: Optional[float] = None
+    active_loans: Optional[int] = None
+    cibil_score: Optional[int] = None
+
+
+def _column(outputs: List[Dict[str, Any]], key: str):
+    import numpy as np
+    return np.array([o[key] for o in outputs])
+
+
+def score_records(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Scores one chunk, column-wise. One output dict per record, in order; invalid records carry `error`."""
+    import numpy as np
+
+    from backend.agents.credit_score import CreditScoreAgent
+    from backend.agents.decision_synthesis import DecisionSynthesisAgent
+    from backend.agents.financial_profile import FinancialProfileAgent
+    from backend.agents.loan_analyzer import LoanAnalyzerAgent
+    from backend.agents.loan_necessity import LoanNecessityAgent
+    from backend.agents.market_comparison import MarketComparisonAgent
+    from backend.utils.batch import validate_batch
+
+    batch = validate_batch(Applicant, records)
+    out: List[Optional[Dict[str, Any]]] = [None] * len(records)
+    for i, errs in batch.errors.items():
+        out[i] = {"row": i, "error": "; ".join(f"{e['field']}: {e['message']}" for e in errs)}
+    if not batch.rows:
+        return out
+
+    # Credit: a given band wins; otherwise the credit agent needs all of its columns
+    c, rows = batch.columns, np.array(batch.rows)
+    needs_credit = c["credit_score_band"] == ""
+    incomplete = needs_credit & np.logical_or.reduce([np.isnan(c[k]) for k in CREDIT_COLUMNS])
+    for i in rows[incomplete].tolist():
+        out[i] = {"row": i, "error": "credit: provide credit_score_band or " + ", ".join(CREDIT_COLUMNS)}
+    if incomplete.any():
+        keep = ~incomplete
+        c, rows, needs_credit = {k: v[keep] for k, v in c.items()}, rows[keep], needs_credit[keep]
+        if not len(rows):
+            return out
+
+    profile = FinancialProfileAgent().run_batch(c)
+    stability = _column(profile, "stability_score")
+
+    loan = dict(c, monthly_income=np.where(c["monthly_income"] > 0, c["monthly_income"], c["income"]))
+    analysis = LoanAnalyzerAgent().run_batch(loan)
+    burden = _column(analysis, "burden_score")
+    market_fair = _column(MarketComparisonAgent().run_batch(loan), "is_fair")
+    necessity = _column(LoanNecessityAgent().run_batch({
+        "loan_purpose": c["purpose"], "loan_amount": c["amount"], "financial_stability_score": stability,
+        "savings": c["savings"], "emergency_fund": c["emergency_fund"]
+    }), "necessity_level")
+
+    band = c["credit_score_band"].astype(object)
+    if needs_credit.any():
+        scored = CreditScoreAgent().run_batch({k: c[k][needs_credit] for k in CREDIT_COLUMNS + ("cibil_score",)})
+        band[needs_credit] = [s["score_band"] for s in scored]
+
+    verdict = DecisionSynthesisAgent.fallback_batch(stability, burden, band, necessity, market_fair)
+
+    columns = zip(rows.tolist(), stability.tolist(), band.tolist(), burden.tolist(), (a["total_payable"] for a in analysis),
+                  necessity.tolist(), market_fair.tolist(), verdict["score"].tolist(), verdict["verdict"].tolist(),
+                  verdict["confidence"].tolist())
+    for i, s, b, bu, tp, n, m, sc, v, conf in columns:
+        out[i] = {"row": i, "stability_score": s, "credit_score_band": b, "burden_score": bu, "total_payable": tp,
+                  "necessity_level": n, "market_is_fair": m, "score": sc, "verdict": v, "confidence": conf}
+    return out
+
+
+def score_chunk(chunk: Chunk) -> Tuple[int, List[Dict[str, Any]]]:
+    """Runs in a pool worker: scores a chunk and numbers its rows from the chunk's first input row."""
+    index, first_row, records = chunk
+    results = score_records(records)
+    for record, result in zip(records, results):
+        result["row"] += first_row
+        result["id"] = record.get("id")
+    return index, results
+
+
+# --- Input ---
+
+def _clean(record: Dict[str, Any]) -> Dict[str, Any]:
+    # Empty CSV cells are missing values: optional columns take their defaults
+    return {k: v for k, v in record.items() if v is not None and v != ""}
+
+
+def count_rows(path: str) -> Optional[int]:
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    lines = 0
+    with open(path, "rb") as f:
+        while block := f.read(1 << 20):
+            lines += block.count(b"\n")
+    return max(lines - 1, 0) # Header; quoted multi-line cells make this an estimate
+
+
+def read_chunks(path: str, chunk_rows: int, skip_chunks: int = 0) -> Iterator[Chunk]:
+    """Yields (index, first row, records) with at most `chunk_rows` records each; only one chunk is held at a time."""
+    def numbered(records: Iterator[Dict[str, Any]]) -> Iterator[Chunk]:
+        index, buffer = 0, []
+        for record in records:
+            buffer.append(record)
+            if len(buffer) == chunk_rows:
+                if index >= skip_chunks:
+                    yield index, index * chunk_rows, buffer
+                index, buffer = index + 1, []
+        if buffer and index >= skip_chunks:
+            yield index, index * chunk_rows, buffer
+
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        source = pq.ParquetFile(path)
+        yield from numbered(_clean(r) for batch in source.iter_batches(batch_size=chunk_rows) for r in batch.to_pylist())
+        return
+    with open(path, newline="", encoding="utf-8") as f:
+        yield from numbered(_clean(r) for r in csv.DictReader(f))
+
+
+# --- Output ---
+
+class CSVOutput:
+    """Appends rows to one CSV file; position() is a byte offset the checkpoint can truncate back to."""
+
+    def __init__(self, path: str, resume_at: Optional[int] = None):
+        if resume_at is None:
+            self.file = open(path, "w", newline="", encoding="utf-8")
+            csv.writer(self.file).writerow(OUTPUT_COLUMNS)
+        else:
+            self.file = open(path, "r+", newline="", encoding="utf-8")
+            self.file.truncate(resume_at)
+            self.file.seek(resume_at)
+        self.writer = csv.DictWriter(self.file, OUTPUT_COLUMNS, extrasaction="ignore")
+
+    def write(self, index: int, rows: List[Dict[str, Any]]) -> None:
+        self.writer.writerows(rows)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def position(self) -> int:
+        return self.file.tell()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class ParquetOutput:
+    """One part file per chunk in a directory (a Parquet dataset); a part only appears once fully written."""
+
+    def __init__(self, path: str, resume_at: Optional[int] = None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa, self.pq, self.path = pa, pq, path
+        # Explicit, so a part where a column happens to be all empty doesn't get a null type
+        self.schema = pa.schema([
+            ("row", pa.int64()), ("id", pa.string()), ("stability_score", pa.float64()), ("credit_score_band", pa.string()),
+            ("burden_score", pa.float64()), ("total_payable", pa.float64()), ("necessity_level", pa.string()),
+            ("market_is_fair", pa.bool_()), ("score", pa.float64()), ("verdict", pa.string()),
+            ("confidence", pa.float64()), ("error", pa.string())
+        ])
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            part = name.startswith("part-") and name.endswith(".parquet")
+            if part and (resume_at is None or int(name[5:-8]) >= resume_at):
+                os.remove(os.path.join(path, name))
+        self.written = resume_at or 0
+
+    def write(self, index: int, rows: List[Dict[str, Any]]) -> None:
+        rows = [dict(r, id=None if r.get("id") is None else str(r["id"])) for r in rows]
+        table = self.pa.Table.from_pylist(rows, schema=self.schema)
+        final = os.path.join(self.path, f"part-{index:06d}.parquet")
+        self.pq.write_table(table, final + ".tmp")
+        os.replace(final + ".tmp", final)
+        self.written = index + 1
+
+    def position(self) -> int:
+        return self.written # Parts before this chunk index are complete
+
+    def close(self) -> None:
+        pass
+
+
+def checkpoint_path(output: str) -> str:
+    return output.rstrip("/\\") + ".checkpoint.json"
+
+
+def save_checkpoint(output: str, state: Dict[str, Any]) -> None:
+    path = checkpoint_path(output)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+# --- Driver ---
+
+def _progress(done: int, total: Optional[int], started: float, resumed_rows: int, final: bool = False) -> None:
+    elapsed = time.perf_counter() - started
+    rate = (done - resumed_rows) / elapsed if elapsed > 0 else 0.0
+    line = f"{done:,} rows  {rate:,.0f} rows/s  {elapsed:,.1f}s"
+    if total:
+        remaining = max(total - done, 0)
+        eta = remaining / rate if rate else float("inf")
+        line = f"{done:,}/{total:,} rows ({done / total:.0%})  {rate:,.0f} rows/s  ETA {eta:,.0f}s"
+    print("\r" + line + ("\n" if final else ""), end="", file=sys.stderr, flush=True)
+
+
+def run(input_path: str, output_path: str, chunk_rows: int = BULK_CHUNK_ROWS, workers: int = BULK_WORKERS,
+        resume: bool = False, quiet: bool = False) -> Dict[str, Any]:
+    """
+    Scores `input_path` into `output_path`. With workers < 2 chunks are scored in
+    this process. At most 2 x workers chunks are read ahead of the writer, which
+    bounds memory whatever the input size. Returns the final checkpoint state.
+    """
+    parquet_out = output_path.endswith(".parquet")
+    state = {"input": os.path.abspath(input_path), "input_size": os.path.getsize(input_path),
+             "chunk_rows": chunk_rows, "chunks_done": 0, "rows_done": 0, "failed": 0, "position": None}
+
+    if resume and os.path.exists(checkpoint_path(output_path)):
+        with open(checkpoint_path(output_path)) as f:
+            saved = json.load(f)
+        if any(saved[k] != state[k] for k in ("input", "input_size", "chunk_rows")):
+            raise SystemExit("Checkpoint is for a different input or --chunk-rows; rerun without --resume.")
+        state = saved
+        if not quiet:
+            print(f"Resuming after chunk {state['chunks_done']} ({state['rows_done']:,} rows)", file=sys.stderr)
+
+    output = (ParquetOutput if parquet_out else CSVOutput)(output_path, resume_at=state["position"])
+    state["position"] = output.position()
+    save_checkpoint(output_path, state)
+    total = count_rows(input_path)
+    chunks = read_chunks(input_path, chunk_rows, skip_chunks=state["chunks_done"])
+    started, resumed_rows = time.perf_counter(), state["rows_done"]
+
+    def finish(index: int, results: List[Dict[str, Any]]) -> None:
+        output.write(index, results)
+        state["chunks_done"] = index + 1
+        state["rows_done"] += len(results)
+        state["failed"] += sum(1 for r in results if r.get("error"))
+        state["position"] = output.position()
+        save_checkpoint(output_path, state)
+        if not quiet:
+            _progress(state["rows_done"], total, started, resumed_rows)
+
+    pool = None
+    try:
+        if workers < 2:
+            for chunk in chunks:
+                finish(*score_chunk(chunk))
+        else:
+            # spawn: same start method as the server's pools
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            pending: "deque[Future]" = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(score_chunk, chunk))
+                # Write in input order; the read-ahead window bounds memory
+                while pending and (pending[0].done() or len(pending) >= 2 * workers):
+                    finish(*pending.popleft().result())
+            while pending:
+                finish(*pending.popleft().result())
+    finally:
+        output.close()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    if not quiet:
+        _progress(state["rows_done"], total, started, resumed_rows, final=True)
+    os.remove(checkpoint_path(output_path))
+    return state
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Score an applicant dump (CSV or Parquet) with the CredGuard pipeline.")
+    parser.add_argument("input")
+    parser.add_argument("output", help="A .csv file, or a .parquet dataset directory")
+    parser.add_argument("--chunk-rows", type=int, default=BULK_CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=BULK_WORKERS)
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint left by an interrupted run")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args(argv)
+
+    for path in (args.input, args.output):
+        if path.endswith(".parquet"):
+            try:
+                import pyarrow # noqa: F401
+            except ImportError:
+                parser.error("Parquet input/output needs pyarrow (pip install pyarrow).")
+
+    state = run(args.input, args.output, args.chunk_rows, args.workers, args.resume, args.quiet)
+    if not args.quiet:
+        print(f"Scored {state['rows_done']:,} rows into {args.output} ({state['failed']:,} rejected)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
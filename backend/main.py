@@ -1,6 +1,11 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from dotenv import load_dotenv
+from contextlib import asynccontextmanager
+import asyncio
+import json
 import os
+import time
+from datetime import date
 
 from pathlib import Path
 
@@ -13,12 +18,14 @@ from backend.models import (
     LoanAnalyzerOutput, MarketComparisonOutput, DecisionSynthesisOutput,
     FinancialMentorOutput, FinancialMentorInput
 )
-from backend.utils.pdf_generator import PDFReport
-from backend.utils.pdf_generator import PDFReport
-from backend.utils.tts_service import TTSService
+# Heavy optional dependencies (fpdf, edge-tts, google-genai, yfinance, pypdf) are
+# imported on first use, not here: cold starts only pay for what a request needs.
+from backend.utils.tts_service import TTSService, TTSError
 from backend.utils.policy_knowledge_base import POLICY_KNOWLEDGE_BASE
-from fastapi.responses import Response, StreamingResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
+from typing import Optional
+from functools import lru_cache
 from backend.agents.financial_profile import FinancialProfileAgent
 from backend.agents.credit_score import CreditScoreAgent
 from backend.agents.loan_necessity import LoanNecessityAgent
@@ -28,16 +35,55 @@ from backend.agents.decision_synthesis import DecisionSynthesisAgent
 from backend.agents.financial_mentor import FinancialMentorAgent
 from backend.agents.debt_consolidation import DebtConsolidationAgent
 from backend.agents.legal_guardian import LegalGuardianAgent
+from backend.agents.sensitivity import SensitivityAgent
 
 from backend.models import (
     FinancialProfileInput, CreditScoreInput, LoanDetailsInput, LoanNecessityInput, DecisionSynthesisInput, FinancialMentorInput,
     FinancialProfileOutput, CreditScoreOutput, LoanNecessityOutput,
     LoanAnalyzerOutput, MarketComparisonOutput, DecisionSynthesisOutput,
     FinancialMentorOutput, FinancialMentorInput,
-    DebtConsolidationInput, DebtConsolidationOutput, LegalReviewOutput
+    DebtConsolidationInput, DebtConsolidationOutput, LegalReviewOutput,
+    PipelineEvaluateInput, PipelineEvaluateOutput, BatchInput, BatchOutput,
+    SensitivityInput, SensitivityOutput
 )
+from backend.utils.pipeline import Stage, PipelineError, run_pipeline
 
-app = FastAPI()
+from backend.utils.asset_prices import asset_price_service
+
+from backend.utils.warmup import warmup
+
+# Pre-render the shared policy narrations into the audio cache at startup
+TTS_PRERENDER_POLICIES = os.getenv("TTS_PRERENDER_POLICIES", "1") == "1"
+# Keep gold/silver prices warm in the background
+ASSET_PRICE_BACKGROUND_REFRESH = os.getenv("ASSET_PRICE_BACKGROUND_REFRESH", "1") == "1"
+# Prime lazy dependencies, clients and caches in the background right after startup (see /readyz)
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "1") == "1"
+# Comma-separated subset of warm-up components; empty = all registered ones
+WARMUP_COMPONENTS = [c.strip() for c in os.getenv("WARMUP_COMPONENTS", "").split(",") if c.strip()]
+
+def enabled_warmups():
+    names = WARMUP_COMPONENTS or warmup.names
+    if not TTS_PRERENDER_POLICIES:
+        names = [n for n in names if n != "policy_audio"]
+    return names
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    background = []
+    enabled = enabled_warmups() if WARMUP_ON_STARTUP else []
+    if WARMUP_ON_STARTUP:
+        background.append(asyncio.create_task(warmup.run(enabled)))
+    else:
+        warmup.disable_all()
+    if ASSET_PRICE_BACKGROUND_REFRESH:
+        # When warm-up already does the first fetch, the refresher picks up from the next interval
+        delay = asset_price_service.refresh_interval if "asset_prices" in enabled else 0.0
+        background.append(asyncio.create_task(asset_price_service.run_refresher(delay)))
+    yield
+    for task in background:
+        task.cancel()
+
+app = FastAPI(lifespan=lifespan)
 
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -56,10 +102,63 @@ credit_score_agent = CreditScoreAgent()
 loan_necessity_agent = LoanNecessityAgent()
 loan_analyzer_agent = LoanAnalyzerAgent()
 market_comparison_agent = MarketComparisonAgent()
-decision_synthesis_agent = DecisionSynthesisAgent()
-financial_mentor_agent = FinancialMentorAgent()
 debt_consolidation_agent = DebtConsolidationAgent()
-legal_guardian_agent = LegalGuardianAgent()
+sensitivity_agent = SensitivityAgent()
+
+# LLM-backed agents are built on first use: they bring up google-genai and the
+# shared HTTP pool, which arithmetic-only requests never need.
+@lru_cache(maxsize=None)
+def get_decision_synthesis_agent() -> DecisionSynthesisAgent:
+    return DecisionSynthesisAgent()
+
+@lru_cache(maxsize=None)
+def get_financial_mentor_agent() -> FinancialMentorAgent:
+    return FinancialMentorAgent()
+
+@lru_cache(maxsize=None)
+def get_legal_guardian_agent() -> LegalGuardianAgent:
+    return LegalGuardianAgent()
+
+def warm_llm():
+    # Builds the genai client and its keep-alive HTTP pool
+    get_decision_synthesis_agent()
+    get_financial_mentor_agent()
+    get_legal_guardian_agent()
+    import pypdf # noqa: F401
+
+def warm_pdf():
+    # Starts the report workers; each imports fpdf and renders a sample (core-font metrics load on the first render)
+    from backend.utils.report_renderer import warm_pool
+    warm_pool()
+
+def warm_tts():
+    import edge_tts # noqa: F401
+
+async def warm_policy_audio():
+    if not await TTSService.prerender_policies():
+        raise RuntimeError("no policy narration could be rendered")
+
+def warm_amortization():
+    # numpy for the loan agents, which import it on first use
+    from backend.utils import amortization
+    amortization.emi(100000, 10, 12)
+
+def warm_caches():
+    from backend.utils.llm_client import verdict_cache
+    from backend.utils.audio_cache import audio_cache
+    from backend.utils.report_renderer import report_cache
+
+    verdict_cache.warm()
+    audio_cache.warm()
+    report_cache.warm()
+
+warmup.register("llm", warm_llm)
+warmup.register("pdf", warm_pdf)
+warmup.register("amortization", warm_amortization)
+warmup.register("asset_prices", asset_price_service.warm)
+warmup.register("tts", warm_tts)
+warmup.register("policy_audio", warm_policy_audio)
+warmup.register("caches", warm_caches)
 
 @app.post("/agents/financial-profile", response_model=FinancialProfileOutput)
 def run_financial_profile(data: FinancialProfileInput):
@@ -81,58 +180,283 @@ def run_loan_analyzer(data: LoanDetailsInput):
 def run_market_comparison(data: LoanDetailsInput):
     return market_comparison_agent.run(data)
 
+from backend.utils.batch import validate_batch, assemble, BATCH_MAX_RECORDS
+
+# Deterministic agents that score whole columns at once (run_batch)
+BATCH_AGENTS = {
+    "financial-profile": (FinancialProfileInput, financial_profile_agent),
+    "credit-score": (CreditScoreInput, credit_score_agent),
+    "loan-necessity": (LoanNecessityInput, loan_necessity_agent),
+    "loan-analyzer": (LoanDetailsInput, loan_analyzer_agent),
+}
+
+@app.post("/agents/{name}/batch", response_model=BatchOutput)
+def run_agent_batch(name: str, data: BatchInput):
+    if name not in BATCH_AGENTS:
+        raise HTTPException(status_code=404, detail=f"No batch endpoint for '{name}'. Available: {', '.join(BATCH_AGENTS)}.")
+    if len(data.records) > BATCH_MAX_RECORDS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_RECORDS} records per batch.")
+
+    model, agent = BATCH_AGENTS[name]
+    started = time.perf_counter()
+    batch = validate_batch(model, data.records)
+    outputs = agent.run_batch(batch.columns) if batch.rows else []
+    metrics.observe(f"batch.{name}", (time.perf_counter() - started) * 1000)
+    metrics.incr("batch.records", batch.size)
+    # Built as plain dicts; skipping response_model validation matters at thousands of rows
+    return JSONResponse(assemble(batch, outputs))
+
+SENSITIVITY_MAX_CELLS = int(os.getenv("SENSITIVITY_MAX_CELLS", "250000"))
+
+@app.post("/analysis/sensitivity", response_model=SensitivityOutput)
+def run_sensitivity(data: SensitivityInput, packed: bool = True):
+    # One broadcast pass over amount x tenure x rate, so the UI sliders can interpolate instead of re-running the chain
+    if not data.credit_score_band and data.credit is None:
+        raise HTTPException(status_code=422, detail="Provide either 'credit' or 'credit_score_band'.")
+    steps = (data.amount.steps, data.tenure_months.steps, data.interest_rate.steps)
+    if min(steps) < 1:
+        raise HTTPException(status_code=422, detail="Every range needs at least 1 step.")
+    if steps[0] * steps[1] * steps[2] > SENSITIVITY_MAX_CELLS:
+        raise HTTPException(status_code=422, detail=f"Grid is over {SENSITIVITY_MAX_CELLS} cells; use fewer steps.")
+
+    result = sensitivity_agent.run(data, packed=packed)
+    metrics.observe("analysis.sensitivity", result["elapsed_ms"])
+    # Skips response_model validation: the packed matrices are already in their final form
+    return JSONResponse(result)
+
+# LLM-backed routes are async: waiting on Gemini costs a coroutine, not a threadpool worker
 @app.post("/agents/decision-synthesis", response_model=DecisionSynthesisOutput)
-def run_decision_synthesis(data: DecisionSynthesisInput):
-    return decision_synthesis_agent.run(data)
+async def run_decision_synthesis(data: DecisionSynthesisInput):
+    return await get_decision_synthesis_agent().arun(data)
 
 @app.post("/agents/financial-mentor", response_model=FinancialMentorOutput)
-def run_financial_mentor(data: FinancialMentorInput):
-    return financial_mentor_agent.run(data)
+async def run_financial_mentor(data: FinancialMentorInput):
+    return await get_financial_mentor_agent().arun(data)
 
 @app.post("/agents/debt-consolidation", response_model=DebtConsolidationOutput)
 def run_debt_consolidation(data: DebtConsolidationInput):
     return debt_consolidation_agent.run(data)
 
-from fastapi import UploadFile, File
-@app.post("/agents/legal-guardian", response_model=LegalReviewOutput)
-async def run_legal_guardian(file: UploadFile = File(...)):
-    content = await file.read()
-    return legal_guardian_agent.run(content)
+@app.post("/pipeline/evaluate", response_model=PipelineEvaluateOutput)
+async def run_pipeline_evaluate(data: PipelineEvaluateInput):
+    # Whole agent graph in one round trip (mirrors services/loanService.ts::calculateVerdict)
+    if not data.credit_score_band and data.credit is None:
+        raise HTTPException(status_code=422, detail="Provide either 'credit' or 'credit_score_band'.")
+
+    profile, loan = data.profile, data.loan
+    if loan.monthly_income <= 0:
+        loan = loan.copy(update={"monthly_income": profile.income})
+
+    def credit_band(results):
+        if data.credit_score_band:
+            return data.credit_score_band
+        return results["credit_score"].score_band
+
+    async def financial_profile(results):
+        return await financial_profile_agent.arun(profile)
+
+    async def credit_score(results):
+        return await credit_score_agent.arun(data.credit)
+
+    async def loan_analyzer(results):
+        return await loan_analyzer_agent.arun(loan)
+
+    async def market_comparison(results):
+        return await market_comparison_agent.arun(loan)
+
+    async def necessity(results):
+        return await loan_necessity_agent.arun(LoanNecessityInput(
+            loan_purpose=loan.purpose,
+            loan_amount=loan.amount,
+            financial_stability_score=results["financial_profile"].stability_score,
+            savings=profile.savings,
+            emergency_fund=profile.emergency_fund
+        ))
+
+    async def decision(results):
+        return await get_decision_synthesis_agent().arun(DecisionSynthesisInput(
+            financial_stability_score=results["financial_profile"].stability_score,
+            credit_score_band=credit_band(results),
+            loan_burden_score=results["loan_analyzer"].burden_score,
+            loan_necessity_level=results["loan_necessity"].necessity_level,
+            market_is_fair=results["market_comparison"].is_fair,
+            language=data.language,
+            monthly_income=profile.income,
+            monthly_expenses=profile.expenses,
+            loan_amount=loan.amount,
+            existing_emis=profile.existing_emis,
+            desired_emi=results["loan_analyzer"].total_payable / loan.tenure_months if loan.tenure_months else 0.0,
+            detailed_explanation=data.detailed_explanation
+        ))
+
+    async def mentor(results):
+        return await get_financial_mentor_agent().arun(FinancialMentorInput(
+            financial_profile={
+                **profile.dict(),
+                "lender_name": loan.lender_name or "the Bank",
+                "loan_amount": loan.amount,
+                "interest_rate": loan.interest_rate
+            },
+            decision_synthesis=results["decision_synthesis"],
+            language=data.language
+        ))
+
+    decision_deps = ("financial_profile", "loan_analyzer", "loan_necessity", "market_comparison")
+    stages = [
+        Stage("financial_profile", financial_profile),
+        Stage("loan_analyzer", loan_analyzer),
+        Stage("market_comparison", market_comparison),
+        Stage("loan_necessity", necessity, depends_on=("financial_profile",)),
+    ]
+    if not data.credit_score_band:
+        stages.append(Stage("credit_score", credit_score))
+        decision_deps += ("credit_score",)
+    stages.append(Stage("decision_synthesis", decision, depends_on=decision_deps))
+    if data.include_mentor:
+        # The negotiation script is a nice-to-have; don't fail the verdict over it
+        stages.append(Stage("financial_mentor", mentor, depends_on=("decision_synthesis",), optional=True))
+
+    try:
+        outcome = await run_pipeline(stages)
+    except PipelineError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return PipelineEvaluateOutput(
+        **outcome.results,
+        timings=outcome.timings,
+        total_ms=outcome.total_ms,
+        errors=outcome.errors
+    )
+
+from fastapi import Request
+from backend.utils.uploads import receive_upload, UploadError, UploadTooLarge
+from backend.utils.pdf_text import LEGAL_PDF_MAX_BYTES
+
+# The body is parsed by hand (streamed to a spooled file with the size limit
+# enforced as it arrives), so describe the multipart field for the docs here.
+UPLOAD_OPENAPI = {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+    "type": "object", "required": ["file"], "properties": {"file": {"type": "string", "format": "binary"}}
+}}}}}
+
+@app.post("/agents/legal-guardian", response_model=LegalReviewOutput, openapi_extra=UPLOAD_OPENAPI)
+async def run_legal_guardian(request: Request, stream: bool = False, force: bool = False):
+    # force=true re-analyses even if this agreement was reviewed before
+    try:
+        upload = await receive_upload(request, "file", max_bytes=LEGAL_PDF_MAX_BYTES)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UploadError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    if not stream:
+        try:
+            return await get_legal_guardian_agent().arun(upload, force=force)
+        finally:
+            upload.close()
+
+    # NDJSON: one {"type": "progress"} line per reviewed chunk, then {"type": "result"}
+    events = asyncio.Queue()
+    task = asyncio.create_task(get_legal_guardian_agent().arun(upload, on_progress=events.put_nowait, force=force))
+    task.add_done_callback(lambda _: events.put_nowait(None))
+
+    async def lines():
+        try:
+            while (event := await events.get()) is not None:
+                yield json.dumps({"type": "progress", **event}) + "\n"
+            try:
+                yield json.dumps({"type": "result", "data": task.result().dict()}) + "\n"
+            except Exception as e:
+                yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+        finally:
+            task.cancel()
+            upload.close()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+from backend.utils.report_renderer import render_async, report_jobs, report_key, REPORT_SYNC_WAIT_S
+
+PDF_HEADERS = {"Content-Disposition": "attachment; filename=financial_report.pdf"}
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    # Weak comparison, as RFC 9110 specifies for If-None-Match
+    return "*" in tags or f'"{etag}"' in [t[2:] if t.startswith("W/") else t for t in tags]
+
+def pdf_response(pdf_bytes: Optional[bytes], etag: str):
+    # no-cache: clients may keep the PDF but should revalidate with If-None-Match
+    headers = {**PDF_HEADERS, "ETag": f'"{etag}"', "Cache-Control": "private, no-cache"}
+    if pdf_bytes is None:
+        return Response(status_code=304, headers={"ETag": headers["ETag"], "Cache-Control": headers["Cache-Control"]})
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
 
 @app.post("/generate-pdf")
-def generate_pdf(data: FinancialMentorInput):
-    print("DEBUG: /generate-pdf endpoint hit!", flush=True)
+async def generate_pdf(data: FinancialMentorInput, request: Request):
+    # Re-using FinancialMentorInput as it contains Profile (dict) and Decision (object)
+    # Rendering happens in the report process pool; this coroutine only waits for the bytes
+    verdict = data.decision_synthesis.dict()
+    # Fixed once, so the ETag and the rendered bytes agree on the date even across midnight
+    generated_on = date.today()
+    etag = report_key(verdict, data.financial_profile, generated_on)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        metrics.incr("reports.not_modified")
+        return pdf_response(None, etag)
     try:
-        # Re-using FinancialMentorInput as it contains Profile (dict) and Decision (object)
-        # We might need to adjust formatting as 'financial_profile' is a loose dict in that model
-        
-        pdf = PDFReport(
-            verdict_data=data.decision_synthesis.dict(),
-            profile_data=data.financial_profile
-        )
-        pdf_bytes = pdf.generate()
-        
-        print("DEBUG: PDF generated successfully", flush=True)
-        return Response(
-            content=bytes(pdf_bytes),
-            media_type="application/pdf",
-            headers={"Content-Disposition": "attachment; filename=financial_report.pdf"}
-        )
+        pdf_bytes = await render_async(verdict, data.financial_profile, generated_on)
     except Exception as e:
-        print(f"DEBUG: Error generating PDF: {e}", flush=True)
+        print(f"Error generating PDF: {e}", flush=True)
         return Response(content=str(e), status_code=500)
+    return pdf_response(pdf_bytes, etag)
 
-    except Exception as e:
-        print(f"DEBUG: Error generating PDF: {e}", flush=True)
-        return Response(content=str(e), status_code=500)
+def report_response(job_id: str, job, if_none_match: Optional[str] = None):
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired report id.")
+    # The ETag is known from the inputs, so a client holding the PDF needn't wait for the render
+    if etag_matches(if_none_match, job["etag"]):
+        metrics.incr("reports.not_modified")
+        return pdf_response(None, job["etag"])
+    if job["status"] == "done":
+        return pdf_response(job["pdf"], job["etag"])
+    if job["status"] == "failed":
+        return JSONResponse({"id": job_id, "status": "failed", "detail": job["error"]}, status_code=500)
+    return JSONResponse(
+        {"id": job_id, "status": "pending", "status_url": f"/reports/{job_id}"},
+        status_code=202,
+        headers={"Location": f"/reports/{job_id}", "Retry-After": "1"}
+    )
+
+@app.post("/reports")
+async def create_report(data: FinancialMentorInput, request: Request):
+    # Fast path: small reports finish within REPORT_SYNC_WAIT_S and come straight back as the PDF;
+    # slower ones get 202 + a job id to poll on GET /reports/{id}
+    verdict = data.decision_synthesis.dict()
+    if_none_match = request.headers.get("if-none-match")
+    generated_on = date.today()
+    etag = report_key(verdict, data.financial_profile, generated_on)
+    if etag_matches(if_none_match, etag):
+        metrics.incr("reports.not_modified")
+        return pdf_response(None, etag)
+    job_id = report_jobs.submit(verdict, data.financial_profile, generated_on)
+    return report_response(job_id, await report_jobs.wait(job_id, REPORT_SYNC_WAIT_S))
+
+@app.get("/reports/{job_id}")
+def get_report(job_id: str, request: Request):
+    return report_response(job_id, report_jobs.get(job_id), request.headers.get("if-none-match"))
 
 class TTSInput(BaseModel):
     text: str
     language: str = "en"
+    chunked: Optional[bool] = None # Sentence-parallel synthesis; default: automatic for long texts
 
 @app.post("/tts/speak")
 async def run_tts(data: TTSInput):
-    stream = await TTSService.generate_audio_stream(data.text, data.language)
+    if not data.text.strip():
+        raise HTTPException(status_code=422, detail="Text must not be empty.")
+    try:
+        stream = await TTSService.generate_audio_stream(data.text, data.language, data.chunked)
+    except TTSError as e:
+        raise HTTPException(status_code=502, detail=f"Speech synthesis failed: {e}")
     return StreamingResponse(stream, media_type="audio/mpeg")
 
 @app.get("/policies/{bank_code}")
@@ -148,10 +472,22 @@ def get_policy(bank_code: str, lang: str = "en", name: str = "Valued Customer",
     
     return {"text": preamble + raw_text}
 
-from backend.utils.asset_prices import AssetPriceService
-
 @app.get("/assets/prices")
 def get_asset_prices():
-    return AssetPriceService.get_live_rates()
+    # Served from memory; the background refresher keeps it current
+    return asset_price_service.get_live_rates()
+from backend.utils.metrics import metrics
+
+@app.get("/metrics")
+def get_metrics():
+    return metrics.snapshot()
+
+@app.get("/healthz")
 def health_check():
+    # Liveness: the process is up and serving; says nothing about warm-up
     return {"status": "CredGuard AI Backend Running"}
+
+@app.get("/readyz")
+def readiness_check():
+    report = warmup.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
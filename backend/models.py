@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 
 class FinancialProfileInput(BaseModel):
     income: float
@@ -72,6 +72,7 @@ class DecisionSynthesisInput(BaseModel):
     loan_amount: Optional[float] = 0.0
     existing_emis: Optional[float] = 0.0
     desired_emi: Optional[float] = 0.0 
+    detailed_explanation: bool = False # Always ask the LLM, even when the hard rules settle the verdict
 
 class Suggestion(BaseModel):
     title: str
@@ -85,6 +86,7 @@ class DecisionSynthesisOutput(BaseModel):
     score: float # 0-100 (Higher is Safer)
     suggestions: List[Suggestion] = []
     financial_tips: List[str] = []
+    source: str = "llm" # "llm", "rules" (hard rules settled it) or "fallback" (LLM unavailable)
 
 class FinancialMentorInput(BaseModel):
     financial_profile: Dict[str, Any]
@@ -95,6 +97,7 @@ class FinancialMentorOutput(BaseModel):
     advice: List[str]
     recovery_plan: str
     negotiation_script: str = "" # Script to read to the bank
+    missing_sections: List[str] = [] # Sections that missed their deadline, e.g. ["negotiation_script"]
 
 class DebtItem(BaseModel):
     name: str # e.g. "Credit Card"
@@ -119,8 +122,103 @@ class RiskClause(BaseModel):
     risk_level: str # 'High', 'Medium', 'Low'
     explanation: str
     recommendation: str
+    clause_number: Optional[str] = None # As printed in the agreement, e.g. '7.2'
+    categories: List[str] = [] # 'prepayment', 'floating_rate', 'arbitration', 'late_fee'
+
+class PageTiming(BaseModel):
+    page: int # 1-based
+    ms: float
+    chars: int
+
+class ExtractionStats(BaseModel):
+    pages_total: int
+    pages_read: int
+    truncated: bool # Remaining pages skipped once enough text was collected
+    mode: str # 'serial', 'parallel'
+    total_ms: float
+    page_timings: List[PageTiming] = []
 
 class LegalReviewOutput(BaseModel):
     risk_clauses: List[RiskClause]
     overall_risk: str # 'Safe', 'Caution', 'Danger'
     summary: str
+    extraction: Optional[ExtractionStats] = None
+    clauses_total: int = 0
+    clauses_flagged: int = 0
+    chunks: int = 0 # LLM calls made (flagged clauses are reviewed in token-budgeted chunks)
+    source: str = "llm" # 'llm' or 'local' (prefilter scores only)
+    cached: Optional[str] = None # 'raw' or 'text' when served from the review cache
+
+class PipelineEvaluateInput(BaseModel):
+    profile: FinancialProfileInput
+    loan: LoanDetailsInput
+    credit: Optional[CreditScoreInput] = None
+    credit_score_band: Optional[str] = None # Skip the credit agent if the band is already known
+    language: str = "en"
+    include_mentor: bool = True
+    detailed_explanation: bool = False
+
+class BatchInput(BaseModel):
+    records: List[Any] # Each validated against the agent's input model; invalid ones are reported by index
+
+class BatchRecordError(BaseModel):
+    field: str
+    message: str
+
+class BatchRecordResult(BaseModel):
+    index: int
+    result: Optional[Dict[str, Any]] = None # The agent's usual output for this record
+    errors: Optional[List[BatchRecordError]] = None # Set instead of `result` when the record failed validation
+
+class BatchOutput(BaseModel):
+    count: int
+    failed: int
+    results: List[BatchRecordResult] # In input order
+
+class GridRange(BaseModel):
+    start: float
+    stop: float
+    steps: int = 10 # Evenly spaced values from start to stop, both included
+
+class SensitivityInput(BaseModel):
+    profile: FinancialProfileInput
+    loan_purpose: str
+    credit: Optional[CreditScoreInput] = None
+    credit_score_band: Optional[str] = None # Skip the credit agent if the band is already known
+    amount: GridRange
+    tenure_months: GridRange
+    interest_rate: GridRange
+
+class PackedMatrix(BaseModel):
+    dtype: str # "float32", "uint16" or "uint8", little-endian
+    scale: float = 1.0 # value = stored * scale
+    data: str # base64 of the raw array, C order over the grid's shape
+
+class SensitivityOutput(BaseModel):
+    # Grid metrics are in C order over `shape` = (amount, tenure_months, interest_rate):
+    # cell [i][j][k] is at i*T*R + j*R + k. Packed by default; plain lists with ?packed=false.
+    axes: Dict[str, List[float]]
+    shape: List[int]
+    metrics: Dict[str, Union[PackedMatrix, List[float]]] # emi, burden_score, dti (percent), score, verdict
+    verdict_labels: List[str] # `verdict` values index into this
+    stability_score: float
+    credit_score_band: str
+    necessity_level: str
+    elapsed_ms: float
+
+class StageTiming(BaseModel):
+    stage: str
+    started_ms: float
+    duration_ms: float
+
+class PipelineEvaluateOutput(BaseModel):
+    financial_profile: FinancialProfileOutput
+    credit_score: Optional[CreditScoreOutput] = None
+    loan_analyzer: LoanAnalyzerOutput
+    market_comparison: MarketComparisonOutput
+    loan_necessity: LoanNecessityOutput
+    decision_synthesis: DecisionSynthesisOutput
+    financial_mentor: Optional[FinancialMentorOutput] = None
+    timings: List[StageTiming]
+    total_ms: float
+    errors: Dict[str, str] = {}
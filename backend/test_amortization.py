@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from backend.agents.debt_consolidation import DebtConsolidationAgent
+from backend.agents.loan_analyzer import LoanAnalyzerAgent
+from backend.models import DebtConsolidationInput, DebtItem, LoanDetailsInput
+from backend.utils import amortization
+from backend.utils.pdf_generator import PDFReport
+
+rng = np.random.default_rng(20261018)
+
+
+def scalar_emi(amount, rate, months):
+    # The formula the three call sites each used to carry
+    r = rate / 1200
+    if r == 0:
+        return amount / months
+    return (amount * r * ((1 + r) ** months)) / (((1 + r) ** months) - 1)
+
+
+def random_loans(size):
+    amounts = rng.uniform(1_000, 5_000_000, size).round(2)
+    rates = np.where(rng.random(size) < 0.05, 0.0, rng.uniform(0.01, 42, size).round(2))
+    months = rng.integers(1, 361, size)
+    return amounts, rates, months
+
+
+def test_vectorized_emi_matches_scalar_formula():
+    amounts, rates, months = random_loans(5000)
+    expected = np.array([scalar_emi(a, r, int(n)) for a, r, n in zip(amounts, rates, months)])
+
+    np.testing.assert_allclose(amortization.emi(amounts, rates, months), expected, rtol=1e-9)
+    np.testing.assert_allclose(amortization.total_payable(amounts, rates, months), expected * months, rtol=1e-9)
+    # A difference of large numbers: agree to well under a paisa
+    np.testing.assert_allclose(amortization.total_interest(amounts, rates, months), expected * months - amounts, atol=1e-3)
+
+
+
+def test_single_loan_emi_matches_vectorized():
+    amounts, rates, months = random_loans(2000)
+    single = [amortization.emi_one(float(a), float(r), int(n)) for a, r, n in zip(amounts, rates, months)]
+    np.testing.assert_allclose(single, amortization.emi(amounts, rates, months), rtol=1e-12)
+    assert amortization.emi_one(120000, 0, 12) == 10000
+    assert amortization.emi_one(120000, 10, 0) == 0.0
+    assert amortization.total_payable_one(120000, 0, 12) == 120000
+
+def test_schedules_amortize_to_zero_and_sum_to_totals():
+    amounts, rates, months = random_loans(300)
+    plan = amortization.schedule(amounts, rates, months)
+
+    assert plan.payment.shape == (300, months.max())
+    np.testing.assert_allclose(plan.principal.sum(axis=1), amounts, rtol=1e-9)
+    np.testing.assert_allclose(plan.total_interest, amortization.total_interest(amounts, rates, months), atol=1e-3)
+    assert np.all(plan.balance[np.arange(300), months - 1] == 0)
+    assert np.all(np.diff(plan.balance, axis=1)[plan.balance[:, 1:] > 0] < 0)
+
+    # Months past each loan's tenure are empty
+    past = np.arange(months.max())[None, :] >= months[:, None]
+    assert not plan.payment[past].any() and not plan.interest[past].any()
+
+
+def test_first_month_interest_is_on_the_full_principal():
+    plan = amortization.schedule(120000, 12, 12)
+    assert plan.interest[0, 0] == pytest.approx(1200)
+    assert plan.payment[0, 0] == pytest.approx(plan.interest[0, 0] + plan.principal[0, 0])
+
+
+def test_edge_cases_are_handled_in_one_place():
+    assert amortization.emi(120000, 0, 12) == pytest.approx(10000)
+    assert amortization.emi(120000, 10, 0) == 0
+    assert amortization.emi(120000, 10, -3) == 0
+    # Tiny rates converge to the flat split instead of losing precision
+    assert amortization.emi(120000, 1e-9, 12) == pytest.approx(10000, rel=1e-9)
+    # Very long tenures approach interest-only, without overflowing
+    assert amortization.emi(100000, 24, 100000) == pytest.approx(2000)
+
+
+def test_call_sites_match_previous_scalar_results():
+    for amount, rate, months in zip(*random_loans(50)):
+        amount, rate, months = float(amount), float(rate), int(months)
+        emi = scalar_emi(amount, rate, months)
+
+        analysis = LoanAnalyzerAgent().run(LoanDetailsInput(
+            amount=amount, interest_rate=rate, tenure_months=months, lender_name="X", purpose="Y", monthly_income=90000
+        ))
+        assert analysis.total_payable == pytest.approx(round(emi * months, 2), abs=0.011)
+
+        consolidation = DebtConsolidationAgent().run(DebtConsolidationInput(
+            existing_debts=[DebtItem(name="Card", amount=amount, interest_rate=36, monthly_payment=emi * 2)],
+            new_loan_amount=amount, new_loan_interest_rate=rate, new_loan_tenure_months=months
+        ))
+        assert consolidation.monthly_savings == pytest.approx(round(emi, 2), abs=0.011)
+
+        report = PDFReport({}, {"loan_amount": amount, "interest_rate": rate, "tenure_months": months}).calculate_technical_metrics()
+        assert report["emi"] == pytest.approx(emi, rel=1e-9)
+        assert report["total_interest"] == pytest.approx(emi * months - amount, abs=1e-3)
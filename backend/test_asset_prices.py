@@ -0,0 +1,80 @@
+import time
+
+from backend.utils.asset_prices import AssetPriceService, OZ_TO_GRAM
+
+QUOTES = {"GC=F": 2400.0, "SI=F": 30.0, "INR=X": 83.0}
+
+
+class StubFetcher:
+    def __init__(self, quotes=QUOTES):
+        self.quotes = dict(quotes)
+        self.calls = 0
+        self.fail = False
+
+    def __call__(self):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("yahoo down")
+        return dict(self.quotes)
+
+
+def wait_for(condition, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_first_request_is_instant_and_triggers_refresh():
+    fetcher = StubFetcher()
+    service = AssetPriceService(fetcher=fetcher, ttl=60)
+
+    rates = service.get_live_rates()
+    assert rates["Gold"]["source"] == "static_fallback"
+    assert wait_for(service.is_fresh)
+
+    rates = service.get_live_rates()
+    assert rates["Gold"]["source"] == "live"
+    assert rates["Gold"]["rate"] == round(2400.0 / OZ_TO_GRAM * 83.0, 2)
+    assert rates["Silver"]["as_of"] is not None
+    assert fetcher.calls == 1 # one batched fetch for all three tickers
+
+
+def test_stale_value_served_while_revalidating():
+    fetcher = StubFetcher()
+    service = AssetPriceService(fetcher=fetcher, ttl=0.05)
+    assert service.refresh()
+    time.sleep(0.06)
+
+    fetcher.quotes["GC=F"] = 2500.0
+    assert service.get_live_rates()["Gold"]["source"] == "stale"
+    assert wait_for(lambda: service.get_live_rates()["Gold"]["rate"] == round(2500.0 / OZ_TO_GRAM * 83.0, 2))
+
+
+def test_failed_refresh_keeps_last_good_value():
+    fetcher = StubFetcher()
+    service = AssetPriceService(fetcher=fetcher, ttl=0.01)
+    assert service.refresh()
+    good = service.get_live_rates()["Gold"]["rate"]
+
+    fetcher.fail = True
+    time.sleep(0.02)
+    assert not service.refresh()
+    rates = service.get_live_rates()
+    assert rates["Gold"]["rate"] == good
+    assert rates["Gold"]["source"] == "stale"
+
+
+def test_failing_upstream_is_retried_at_most_once_per_interval():
+    fetcher = StubFetcher()
+    fetcher.fail = True
+    service = AssetPriceService(fetcher=fetcher, ttl=0.01, retry_interval=0.3)
+
+    for _ in range(20):
+        assert service.get_live_rates()["Gold"]["source"] == "static_fallback"
+        time.sleep(0.005)
+    assert fetcher.calls == 1
+
+    time.sleep(0.3)
+    service.get_live_rates()
+    assert wait_for(lambda: fetcher.calls == 2)
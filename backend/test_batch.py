@@ -0,0 +1,148 @@
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+import backend.main as main
+from backend.models import CreditScoreInput, FinancialProfileInput, LoanDetailsInput, LoanNecessityInput
+
+client = TestClient(main.app)
+rnd = random.Random(23)
+
+PURPOSES = ["Medical emergency", "Home renovation", "Business equipment", "Vacation to Goa", "Child's SCHOOL fees",
+            "New phone", "Startups capital", "house"]
+
+
+def profile_record():
+    return {"income": rnd.choice([0, rnd.uniform(5000, 300000)]), "expenses": rnd.uniform(0, 150000),
+            "savings": rnd.uniform(0, 2000000), "assets": rnd.uniform(0, 5000000),
+            "existing_emis": rnd.uniform(0, 80000), "dependents": rnd.randint(0, 5)}
+
+
+def credit_record():
+    return {"missed_payments": rnd.randint(0, 4), "credit_utilization_ratio": rnd.random(),
+            "credit_age_years": rnd.uniform(0, 12), "active_loans": rnd.randint(0, 6),
+            "cibil_score": rnd.choice([None, 0, rnd.randint(300, 900)])}
+
+
+def necessity_record():
+    amount = rnd.uniform(10000, 1000000)
+    return {"loan_purpose": rnd.choice(PURPOSES), "loan_amount": amount,
+            "financial_stability_score": rnd.uniform(0, 100), "savings": rnd.uniform(0, amount * 2),
+            "emergency_fund": rnd.uniform(0, amount)}
+
+
+def loan_record():
+    return {"amount": rnd.uniform(10000, 5000000), "interest_rate": rnd.choice([0, rnd.uniform(6, 30)]),
+            "tenure_months": rnd.randint(1, 360), "lender_name": "Bank", "purpose": "Car",
+            "monthly_income": rnd.choice([0, rnd.uniform(10000, 400000)])}
+
+
+# Records sitting exactly on the rules' thresholds, where > and >= (or the scalar and vectorized paths) would part ways
+BOUNDARIES = {
+    "financial-profile": [
+        {"income": 10000, "expenses": 7000, "savings": 12000, "assets": 0, "existing_emis": 4000, "dependents": 0},
+        {"income": 10000, "expenses": 4000, "savings": 60000, "assets": 0, "existing_emis": 0, "dependents": 30},
+        {"income": 0, "expenses": 100, "savings": 0, "assets": 0, "existing_emis": 0, "dependents": 0},
+    ],
+    "credit-score": [
+        {"missed_payments": 0, "credit_utilization_ratio": 0.3, "credit_age_years": 2, "active_loans": 3},
+        {"missed_payments": 0, "credit_utilization_ratio": 0.3, "credit_age_years": 5, "active_loans": 4},
+        {"missed_payments": 1, "credit_utilization_ratio": 0.3, "credit_age_years": 3, "active_loans": 0},
+        *({"missed_payments": 4, "credit_utilization_ratio": 0.9, "credit_age_years": 0, "active_loans": 6, "cibil_score": c}
+          for c in (300, 301, 649, 650, 700, 750)),
+    ],
+    "loan-necessity": [
+        {"loan_purpose": "Business capital", "loan_amount": 100000, "financial_stability_score": s,
+         "savings": 100000, "emergency_fund": 50000} for s in (70, 70.1)
+    ] + [
+        {"loan_purpose": "Vacation", "loan_amount": 100000, "financial_stability_score": 50,
+         "savings": 130000, "emergency_fund": 20000},
+    ],
+    "loan-analyzer": [
+        {"amount": a, "interest_rate": r, "tenure_months": n, "lender_name": "Bank", "purpose": "Car", "monthly_income": 100000}
+        for a, r, n in ((360000, 0, 12), (600000, 0, 12), (1000000, 18, 60), (1000000, 18.01, 61), (0, 12, 24))
+    ],
+}
+
+CASES = [
+    ("financial-profile", FinancialProfileInput, main.financial_profile_agent, profile_record),
+    ("credit-score", CreditScoreInput, main.credit_score_agent, credit_record),
+    ("loan-necessity", LoanNecessityInput, main.loan_necessity_agent, necessity_record),
+    ("loan-analyzer", LoanDetailsInput, main.loan_analyzer_agent, loan_record),
+]
+
+
+@pytest.mark.parametrize("name,model,agent,make", CASES, ids=[c[0] for c in CASES])
+def test_batch_matches_single_record_runs(name, model, agent, make):
+    # run() is the plain-Python implementation, so it's an independent oracle for the vectorized one
+    records = [make() for _ in range(400)] + BOUNDARIES[name]
+    res = client.post(f"/agents/{name}/batch", json={"records": records})
+
+    assert res.status_code == 200
+    body = res.json()
+    assert body["count"] == len(records) and body["failed"] == 0
+    for i, (record, row) in enumerate(zip(records, body["results"])):
+        assert row["index"] == i
+        assert row["result"] == pytest.approx(agent.run(model(**record)).dict())
+
+
+def test_single_runs_keep_the_scoring_rules():
+    # Hand-worked results, so a rule change made in both implementations still shows up
+    profile = main.financial_profile_agent.run(FinancialProfileInput(
+        income=5000, expenses=3000, savings=1000, assets=0, existing_emis=500, dependents=2
+    ))
+    assert (profile.stability_score, profile.risk_flags) == (59.7, ["Low Liquid Savings"]) # 100 - 30 - 7 + 0.67 - 4
+
+    modelled = main.credit_score_agent.run(CreditScoreInput(
+        missed_payments=1, credit_utilization_ratio=0.8, credit_age_years=1, active_loans=4
+    ))
+    assert (modelled.score_band, modelled.approval_probability) == ("Poor", 0.35) # 0.95 - 0.2 - 0.25 - 0.1 - 0.05
+    reported = main.credit_score_agent.run(CreditScoreInput(
+        missed_payments=3, credit_utilization_ratio=0.8, credit_age_years=1, active_loans=4, cibil_score=720
+    ))
+    assert (reported.score_band, reported.approval_probability) == ("Good", 0.85)
+
+    # A zero amount has no interest ratio to flag (it used to raise ZeroDivisionError)
+    empty = main.loan_analyzer_agent.run(LoanDetailsInput(
+        amount=0, interest_rate=20, tenure_months=84, lender_name="", purpose="", monthly_income=50000
+    ))
+    assert (empty.burden_score, empty.total_payable) == (15.0, 0.0)
+    assert empty.hidden_traps == ["Long Tenure increases total cost", "Very High Interest Rate"]
+
+
+def test_batch_does_not_call_run(monkeypatch):
+    def fail(*_):
+        raise AssertionError("batch scoring must not loop run()")
+
+    for _, _, agent, _ in CASES:
+        monkeypatch.setattr(agent, "run", fail)
+    for name, _, _, make in CASES:
+        assert client.post(f"/agents/{name}/batch", json={"records": [make(), make()]}).status_code == 200
+
+
+def test_invalid_records_are_reported_in_place():
+    records = [credit_record(), {"missed_payments": "many"}, credit_record(), "not a record", credit_record()]
+    body = client.post("/agents/credit-score/batch", json={"records": records}).json()
+
+    assert body["count"] == 5 and body["failed"] == 2
+    assert [("result" in r and r["result"] is not None) for r in body["results"]] == [True, False, True, False, True]
+    fields = {e["field"] for e in body["results"][1]["errors"]}
+    assert {"missed_payments", "credit_utilization_ratio"} <= fields
+    assert body["results"][3]["errors"][0]["field"] == "__root__"
+    assert body["results"][4]["result"] == main.credit_score_agent.run(CreditScoreInput(**records[4])).dict()
+
+
+def test_all_invalid_and_empty_batches():
+    body = client.post("/agents/loan-analyzer/batch", json={"records": [{}]}).json()
+    assert body["failed"] == 1 and body["results"][0]["errors"]
+
+    assert client.post("/agents/loan-analyzer/batch", json={"records": []}).json() == {"count": 0, "failed": 0, "results": []}
+
+
+def test_unknown_agent_and_oversized_batches(monkeypatch):
+    assert client.post("/agents/decision-synthesis/batch", json={"records": []}).status_code == 404
+
+    monkeypatch.setattr(main, "BATCH_MAX_RECORDS", 2)
+    res = client.post("/agents/credit-score/batch", json={"records": [credit_record()] * 3})
+    assert res.status_code == 413
@@ -0,0 +1,176 @@
+import csv
+import random
+
+import pytest
+
+from backend import bulk_score
+from backend.agents.credit_score import CreditScoreAgent
+from backend.agents.decision_synthesis import DecisionSynthesisAgent
+from backend.agents.financial_profile import FinancialProfileAgent
+from backend.agents.loan_analyzer import LoanAnalyzerAgent
+from backend.agents.loan_necessity import LoanNecessityAgent
+from backend.agents.market_comparison import MarketComparisonAgent
+from backend.models import (
+    CreditScoreInput, DecisionSynthesisInput, FinancialProfileInput, LoanDetailsInput, LoanNecessityInput
+)
+
+rnd = random.Random(24)
+PURPOSES = ["Medical bills", "Home renovation", "Business expansion", "Wedding", "Car"]
+
+
+def applicant(i):
+    row = {
+        "id": f"A{i:05d}", "income": round(rnd.uniform(8000, 300000), 2), "expenses": round(rnd.uniform(2000, 150000), 2),
+        "savings": round(rnd.uniform(0, 2000000), 2), "emergency_fund": rnd.choice(["", round(rnd.uniform(0, 300000), 2)]),
+        "assets": round(rnd.uniform(0, 5000000), 2), "existing_emis": round(rnd.uniform(0, 60000), 2),
+        "dependents": rnd.randint(0, 4), "amount": round(rnd.uniform(20000, 3000000), 2),
+        "interest_rate": round(rnd.uniform(7, 26), 2), "tenure_months": rnd.randint(6, 240), "purpose": rnd.choice(PURPOSES),
+        "credit_score_band": "", "missed_payments": "", "credit_utilization_ratio": "", "credit_age_years": "",
+        "active_loans": "", "cibil_score": ""
+    }
+    if rnd.random() < 0.5:
+        row["credit_score_band"] = rnd.choice(["Excellent", "Good", "Fair", "Poor"])
+    else:
+        row.update(missed_payments=rnd.randint(0, 3), credit_utilization_ratio=round(rnd.random(), 2),
+                   credit_age_years=round(rnd.uniform(0, 10), 1), active_loans=rnd.randint(0, 5),
+                   cibil_score=rnd.choice(["", rnd.randint(550, 850)]))
+    return row
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def read_csv(path):
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def expected(row):
+    # The same chain /pipeline/evaluate runs, record by record, with the fallback verdict
+    clean = {k: v for k, v in row.items() if v != ""}
+    profile = FinancialProfileAgent().run(FinancialProfileInput(**clean))
+    loan = LoanDetailsInput(**clean, lender_name="", monthly_income=clean["income"])
+    analysis = LoanAnalyzerAgent().run(loan)
+    necessity = LoanNecessityAgent().run(LoanNecessityInput(
+        loan_purpose=loan.purpose, loan_amount=loan.amount, financial_stability_score=profile.stability_score,
+        savings=float(clean["savings"]), emergency_fund=float(clean.get("emergency_fund", 0))
+    ))
+    band = clean.get("credit_score_band") or CreditScoreAgent().run(CreditScoreInput(**clean)).score_band
+    # __new__: the fallback needs no LLM client
+    decision = DecisionSynthesisAgent.__new__(DecisionSynthesisAgent)._fallback_logic(DecisionSynthesisInput(
+        financial_stability_score=profile.stability_score, credit_score_band=band,
+        loan_burden_score=analysis.burden_score, loan_necessity_level=necessity.necessity_level,
+        market_is_fair=MarketComparisonAgent().run(loan).is_fair
+    ))
+    return {"stability_score": profile.stability_score, "credit_score_band": band, "burden_score": analysis.burden_score,
+            "total_payable": analysis.total_payable, "necessity_level": necessity.necessity_level,
+            "score": decision.score, "verdict": decision.verdict, "confidence": decision.confidence}
+
+
+@pytest.fixture
+def applicants(tmp_path):
+    rows = [applicant(i) for i in range(230)]
+    rows[17]["income"] = "lots"
+    rows[101].update(credit_score_band="", missed_payments="")
+    path = tmp_path / "applicants.csv"
+    write_csv(path, rows)
+    return rows, str(path)
+
+
+def test_bulk_scores_match_the_record_by_record_pipeline(applicants, tmp_path):
+    rows, path = applicants
+    out = str(tmp_path / "scored.csv")
+    state = bulk_score.run(path, out, chunk_rows=50, workers=1, quiet=True)
+
+    scored = read_csv(out)
+    assert state["rows_done"] == len(scored) == 230
+    assert state["failed"] == 2
+    assert [int(r["row"]) for r in scored] == list(range(230))
+    assert [r["id"] for r in scored] == [r["id"] for r in rows]
+    assert "income" in scored[17]["error"]
+    assert "credit_score_band" in scored[101]["error"]
+
+    for row, result in zip(rows, scored):
+        if result["error"]:
+            continue
+        want = expected(row)
+        for key in ("stability_score", "burden_score", "total_payable", "score", "confidence"):
+            assert float(result[key]) == pytest.approx(want[key]), key
+        for key in ("credit_score_band", "necessity_level", "verdict"):
+            assert result[key] == want[key]
+    assert not (tmp_path / "scored.csv.checkpoint.json").exists()
+
+
+def test_resume_continues_from_last_completed_chunk(applicants, tmp_path, monkeypatch):
+    _, path = applicants
+    reference = str(tmp_path / "reference.csv")
+    bulk_score.run(path, reference, chunk_rows=40, workers=1, quiet=True)
+
+    out = str(tmp_path / "scored.csv")
+    real = bulk_score.score_chunk
+    seen = []
+
+    def crash_on_fourth(chunk):
+        seen.append(chunk[0])
+        if chunk[0] == 3:
+            raise RuntimeError("worker died")
+        return real(chunk)
+
+    monkeypatch.setattr(bulk_score, "score_chunk", crash_on_fourth)
+    with pytest.raises(RuntimeError):
+        bulk_score.run(path, out, chunk_rows=40, workers=1, quiet=True)
+    # Simulate a torn write after the last checkpoint
+    with open(out, "a") as f:
+        f.write("999,partial")
+
+    seen.clear()
+    monkeypatch.setattr(bulk_score, "score_chunk", lambda chunk: seen.append(chunk[0]) or real(chunk))
+    state = bulk_score.run(path, out, chunk_rows=40, workers=1, resume=True, quiet=True)
+
+    assert seen[0] == 3
+    assert state["rows_done"] == 230
+    assert open(out).read() == open(reference).read()
+
+
+def test_resume_refuses_a_different_chunking(applicants, tmp_path, monkeypatch):
+    _, path = applicants
+    out = str(tmp_path / "scored.csv")
+    monkeypatch.setattr(bulk_score, "score_chunk", lambda chunk: (_ for _ in ()).throw(RuntimeError("stop")))
+    with pytest.raises(RuntimeError):
+        bulk_score.run(path, out, chunk_rows=40, workers=1, quiet=True)
+
+    with pytest.raises(SystemExit, match="different input or --chunk-rows"):
+        bulk_score.run(path, out, chunk_rows=50, workers=1, resume=True, quiet=True)
+
+
+def test_process_pool_output_is_in_input_order(applicants, tmp_path):
+    _, path = applicants
+    inline, pooled = str(tmp_path / "inline.csv"), str(tmp_path / "pooled.csv")
+    bulk_score.run(path, inline, chunk_rows=25, workers=1, quiet=True)
+    bulk_score.run(path, pooled, chunk_rows=25, workers=2, quiet=True)
+
+    assert open(pooled).read() == open(inline).read()
+
+
+def test_parquet_dataset_output(applicants, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    _, path = applicants
+    out = str(tmp_path / "scored.parquet")
+    bulk_score.run(path, out, chunk_rows=100, workers=1, quiet=True)
+
+    table = pq.read_table(out)
+    assert table.num_rows == 230
+    assert table.column("row").to_pylist() == list(range(230))
+
+
+def test_cli_reports_progress(applicants, tmp_path, capsys):
+    _, path = applicants
+    assert bulk_score.main([path, str(tmp_path / "out.csv"), "--chunk-rows", "100", "--workers", "1"]) == 0
+
+    err = capsys.readouterr().err
+    assert "230/230 rows (100%)" in err and "rows/s" in err and "ETA" in err
+    assert "Scored 230 rows" in err and "(2 rejected)" in err
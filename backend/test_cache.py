@@ -0,0 +1,38 @@
+import time
+
+from backend.utils.cache import TTLCache, SqliteCache, TieredCache, canonical_hash
+
+
+def test_canonical_hash_ignores_key_order_and_float_noise():
+    assert canonical_hash({"a": 1, "b": [1.0, "x"]}) == canonical_hash({"b": [1, "x"], "a": 1.0000000001})
+    assert canonical_hash({"a": 1}) != canonical_hash({"a": 2})
+    assert canonical_hash({"a": True}) != canonical_hash({"a": 1})
+
+
+def test_lru_eviction_and_ttl():
+    cache = TTLCache(max_size=2, ttl=0.1)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None # least recently used
+    assert cache.get("a") == 1
+    time.sleep(0.15)
+    assert cache.get("a") is None
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    TieredCache("t", TTLCache(), SqliteCache(path)).set("k", {"verdict": "Safe"})
+
+    fresh = TieredCache("t", TTLCache(), SqliteCache(path))
+    assert fresh.get("k") == {"verdict": "Safe"}
+    assert fresh.memory.get("k") == {"verdict": "Safe"} # promoted
+
+
+def test_disk_tier_ttl(tmp_path):
+    disk = SqliteCache(str(tmp_path / "cache.sqlite"), ttl=0.05)
+    disk.set("k", [1, 2])
+    assert disk.get("k") == [1, 2]
+    time.sleep(0.1)
+    assert disk.get("k") is None
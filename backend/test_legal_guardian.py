@@ -0,0 +1,321 @@
+import asyncio
+import json
+import re
+import time
+from types import SimpleNamespace
+
+import pytest
+from fpdf import FPDF
+
+from backend.agents.legal_guardian import LegalGuardianAgent
+from backend.agents import legal_guardian
+from backend.utils.clauses import chunk_clauses, dedupe, prefilter, segment_clauses, select_for_review
+from backend.utils.cache import TieredCache, TTLCache
+from backend.utils.llm_client import LLMClient
+from backend.utils.metrics import metrics
+
+
+@pytest.fixture(autouse=True)
+def review_cache(monkeypatch):
+    cache = TieredCache("legal.review_cache", TTLCache(max_size=64, ttl=None))
+    monkeypatch.setattr(legal_guardian, "review_cache", cache)
+    return cache
+
+FILLER = "The Borrower shall keep the Bank informed of any change in address, employment or contact details."
+
+AGREEMENT = "\n".join(
+    ["LOAN AGREEMENT", "This agreement is made between ABC Bank and the Borrower."]
+    + [f"{n}. {FILLER} {FILLER}" for n in range(1, 60)]
+    + [
+        "60. The rate of interest is floating and linked to the MCLR and may be revised at the sole discretion of the Bank.",
+        "61. The Borrower may foreclose the loan after 12 months on payment of a foreclosure charge of 4% of the principal outstanding.",
+        "62. Penal interest of 2% per month shall be levied on overdue amounts. Cheque bounce charges of Rs. 500 apply.",
+        "63. Any dispute shall be referred to a sole arbitrator appointed by the Bank, whose award shall be final and binding.",
+        "64. This agreement is governed by the laws of India.",
+    ]
+)
+
+
+def make_pdf(text: str, title: str = "Loan Agreement") -> bytes:
+    pdf = FPDF()
+    pdf.set_title(title)
+    pdf.set_font("Helvetica", size=10)
+    pdf.add_page()
+    for line in text.splitlines():
+        pdf.multi_cell(0, 5, line, new_x="LMARGIN", new_y="NEXT")
+    return bytes(pdf.output())
+
+
+class FakeReviewModels:
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, model, contents, config=None):
+        self.prompts.append(contents)
+        return SimpleNamespace(text=json.dumps({
+            "clauses": [{"id": "C63", "risk_level": "High", "explanation": "Court access is waived.", "recommendation": "Negotiate it out."}],
+            "overall_risk": "Danger",
+            "summary": "Arbitration and penal charges favour the lender."
+        }))
+
+
+class FakeChunkModels:
+    """Answers every clause id in the prompt; tracks how many calls overlap."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.prompts = []
+        self.active = 0
+        self.peak = 0
+
+    def _answer(self, contents):
+        ids = re.findall(r"'id': '(C\d+)'", contents)
+        return SimpleNamespace(text=json.dumps({
+            "clauses": [{"id": i, "risk_level": "Medium", "explanation": f"Reviewed {i}.", "recommendation": "Ask."} for i in ids],
+            "overall_risk": "Caution",
+            "summary": f"Chunk with {len(ids)} clauses."
+        }))
+
+    def generate_content(self, model, contents, config=None):
+        self.prompts.append(contents)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        self.active -= 1
+        return self._answer(contents)
+
+
+class FakeAsyncChunkModels(FakeChunkModels):
+    async def generate_content(self, model, contents, config=None):
+        self.prompts.append(contents)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        return self._answer(contents)
+
+
+def make_agent(with_llm=True, models=None):
+    llm = LLMClient.__new__(LLMClient)
+    if with_llm:
+        llm.model_name = "fake-model"
+        models = models or FakeReviewModels()
+        llm.client = SimpleNamespace(models=models, aio=SimpleNamespace(models=models))
+    agent = LegalGuardianAgent.__new__(LegalGuardianAgent)
+    agent.llm = llm
+    agent.max_parallel = legal_guardian.LEGAL_MAX_PARALLEL_CHUNKS
+    agent.chunk_timeout = legal_guardian.LEGAL_CHUNK_TIMEOUT_S
+    agent.chunk_tokens = legal_guardian.LEGAL_CHUNK_TOKENS
+    return agent
+
+
+LONG_AGREEMENT = "\n".join(
+    f"{n}. Penal interest of {n % 5 + 1}% per month is charged on overdue instalment number {n}. {FILLER}"
+    for n in range(1, 41)
+)
+
+
+def test_segments_numbered_clauses():
+    clauses = segment_clauses(AGREEMENT)
+    assert clauses[0].number == "0" # Preamble before the first heading
+    assert [c.number for c in clauses[-5:]] == ["60", "61", "62", "63", "64"]
+
+    nested = segment_clauses("2. Interest\n2.1 Floating rate applies.\n2.2 Payable monthly.\nClause 3 Disputes go to court.")
+    assert [c.number for c in nested] == ["2", "2.1", "2.2", "Clause 3"]
+
+
+def test_unnumbered_text_falls_back_to_paragraphs():
+    clauses = segment_clauses("First paragraph about fees.\n\nSecond paragraph about arbitration.")
+    assert [c.number for c in clauses] == ["¶1", "¶2"]
+
+
+def test_prefilter_flags_each_predatory_category():
+    clauses = {c.number: c for c in prefilter(AGREEMENT)}
+
+    assert set(clauses["60"].categories) == {"floating_rate"}
+    assert set(clauses["61"].categories) == {"prepayment"}
+    assert set(clauses["62"].categories) == {"late_fee"}
+    assert set(clauses["63"].categories) == {"arbitration"}
+    assert clauses["63"].risk_level == "High"
+    assert not clauses["64"].flagged
+    assert not clauses["1"].flagged
+
+
+def test_selection_respects_budget_and_keeps_document_order():
+    clauses = prefilter(AGREEMENT)
+    chosen = select_for_review(clauses, budget_tokens=60)
+    assert 1 <= len(chosen) < 4
+    assert chosen == sorted(chosen, key=lambda c: c.index)
+    assert sum(len(c.text) // 4 + 1 for c in chosen) <= 60 or len(chosen) == 1
+
+
+def test_clauses_past_ten_thousand_chars_reach_the_llm():
+    assert len(AGREEMENT) > 10000
+    agent = make_agent()
+    out = agent.run(make_pdf(AGREEMENT))
+
+    prompt = agent.llm.client.models.prompts[0]
+    assert "sole arbitrator" in prompt
+    assert FILLER not in prompt # Unflagged clauses stay local
+    assert len(prompt) < 4000
+
+    assert out.source == "llm"
+    assert out.overall_risk == "Danger"
+    assert out.clauses_flagged == 4
+    assert out.clauses_total > 60
+    assert out.risk_clauses[0].clause_number == "63"
+    assert out.risk_clauses[0].explanation == "Court access is waived."
+    # Clauses the model didn't cover keep the local assessment
+    assert {rc.clause_number for rc in out.risk_clauses} == {"60", "61", "62", "63"}
+
+
+def test_local_fallback_without_llm():
+    out = asyncio.run(make_agent(with_llm=False).arun(make_pdf(AGREEMENT)))
+
+    assert out.source == "local"
+    assert out.clauses_flagged == 4
+    assert out.overall_risk == "Danger"
+    assert all(rc.explanation and rc.recommendation for rc in out.risk_clauses)
+    assert out.risk_clauses[0].risk_level == "High"
+
+
+def test_clean_agreement_skips_the_llm():
+    agent = make_agent()
+    out = agent.run(make_pdf("1. The loan is for a car.\n2. The Borrower shall insure the car."))
+    assert agent.llm.client.models.prompts == []
+    assert out.overall_risk == "Safe"
+    assert out.risk_clauses == []
+
+
+def test_duplicate_clauses_are_reviewed_once():
+    text = AGREEMENT + "\n65. Any dispute shall be referred to a sole arbitrator appointed by the Bank, whose award shall be final and binding."
+    clauses = prefilter(text)
+    assert len([c for c in clauses if c.flagged]) == 5
+    assert [c.number for c in dedupe(clauses)] == ["60", "61", "62", "63"]
+
+
+def test_chunks_respect_token_budget_and_order():
+    review = select_for_review(prefilter(LONG_AGREEMENT))
+    chunks = chunk_clauses(review, chunk_tokens=200)
+    assert len(chunks) > 5
+    assert [c for chunk in chunks for c in chunk] == review
+    assert all(sum(len(c.text) // 4 + 1 for c in chunk) <= 200 for chunk in chunks if len(chunk) > 1)
+
+
+def test_chunks_are_reviewed_concurrently_with_bounded_parallelism():
+    models = FakeAsyncChunkModels(delay=0.1)
+    agent = make_agent(models=models)
+    agent.chunk_tokens = 200
+    agent.max_parallel = 4
+    progress = []
+
+    started = time.perf_counter()
+    out = asyncio.run(agent.arun(make_pdf(LONG_AGREEMENT), on_progress=progress.append))
+    elapsed = time.perf_counter() - started
+
+    chunks = out.chunks
+    assert chunks > 5
+    assert len(models.prompts) == chunks
+    assert models.peak == 4
+    # ~ceil(chunks / 4) rounds of 0.1s, not chunks * 0.1s
+    assert elapsed < 0.1 * chunks * 0.75
+
+    assert sorted(p["chunk"] for p in progress) == list(range(1, chunks + 1))
+    assert all(p["chunks"] == chunks and p["status"] == "done" for p in progress)
+
+    assert out.source == "llm"
+    assert out.clauses_flagged == 40
+    assert len(out.risk_clauses) == 40
+    assert all(rc.explanation.startswith("Reviewed C") for rc in out.risk_clauses)
+    assert out.summary.startswith("40 of 40 clauses need attention")
+
+
+def test_sync_path_bounds_parallelism_and_reports_progress():
+    models = FakeChunkModels(delay=0.05)
+    agent = make_agent(models=models)
+    agent.chunk_tokens = 200
+    agent.max_parallel = 2
+    progress = []
+
+    out = agent.run(make_pdf(LONG_AGREEMENT), on_progress=progress.append)
+    assert models.peak <= 2
+    assert len(progress) == out.chunks == len(models.prompts)
+    assert len(out.risk_clauses) == 40
+
+
+def test_merge_keeps_riskiest_reading_and_worst_overall():
+    agent = make_agent(with_llm=False)
+    merged = agent._merge([
+        {"clauses": [{"id": "C1", "risk_level": "Low", "explanation": "a", "recommendation": "b"}], "overall_risk": "Safe"},
+        None,
+        {"clauses": [{"id": "C1", "risk_level": "High", "explanation": "c", "recommendation": "d"}], "overall_risk": "Danger"},
+    ])
+    assert merged["C1"]["risk_level"] == "High"
+
+
+def test_legal_guardian_streams_ndjson_progress(monkeypatch):
+    from fastapi.testclient import TestClient
+    import backend.main as main
+
+    agent = make_agent(models=FakeAsyncChunkModels())
+    agent.chunk_tokens = 200
+    monkeypatch.setattr(main, "get_legal_guardian_agent", lambda: agent)
+
+    res = TestClient(main.app).post(
+        "/agents/legal-guardian?stream=true",
+        files={"file": ("agreement.pdf", make_pdf(LONG_AGREEMENT), "application/pdf")}
+    )
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in res.text.splitlines()]
+    assert [e["type"] for e in events[:-1]] == ["progress"] * (len(events) - 1)
+    assert events[-1]["type"] == "result"
+    assert events[-1]["data"]["chunks"] == len(events) - 1
+
+
+def test_identical_upload_is_served_from_cache():
+    agent = make_agent()
+    data = make_pdf(AGREEMENT)
+    saved = metrics.counter("legal.cache.bytes_saved")
+
+    first = agent.run(data)
+    second = agent.run(data)
+
+    assert len(agent.llm.client.models.prompts) == 1
+    assert first.cached is None
+    assert second.cached == "raw"
+    assert second.risk_clauses == first.risk_clauses
+    assert metrics.counter("legal.cache.bytes_saved") - saved == len(data)
+
+
+def test_same_text_in_a_different_file_hits_the_text_key():
+    agent = make_agent(models=FakeAsyncChunkModels())
+    original = make_pdf(AGREEMENT)
+    reexported = make_pdf(AGREEMENT.upper(), title="Scanned copy")
+    assert original != reexported
+
+    asyncio.run(agent.arun(original))
+    out = asyncio.run(agent.arun(reexported))
+    assert out.cached == "text"
+    assert len(agent.llm.client.models.prompts) == 1
+
+    # ...and that file now hits before extraction
+    assert asyncio.run(agent.arun(reexported)).cached == "raw"
+
+
+def test_force_reanalyses_and_refreshes_the_cache():
+    agent = make_agent()
+    data = make_pdf(AGREEMENT)
+    agent.run(data)
+    out = agent.run(data, force=True)
+
+    assert out.cached is None
+    assert len(agent.llm.client.models.prompts) == 2
+
+
+def test_local_fallback_reviews_are_not_cached(review_cache):
+    agent = make_agent(with_llm=False)
+    data = make_pdf(AGREEMENT)
+    agent.run(data)
+    assert len(review_cache.memory) == 0
+    assert agent.run(data).cached is None
@@ -0,0 +1,359 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+from backend.utils.llm_client import LLMClient, verdict_cache
+from backend.agents.decision_synthesis import DecisionSynthesisAgent
+from backend.models import DecisionSynthesisInput
+
+VERDICT = {
+    "verdict": "Safe",
+    "confidence": 0.9,
+    "explanation": "Comfortable repayment.",
+    "score": 82,
+    "suggestions": [],
+    "financial_tips": ["Keep saving."]
+}
+
+
+class FakeModels:
+    def __init__(self, delay=0.0, payload=VERDICT):
+        self.delay = delay
+        self.payload = payload
+        self.calls = 0
+
+    def generate_content(self, model, contents, config=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        return SimpleNamespace(text=json.dumps(self.payload))
+
+
+class FakeAsyncModels(FakeModels):
+    async def generate_content(self, model, contents, config=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return SimpleNamespace(text=json.dumps(self.payload))
+
+
+def make_client(delay=0.0, payload=VERDICT):
+    verdict_cache.clear()
+    llm = LLMClient.__new__(LLMClient)
+    llm.model_name = "fake-model"
+    llm.client = SimpleNamespace(
+        models=FakeModels(delay, payload),
+        aio=SimpleNamespace(models=FakeAsyncModels(delay, payload))
+    )
+    return llm
+
+
+def decision_input(**overrides):
+    data = dict(
+        financial_stability_score=60,
+        credit_score_band="Good",
+        loan_burden_score=40,
+        loan_necessity_level="Medium",
+        market_is_fair=True
+    )
+    data.update(overrides)
+    return DecisionSynthesisInput(**data)
+
+
+def make_decision_agent(delay=0.0, budget_s=5.0, threshold=3, cooldown_s=30.0):
+    from backend.utils.circuit_breaker import CircuitBreaker
+
+    agent = DecisionSynthesisAgent.__new__(DecisionSynthesisAgent)
+    agent.llm = make_client(delay=delay)
+    agent.breaker = CircuitBreaker("test.breaker", failure_threshold=threshold, cooldown_s=cooldown_s)
+    agent.budget_s = budget_s
+    return agent
+
+
+def test_async_verdict_uses_async_transport():
+    llm = make_client()
+    result = asyncio.run(llm.agenerate_verdict_json({"x": 1}))
+    assert result["verdict"] == "Safe"
+    assert llm.client.aio.models.calls == 1
+    assert llm.client.models.calls == 0
+
+
+def test_concurrent_arun_calls_overlap():
+    agent = make_decision_agent(delay=0.2)
+
+    async def burst():
+        return await asyncio.gather(*(agent.arun(decision_input()) for _ in range(20)))
+
+    started = time.perf_counter()
+    outputs = asyncio.run(burst())
+    assert all(o.verdict == "Safe" for o in outputs)
+    assert time.perf_counter() - started < 1.0
+
+
+def make_mentor(script_delay, explanation_delay=0.05):
+    from backend.agents.financial_mentor import FinancialMentorAgent
+
+    llm = make_client()
+
+    def delay_for(contents):
+        return script_delay if "Negotiation" in contents else explanation_delay
+
+    def generate(model, contents, config=None):
+        time.sleep(delay_for(contents))
+        return SimpleNamespace(text="text")
+
+    async def agenerate(model, contents, config=None):
+        await asyncio.sleep(delay_for(contents))
+        return SimpleNamespace(text="text")
+
+    llm.client.models.generate_content = generate
+    llm.client.aio.models.generate_content = agenerate
+
+    agent = FinancialMentorAgent.__new__(FinancialMentorAgent)
+    agent.llm = llm
+    agent.explanation_timeout = 0.5
+    agent.script_timeout = 0.5
+    return agent
+
+
+def mentor_input():
+    from backend.models import FinancialMentorInput, DecisionSynthesisOutput
+    decision = DecisionSynthesisOutput(verdict="Risky", confidence=0.7, explanation="x", score=50)
+    return FinancialMentorInput(financial_profile={"income": 5000}, decision_synthesis=decision)
+
+
+def test_mentor_generations_run_concurrently():
+    agent = make_mentor(script_delay=0.3, explanation_delay=0.3)
+    for run in (agent.run, lambda data: asyncio.run(agent.arun(data))):
+        started = time.perf_counter()
+        out = run(mentor_input())
+        assert time.perf_counter() - started < 0.5
+        assert out.recovery_plan == "text"
+        assert out.negotiation_script == "text"
+        assert out.missing_sections == []
+
+
+def test_mentor_returns_partial_result_on_timeout():
+    agent = make_mentor(script_delay=2.0)
+    for run in (agent.run, lambda data: asyncio.run(agent.arun(data))):
+        started = time.perf_counter()
+        out = run(mentor_input())
+        assert time.perf_counter() - started < 1.0
+        assert out.recovery_plan == "text"
+        assert out.negotiation_script == ""
+        assert out.missing_sections == ["negotiation_script"]
+
+
+def test_agents_share_one_llm_client():
+    from backend.utils.llm_client import get_llm_client
+    from backend.agents.financial_mentor import FinancialMentorAgent
+    from backend.agents.legal_guardian import LegalGuardianAgent
+
+    shared = get_llm_client()
+    assert DecisionSynthesisAgent().llm is shared
+    assert FinancialMentorAgent().llm is shared
+    assert LegalGuardianAgent().llm is shared
+
+
+def test_client_uses_bounded_keepalive_pool(monkeypatch):
+    import httpx
+    import google.genai as genai
+    from backend.utils import llm_client
+
+    built = {}
+
+    class RecordingClient(httpx.Client):
+        def __init__(self, **kwargs):
+            built["sync"] = kwargs
+            super().__init__(**kwargs)
+
+    class RecordingAsyncClient(httpx.AsyncClient):
+        def __init__(self, **kwargs):
+            built["async"] = kwargs
+            super().__init__(**kwargs)
+
+    monkeypatch.setattr(httpx, "Client", RecordingClient)
+    monkeypatch.setattr(httpx, "AsyncClient", RecordingAsyncClient)
+    monkeypatch.setattr(genai, "Client", lambda api_key, http_options: SimpleNamespace(http_options=http_options))
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+
+    options = LLMClient().client.http_options
+    assert isinstance(options.httpx_client, RecordingClient)
+    assert isinstance(options.httpx_async_client, RecordingAsyncClient)
+    for kwargs in built.values():
+        limits = kwargs["limits"]
+        assert limits.max_connections == llm_client.LLM_MAX_CONNECTIONS > 0
+        assert limits.max_keepalive_connections == llm_client.LLM_MAX_KEEPALIVE
+        assert limits.keepalive_expiry == llm_client.LLM_KEEPALIVE_EXPIRY_S > 0
+
+
+def test_per_call_timeout_is_forwarded():
+    llm = make_client()
+    seen = {}
+
+    def generate(model, contents, config=None):
+        seen["config"] = config
+        return SimpleNamespace(text="ok")
+
+    llm.client.models.generate_content = generate
+    llm.generate_explanation({"x": 1}, timeout=2.5)
+    assert seen["config"] == {"http_options": {"timeout": 2500}}
+
+
+def test_identical_verdict_requests_hit_the_cache():
+    llm = make_client()
+    first = llm.generate_verdict_json({"score": 70, "band": "Good"})
+    second = llm.generate_verdict_json({"band": "Good", "score": 70.0})
+    third = asyncio.run(llm.agenerate_verdict_json({"band": "Good", "score": 70.0000000001}))
+    assert first == second == third == VERDICT
+    assert llm.client.models.calls == 1
+    assert llm.client.aio.models.calls == 0
+
+
+def test_failed_verdicts_are_not_cached():
+    llm = make_client()
+
+    def broken(model, contents, config=None):
+        raise RuntimeError("quota exceeded")
+
+    original = llm.client.models.generate_content
+    llm.client.models.generate_content = broken
+    assert llm.generate_verdict_json({"a": 1}) == LLMClient.FAILED_VERDICT
+
+    llm.client.models.generate_content = original
+    assert llm.generate_verdict_json({"a": 1}) == VERDICT
+
+
+def test_identical_in_flight_prompts_share_one_call():
+    llm = make_client(delay=0.2)
+
+    async def burst():
+        return await asyncio.gather(*(llm.agenerate_explanation({"same": True}) for _ in range(10)))
+
+    results = asyncio.run(burst())
+    assert len(set(results)) == 1
+    assert llm.client.aio.models.calls == 1
+
+
+def test_sync_callers_share_result_and_error():
+    from concurrent.futures import ThreadPoolExecutor
+
+    llm = make_client()
+    calls = []
+
+    def failing(model, contents, config=None):
+        calls.append(contents)
+        time.sleep(0.2)
+        raise RuntimeError("upstream 503")
+
+    llm.client.models.generate_content = failing
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        errors = list(pool.map(lambda _: _raises(lambda: llm._generate("same prompt")), range(5)))
+
+    assert len(calls) == 1
+    assert all("upstream 503" in e for e in errors)
+
+
+def _raises(fn):
+    try:
+        fn()
+    except Exception as e:
+        return str(e)
+    return ""
+
+
+def test_slow_llm_falls_back_within_budget():
+    agent = make_decision_agent(delay=1.0, budget_s=0.1)
+    for run in (agent.run, lambda data: asyncio.run(agent.arun(data))):
+        started = time.perf_counter()
+        out = run(decision_input(financial_stability_score=61))
+        assert time.perf_counter() - started < 0.5
+        assert out.source == "fallback"
+
+
+def test_breaker_skips_llm_after_repeated_timeouts():
+    agent = make_decision_agent(delay=1.0, budget_s=0.05, threshold=2, cooldown_s=60)
+    for i in range(2):
+        asyncio.run(agent.arun(decision_input(loan_burden_score=10 + i)))
+    assert agent.breaker.state == "open"
+
+    calls_before = agent.llm.client.aio.models.calls
+    started = time.perf_counter()
+    out = asyncio.run(agent.arun(decision_input(loan_burden_score=42)))
+    assert time.perf_counter() - started < 0.05
+    assert out.source == "fallback"
+    assert agent.llm.client.aio.models.calls == calls_before
+
+
+def test_breaker_half_open_trial_closes_on_success():
+    agent = make_decision_agent(budget_s=1.0, threshold=1, cooldown_s=0.05)
+    agent.breaker.record_failure()
+    assert agent.breaker.state == "open"
+    time.sleep(0.06)
+    out = agent.run(decision_input())
+    assert out.source == "llm"
+    assert agent.breaker.state == "closed"
+
+
+
+def test_cancelled_half_open_trial_frees_the_breaker():
+    agent = make_decision_agent(delay=1.0, budget_s=5.0, threshold=1, cooldown_s=0.05)
+    agent.breaker.record_failure()
+    time.sleep(0.06)
+
+    async def cancel_trial():
+        trial = asyncio.create_task(agent.arun(decision_input()))
+        await asyncio.sleep(0.05)
+        trial.cancel()
+        try:
+            await trial
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(cancel_trial())
+    time.sleep(0.06)
+    agent.llm = make_client()
+    out = asyncio.run(agent.arun(decision_input()))
+    assert out.source == "llm"
+    assert agent.breaker.state == "closed"
+
+
+def test_failed_half_open_trial_reopens_the_breaker():
+    agent = make_decision_agent(budget_s=1.0, threshold=1, cooldown_s=0.05)
+    agent.breaker.record_failure()
+    time.sleep(0.06)
+
+    def broken(context, timeout=None):
+        raise RuntimeError("bad response")
+
+    agent.llm.generate_verdict_json = broken
+    assert _raises(lambda: agent.run(decision_input())) == "bad response"
+    assert agent.breaker.state == "open"
+
+    time.sleep(0.06)
+    agent.llm = make_client()
+    assert agent.run(decision_input()).source == "llm"
+
+def test_hard_rules_skip_the_llm():
+    agent = make_decision_agent()
+    dangerous = agent.run(decision_input(loan_burden_score=85))
+    poor = asyncio.run(agent.arun(decision_input(credit_score_band="Poor", financial_stability_score=90)))
+    safe = agent.run(decision_input(financial_stability_score=80, loan_burden_score=20))
+
+    assert (dangerous.verdict, dangerous.source) == ("Dangerous", "rules")
+    assert (poor.verdict, poor.source) == ("Dangerous", "rules")
+    assert poor.score <= 44
+    assert (safe.verdict, safe.source) == ("Safe", "rules")
+    assert safe.score >= 65
+    assert dangerous.financial_tips and safe.financial_tips
+    assert agent.llm.client.models.calls == 0
+    assert agent.llm.client.aio.models.calls == 0
+
+
+def test_borderline_or_prose_requests_use_the_llm():
+    agent = make_decision_agent()
+    unfair_market = agent.run(decision_input(financial_stability_score=80, loan_burden_score=20, market_is_fair=False))
+    prose = agent.run(decision_input(loan_burden_score=85, detailed_explanation=True))
+    malayalam = asyncio.run(agent.arun(decision_input(loan_burden_score=85, language="ml")))
+    assert unfair_market.source == "llm"
+    assert prose.source == "llm"
+    assert malayalam.source == "llm"
@@ -0,0 +1,93 @@
+import os
+
+import pytest
+from fpdf import FPDF
+
+from backend.utils import pdf_text
+from backend.utils.pdf_text import PDFLimitError, extract_text
+from backend.utils.uploads import SpooledUpload
+
+
+def make_pdf(pages: int, lines_per_page: int = 20) -> bytes:
+    pdf = FPDF()
+    pdf.set_font("Helvetica", size=10)
+    for p in range(pages):
+        pdf.add_page()
+        for line in range(lines_per_page):
+            pdf.cell(0, 6, f"Page {p + 1} clause {line + 1}: the borrower shall pay interest monthly.", new_x="LMARGIN", new_y="NEXT")
+    return bytes(pdf.output())
+
+
+def test_serial_extraction_reads_pages_in_order():
+    result = extract_text(make_pdf(3), max_chars=100000)
+
+    assert result.mode == "serial"
+    assert result.pages_total == result.pages_read == 3
+    assert not result.truncated
+    assert result.text.index("Page 1 clause 1") < result.text.index("Page 3 clause 20")
+    assert [t["page"] for t in result.page_timings] == [1, 2, 3]
+    assert all(t["chars"] > 0 for t in result.page_timings)
+
+
+def test_extraction_stops_once_budget_is_met():
+    result = extract_text(make_pdf(10), max_chars=2000)
+
+    assert result.truncated
+    assert 1 < result.pages_read < 10
+    assert len(result.text) >= 2000
+    assert "Page 10 clause" not in result.text
+
+
+def test_limits_are_enforced():
+    data = make_pdf(5)
+    with pytest.raises(PDFLimitError):
+        extract_text(data, max_pages=4)
+    with pytest.raises(PDFLimitError):
+        extract_text(data, max_bytes=len(data) - 1)
+
+
+def test_parallel_extraction_matches_serial(monkeypatch):
+    monkeypatch.setattr(pdf_text, "PDF_WORKERS", 2)
+    monkeypatch.setattr(pdf_text, "PDF_PAGES_PER_TASK", 2)
+    data = make_pdf(12)
+
+    serial = extract_text(data, max_chars=10 ** 6)
+    parallel = extract_text(data, max_chars=10 ** 6, parallel_min_pages=4)
+    assert parallel.mode == "parallel"
+    assert parallel.text == serial.text
+    assert [t["page"] for t in parallel.page_timings] == list(range(1, 13))
+
+    # Budget met after the first wave (2 tasks x 2 pages): nothing else is submitted
+    early = extract_text(data, max_chars=3000, parallel_min_pages=4)
+    assert early.truncated
+    assert early.pages_read <= 4
+
+
+def test_legal_guardian_reports_extraction_stats():
+    from backend.agents.legal_guardian import LegalGuardianAgent
+
+    agent = LegalGuardianAgent.__new__(LegalGuardianAgent)
+    out = agent._extract_text(SpooledUpload.from_bytes(make_pdf(2)))
+    assert out.stats()["pages_read"] == 2
+
+    error = agent._extract_text(SpooledUpload.from_bytes(b"not a pdf"))
+    assert error.overall_risk == "Error"
+
+
+def test_spooled_file_is_read_from_disk(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_text, "PDF_WORKERS", 2)
+    data = make_pdf(6)
+    upload = SpooledUpload(spool_bytes=1024)
+    for i in range(0, len(data), 700):
+        upload.write(data[i:i + 700])
+    upload.finish()
+    path = upload.path
+    assert path is not None
+
+    try:
+        serial = extract_text(upload.source(), max_chars=10 ** 6)
+        parallel = extract_text(upload.source(), max_chars=10 ** 6, parallel_min_pages=2)
+        assert serial.text == parallel.text == extract_text(data, max_chars=10 ** 6).text
+    finally:
+        upload.close()
+    assert not os.path.exists(path)
@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.utils.pipeline import Stage, run_pipeline
+
+client = TestClient(app)
+
+PROFILE = {
+    "income": 80000,
+    "expenses": 30000,
+    "savings": 200000,
+    "emergency_fund": 200000,
+    "assets": 500000,
+    "existing_emis": 5000,
+    "dependents": 1
+}
+LOAN = {
+    "amount": 300000,
+    "interest_rate": 11.5,
+    "tenure_months": 36,
+    "lender_name": "HDFC Bank",
+    "purpose": "medical emergency",
+    "monthly_income": 80000
+}
+
+
+def test_pipeline_matches_individual_agents():
+    res = client.post("/pipeline/evaluate", json={
+        "profile": PROFILE, "loan": LOAN, "credit_score_band": "Good", "include_mentor": False
+    })
+    assert res.status_code == 200
+    body = res.json()
+
+    profile_res = client.post("/agents/financial-profile", json=PROFILE).json()
+    analyzer_res = client.post("/agents/loan-analyzer", json=LOAN).json()
+    assert body["financial_profile"] == profile_res
+    assert body["loan_analyzer"] == analyzer_res
+    assert body["credit_score"] is None
+    assert body["financial_mentor"] is None
+
+    stages = {t["stage"] for t in body["timings"]}
+    assert stages == {"financial_profile", "loan_analyzer", "market_comparison", "loan_necessity", "decision_synthesis"}
+
+
+def test_pipeline_requires_credit_information():
+    res = client.post("/pipeline/evaluate", json={"profile": PROFILE, "loan": LOAN})
+    assert res.status_code == 422
+
+
+def test_independent_stages_run_concurrently():
+    def slow(name):
+        def fn(results):
+            time.sleep(0.2)
+            return name
+        return fn
+
+    stages = [
+        Stage("a", slow("a")),
+        Stage("b", slow("b")),
+        Stage("c", lambda r: r["a"] + r["b"], depends_on=("a", "b")),
+    ]
+    started = time.perf_counter()
+    outcome = asyncio.run(run_pipeline(stages))
+    assert outcome.results["c"] == "ab"
+    assert time.perf_counter() - started < 0.35
+
+
+def test_optional_stage_failure_is_reported():
+    def boom(results):
+        raise RuntimeError("upstream down")
+
+    outcome = asyncio.run(run_pipeline([
+        Stage("a", lambda r: 1),
+        Stage("b", boom, depends_on=("a",), optional=True),
+        Stage("c", lambda r: 2, depends_on=("b",), optional=True),
+    ]))
+    assert outcome.results == {"a": 1}
+    assert "upstream down" in outcome.errors["b"]
+    assert outcome.errors["c"].startswith("Skipped")
+
+
+def test_cycles_are_rejected():
+    try:
+        asyncio.run(run_pipeline([
+            Stage("a", lambda r: 1, depends_on=("b",)),
+            Stage("b", lambda r: 1, depends_on=("a",)),
+        ]))
+    except ValueError as e:
+        assert "cycle" in str(e)
+    else:
+        assert False, "Expected a ValueError"
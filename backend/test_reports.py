@@ -0,0 +1,187 @@
+import time
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+import backend.main as main
+from backend.utils import report_renderer
+from backend.utils.cache import SqliteCache, TTLCache, TieredCache
+from backend.utils.metrics import metrics
+from backend.utils.pdf_generator import PDFReport
+
+client = TestClient(main.app)
+
+DECISION = {
+    "verdict": "Risky",
+    "confidence": 0.7,
+    "explanation": "Your EMIs would take a large share of income.",
+    "score": 55,
+    "suggestions": [],
+    "financial_tips": ["Build a 6-month emergency fund.", "Prepay high-interest debt first."]
+}
+PROFILE = {
+    "monthly_income": 80000,
+    "monthly_expenses": 30000,
+    "loan_amount": 300000,
+    "interest_rate": 11.5,
+    "tenure_months": 36,
+    "existing_emis": 5000
+}
+PAYLOAD = {"financial_profile": PROFILE, "decision_synthesis": DECISION}
+
+
+@pytest.fixture(autouse=True)
+def report_cache(monkeypatch):
+    cache = TieredCache("reports.cache", TTLCache(max_size=8, ttl=None))
+    monkeypatch.setattr(report_renderer, "report_cache", cache)
+    return cache
+
+
+def renders():
+    return metrics.snapshot()["timings"].get("reports.render", {}).get("count", 0)
+
+
+def test_report_records_section_timings_and_survives_page_breaks():
+    pdf = PDFReport(verdict_data={**DECISION, "explanation": "Long explanation. " * 400}, profile_data=PROFILE)
+    data = pdf.generate()
+
+    assert bytes(data).startswith(b"%PDF")
+    assert {"verdict_banner", "technical_analysis", "recommendations", "output"} <= set(pdf.section_timings)
+    assert pdf.page_no() > 1
+
+
+def test_generate_pdf_renders_in_pool():
+    before = metrics.snapshot()["timings"].get("reports.section.technical_analysis", {}).get("count", 0)
+    res = client.post("/generate-pdf", json=PAYLOAD)
+
+    assert res.status_code == 200
+    assert res.content.startswith(b"%PDF")
+    after = metrics.snapshot()["timings"]["reports.section.technical_analysis"]["count"]
+    assert after == before + 1
+
+
+def test_fast_renders_come_back_synchronously(monkeypatch):
+    monkeypatch.setattr(main, "REPORT_SYNC_WAIT_S", 30)
+    res = client.post("/reports", json=PAYLOAD)
+
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/pdf"
+    assert res.content.startswith(b"%PDF")
+
+
+def test_slow_renders_become_pollable_jobs(monkeypatch):
+    monkeypatch.setattr(main, "REPORT_SYNC_WAIT_S", 0)
+    res = client.post("/reports", json=PAYLOAD)
+
+    assert res.status_code == 202
+    job = res.json()
+    assert job["status"] == "pending"
+    assert res.headers["location"] == job["status_url"] == f"/reports/{job['id']}"
+
+    deadline = time.monotonic() + 30
+    while True:
+        res = client.get(job["status_url"])
+        if res.status_code != 202 or time.monotonic() > deadline:
+            break
+        time.sleep(0.05)
+    assert res.status_code == 200
+    assert res.content.startswith(b"%PDF")
+
+
+def test_unknown_report_is_404():
+    assert client.get("/reports/does-not-exist").status_code == 404
+
+
+def test_same_inputs_and_day_render_identical_bytes():
+    first = PDFReport(DECISION, PROFILE, generated_on=date(2026, 1, 5)).generate()
+    time.sleep(1.1) # fpdf's default CreationDate has one-second resolution
+    second = PDFReport(DECISION, PROFILE, generated_on=date(2026, 1, 5)).generate()
+
+    assert bytes(first) == bytes(second)
+    day = date(2026, 1, 5)
+    assert report_renderer.report_key(DECISION, PROFILE, day) == report_renderer.report_key(dict(DECISION), {**PROFILE, "loan_amount": 300000.0}, day)
+
+
+def test_etag_changes_with_the_report_date(monkeypatch, report_cache):
+    # The date is printed in the header and pins the metadata, so a strong ETag must cover it
+    first_day, next_day = date(2026, 1, 5), date(2026, 1, 6)
+    assert bytes(PDFReport(DECISION, PROFILE, generated_on=first_day).generate()) != \
+        bytes(PDFReport(DECISION, PROFILE, generated_on=next_day).generate())
+    assert report_renderer.report_key(DECISION, PROFILE, first_day) != report_renderer.report_key(DECISION, PROFILE, next_day)
+
+    class FixedDate(date):
+        today = classmethod(lambda cls: first_day)
+
+    monkeypatch.setattr(main, "date", FixedDate)
+    first = client.post("/generate-pdf", json=PAYLOAD)
+    report_cache.clear() # Evicted: the same ETag must come back with the same bytes from a fresh render
+    again = client.post("/generate-pdf", json=PAYLOAD)
+    assert (again.headers["etag"], again.content) == (first.headers["etag"], first.content)
+
+    FixedDate.today = classmethod(lambda cls: next_day)
+    res = client.post("/generate-pdf", json=PAYLOAD, headers={"If-None-Match": first.headers["etag"]})
+    assert res.status_code == 200
+    assert res.headers["etag"] != first.headers["etag"]
+    assert res.content != first.content
+
+
+def test_repeat_downloads_are_served_from_cache_with_etag():
+    first = client.post("/generate-pdf", json=PAYLOAD)
+    count = renders()
+    second = client.post("/generate-pdf", json=PAYLOAD)
+
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert second.headers["etag"] == first.headers["etag"]
+    assert second.headers["etag"].startswith('"') and not second.headers["etag"].startswith("W/")
+    assert renders() == count
+
+    other = client.post("/generate-pdf", json={**PAYLOAD, "financial_profile": {**PROFILE, "loan_amount": 400000}})
+    assert other.headers["etag"] != first.headers["etag"]
+
+
+def test_if_none_match_answers_304_without_rendering(report_cache):
+    etag = client.post("/generate-pdf", json=PAYLOAD).headers["etag"]
+    report_cache.clear()
+    count = renders()
+
+    res = client.post("/generate-pdf", json=PAYLOAD, headers={"If-None-Match": f'W/"other", {etag}'})
+    assert res.status_code == 304
+    assert res.headers["etag"] == etag
+    assert not res.content
+    assert renders() == count
+
+    assert client.post("/generate-pdf", json=PAYLOAD, headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_report_jobs_carry_the_etag(monkeypatch):
+    monkeypatch.setattr(main, "REPORT_SYNC_WAIT_S", 30)
+    res = client.post("/reports", json=PAYLOAD)
+    etag = res.headers["etag"]
+
+    assert client.post("/reports", json=PAYLOAD, headers={"If-None-Match": etag}).status_code == 304
+
+    monkeypatch.setattr(main, "REPORT_SYNC_WAIT_S", 0)
+    job = client.post("/reports", json={**PAYLOAD, "financial_profile": {**PROFILE, "tenure_months": 48}}).json()
+    res = client.get(job["status_url"], headers={"If-None-Match": "*"})
+    assert res.status_code == 304
+
+
+def test_disk_tier_round_trips_pdf_bytes(tmp_path):
+    disk = SqliteCache(str(tmp_path / "reports.sqlite"), encode=bytes, decode=bytes)
+    disk.set("k", b"%PDF-1.3 data")
+
+    cache = TieredCache("reports.cache", TTLCache(max_size=1, ttl=None), disk)
+    assert cache.get("k") == b"%PDF-1.3 data"
+
+
+def test_concurrent_identical_renders_share_one_job():
+    profile = {**PROFILE, "loan_amount": 123456}
+    today = date.today()
+    first = report_renderer.submit_cached(DECISION, profile, today)
+    second = report_renderer.submit_cached(DECISION, profile, today)
+
+    assert first is second
+    first.result(timeout=30)
+    assert report_renderer.report_cache.get(report_renderer.report_key(DECISION, profile, today)) == first.result()[0]
@@ -0,0 +1,112 @@
+import base64
+import random
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import backend.main as main
+from backend.agents.credit_score import CreditScoreAgent
+from backend.agents.decision_synthesis import DecisionSynthesisAgent
+from backend.agents.financial_profile import FinancialProfileAgent
+from backend.agents.loan_analyzer import LoanAnalyzerAgent
+from backend.agents.loan_necessity import LoanNecessityAgent
+from backend.agents.market_comparison import MarketComparisonAgent
+from backend.models import (
+    CreditScoreInput, DecisionSynthesisInput, FinancialProfileInput, LoanDetailsInput, LoanNecessityInput
+)
+
+client = TestClient(main.app)
+
+PROFILE = {"income": 85000, "expenses": 30000, "savings": 400000, "emergency_fund": 150000,
+           "assets": 1200000, "existing_emis": 8000, "dependents": 2}
+CREDIT = {"missed_payments": 1, "credit_utilization_ratio": 0.4, "credit_age_years": 5, "active_loans": 2}
+
+
+def request(amount_steps=12, tenure_steps=8, rate_steps=6, **overrides):
+    body = {"profile": PROFILE, "loan_purpose": "Home renovation", "credit": CREDIT,
+            "amount": {"start": 100000, "stop": 3000000, "steps": amount_steps},
+            "tenure_months": {"start": 6, "stop": 240, "steps": tenure_steps},
+            "interest_rate": {"start": 7, "stop": 24, "steps": rate_steps}}
+    body.update(overrides)
+    return body
+
+
+def unpack(matrix, shape):
+    stored = np.frombuffer(base64.b64decode(matrix["data"]), dtype=np.dtype(matrix["dtype"]).newbyteorder("<"))
+    return (stored * matrix["scale"]).reshape(shape)
+
+
+def expected(amount, tenure, rate):
+    # The same chain /pipeline/evaluate runs for one point, with the fallback verdict
+    profile = FinancialProfileAgent().run(FinancialProfileInput(**PROFILE))
+    loan = LoanDetailsInput(amount=amount, interest_rate=rate, tenure_months=tenure, lender_name="", purpose="Home renovation",
+                            monthly_income=PROFILE["income"])
+    analysis = LoanAnalyzerAgent().run(loan)
+    necessity = LoanNecessityAgent().run(LoanNecessityInput(
+        loan_purpose=loan.purpose, loan_amount=amount, financial_stability_score=profile.stability_score,
+        savings=PROFILE["savings"], emergency_fund=PROFILE["emergency_fund"]
+    ))
+    # __new__: the fallback needs no LLM client
+    decision = DecisionSynthesisAgent.__new__(DecisionSynthesisAgent)._fallback_logic(DecisionSynthesisInput(
+        financial_stability_score=profile.stability_score,
+        credit_score_band=CreditScoreAgent().run(CreditScoreInput(**CREDIT)).score_band,
+        loan_burden_score=analysis.burden_score, loan_necessity_level=necessity.necessity_level,
+        market_is_fair=MarketComparisonAgent().run(loan).is_fair
+    ))
+    return analysis, decision
+
+
+def test_grid_matches_the_per_point_chain():
+    response = client.post("/analysis/sensitivity", json=request())
+    assert response.status_code == 200
+    body = response.json()
+    shape = tuple(body["shape"])
+    assert shape == (12, 8, 6)
+    grid = {name: unpack(matrix, shape) for name, matrix in body["metrics"].items()}
+    axes = body["axes"]
+
+    rnd = random.Random(25)
+    for _ in range(40):
+        i, j, k = rnd.randrange(shape[0]), rnd.randrange(shape[1]), rnd.randrange(shape[2])
+        amount, tenure, rate = axes["amount"][i], axes["tenure_months"][j], axes["interest_rate"][k]
+        analysis, decision = expected(amount, int(tenure), rate)
+
+        assert abs(grid["burden_score"][i, j, k] - analysis.burden_score) < 0.051
+        assert abs(grid["score"][i, j, k] - decision.score) < 0.051
+        assert body["verdict_labels"][int(grid["verdict"][i, j, k])] == decision.verdict
+        emi = analysis.total_payable / tenure
+        assert abs(grid["emi"][i, j, k] - emi) <= max(0.01, emi * 1e-6)
+        dti = (PROFILE["existing_emis"] + emi) / PROFILE["income"] * 100
+        assert abs(grid["dti"][i, j, k] - dti) < 0.01
+
+
+def test_packed_and_plain_lists_agree():
+    packed = client.post("/analysis/sensitivity", json=request()).json()
+    plain = client.post("/analysis/sensitivity?packed=false", json=request()).json()
+    shape = tuple(packed["shape"])
+    for name, matrix in packed["metrics"].items():
+        values = np.array(plain["metrics"][name]).reshape(shape)
+        np.testing.assert_allclose(unpack(matrix, shape), values, rtol=1e-6, atol=1e-6)
+
+
+def test_known_band_skips_credit_and_narrow_tenures_collapse():
+    body = request(credit=None, credit_score_band="Excellent", tenure_months={"start": 12, "stop": 13, "steps": 10})
+    result = client.post("/analysis/sensitivity", json=body).json()
+    assert result["credit_score_band"] == "Excellent"
+    assert result["axes"]["tenure_months"] == [12.0, 13.0]
+    assert result["shape"] == [12, 2, 6]
+
+
+def test_grid_of_50x50x20_is_fast():
+    body = request(amount_steps=50, tenure_steps=50, rate_steps=20)
+    client.post("/analysis/sensitivity", json=body) # First call imports numpy (the warmup does this at startup)
+    result = client.post("/analysis/sensitivity", json=body).json()
+    assert result["shape"] == [50, 50, 20]
+    assert result["elapsed_ms"] < 100
+
+
+def test_invalid_grids_are_rejected():
+    assert client.post("/analysis/sensitivity", json=request(credit=None)).status_code == 422
+    assert client.post("/analysis/sensitivity", json=request(rate_steps=0)).status_code == 422
+    too_big = request(amount_steps=1000, tenure_steps=1000, rate_steps=1)
+    assert client.post("/analysis/sensitivity", json=too_big).status_code == 422
@@ -0,0 +1,29 @@
+import asyncio
+
+from backend.utils.singleflight import SingleFlight
+
+
+def test_waiter_timeout_does_not_cancel_shared_call():
+    flights = SingleFlight("test.singleflight")
+    runs = []
+
+    async def slow():
+        runs.append(1)
+        await asyncio.sleep(0.2)
+        return "done"
+
+    async def scenario():
+        impatient = asyncio.wait_for(flights.ado("k", slow), timeout=0.05)
+        patient = flights.ado("k", slow)
+        return await asyncio.gather(impatient, patient, return_exceptions=True)
+
+    impatient, patient = asyncio.run(scenario())
+    assert isinstance(impatient, asyncio.TimeoutError)
+    assert patient == "done"
+    assert len(runs) == 1
+
+
+def test_keys_are_released_after_completion():
+    flights = SingleFlight("test.singleflight")
+    assert flights.do("k", lambda: 1) == 1
+    assert flights.do("k", lambda: 2) == 2
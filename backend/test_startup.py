@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_does_not_load_heavy_dependencies():
+    code = (
+        "import sys, backend.main\n"
+        "heavy = ('google.genai', 'edge_tts', 'fpdf', 'yfinance', 'pandas', 'pypdf', 'numpy')\n"
+        "print('loaded=' + ','.join(m for m in heavy if m in sys.modules))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert "loaded=\n" in out.stdout
+
+
+def test_arithmetic_requests_do_not_load_heavy_dependencies():
+    # The same guarantee as benchmarks/cold_start, kept in the suite so a regression can't slip past it
+    code = (
+        "import sys\n"
+        "from fastapi.testclient import TestClient\n"
+        "import backend.main\n"
+        "client = TestClient(backend.main.app)\n"
+        "assert client.post('/agents/financial-profile', json={'income': 80000, 'expenses': 30000, 'savings': 200000,"
+        " 'assets': 500000, 'existing_emis': 5000, 'dependents': 1}).status_code == 200\n"
+        "assert client.post('/agents/loan-analyzer', json={'amount': 500000, 'interest_rate': 11, 'tenure_months': 36,"
+        " 'lender_name': 'Bank', 'purpose': 'Car', 'monthly_income': 80000}).status_code == 200\n"
+        "heavy = ('numpy', 'fitz', 'edge_tts', 'google.genai', 'fpdf', 'yfinance', 'pandas', 'pypdf')\n"
+        "print('loaded=' + ','.join(m for m in heavy if m in sys.modules))\n"
+    )
+    env = {**os.environ, "TTS_PRERENDER_POLICIES": "0", "ASSET_PRICE_BACKGROUND_REFRESH": "0", "WARMUP_ON_STARTUP": "0"}
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    assert "loaded=\n" in out.stdout
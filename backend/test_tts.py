@@ -0,0 +1,137 @@
+import asyncio
+
+import edge_tts
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.utils import tts_service
+
+client = TestClient(app)
+
+
+class FakeCommunicate:
+    fail = False
+    chunks = [b"ID3", b"frame-1", b"frame-2"]
+    started = []
+
+    def __init__(self, text, voice):
+        self.text = text
+        self.voice = voice
+        FakeCommunicate.started.append((text, voice))
+
+    async def stream(self):
+        if self.fail:
+            raise ConnectionError("edge-tts websocket refused")
+        yield {"type": "WordBoundary", "offset": 0}
+        for chunk in self.chunks:
+            await asyncio.sleep(0)
+            yield {"type": "audio", "data": chunk}
+
+
+@pytest.fixture(autouse=True)
+def fake_edge_tts(monkeypatch):
+    FakeCommunicate.fail = False
+    FakeCommunicate.started = []
+    monkeypatch.setattr(edge_tts, "Communicate", FakeCommunicate)
+
+
+@pytest.fixture(autouse=True)
+def audio_dir(tmp_path, monkeypatch):
+    from backend.utils.audio_cache import AudioCache
+    cache = AudioCache(str(tmp_path))
+    monkeypatch.setattr(tts_service, "audio_cache", cache)
+    return cache
+
+
+def test_audio_is_streamed_chunk_by_chunk():
+    async def collect():
+        stream = await tts_service.TTSService.generate_audio_stream("Hello there.", "ml")
+        return [chunk async for chunk in stream]
+
+    assert asyncio.run(collect()) == FakeCommunicate.chunks
+    assert FakeCommunicate.started == [("Hello there.", "ml-IN-SobhanaNeural")]
+
+
+def test_speak_returns_mpeg_stream():
+    res = client.post("/tts/speak", json={"text": "Hello there.", "language": "en"})
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "audio/mpeg"
+    assert res.content == b"".join(FakeCommunicate.chunks)
+
+
+def test_synthesis_failure_is_an_http_error():
+    FakeCommunicate.fail = True
+    res = client.post("/tts/speak", json={"text": "Hello there.", "language": "en"})
+    assert res.status_code == 502
+    assert b"Error generating audio" not in res.content
+
+
+def test_empty_text_is_rejected():
+    assert client.post("/tts/speak", json={"text": "   "}).status_code == 422
+
+
+def test_repeat_requests_are_served_from_the_audio_cache(audio_dir):
+    for _ in range(2):
+        res = client.post("/tts/speak", json={"text": "Your EMI is due.", "language": "en"})
+        assert res.content == b"".join(FakeCommunicate.chunks)
+    assert len(FakeCommunicate.started) == 1
+
+
+def test_policy_body_is_cached_separately_from_greeting(audio_dir):
+    for name in ("Asha", "Ravi"):
+        text = client.get(f"/policies/HDFC_PERSONAL?lang=en&name={name}").json()["text"]
+        res = client.post("/tts/speak", json={"text": text, "language": "en"})
+        assert res.status_code == 200
+        # greeting + body, each a full clip
+        assert res.content == b"".join(FakeCommunicate.chunks) * 2
+
+    synthesized = [text for text, _ in FakeCommunicate.started]
+    body = tts_service.POLICY_KNOWLEDGE_BASE["HDFC_PERSONAL"]["en"]
+    assert synthesized.count(body) == 1
+    assert sum(1 for t in synthesized if t.startswith("Hi ")) == 2
+
+
+def test_prerender_fills_the_cache(audio_dir):
+    rendered = asyncio.run(tts_service.TTSService.prerender_policies())
+    assert rendered == sum(len(p) for p in tts_service.POLICY_KNOWLEDGE_BASE.values())
+    body = tts_service.POLICY_KNOWLEDGE_BASE["SBI_HOME"]["ml"]
+    assert audio_dir.get(body, "ml-IN-SobhanaNeural") is not None
+
+
+def test_split_sentences_handles_malayalam_and_abbreviations():
+    ml = tts_service.POLICY_KNOWLEDGE_BASE["HDFC_PERSONAL"]["ml"]
+    chunks = tts_service.split_sentences(ml, target=1)
+    assert len(chunks) == 4
+    assert chunks[0].startswith("HDFC") and chunks[0].endswith("21% വരെയാണ്.")
+    assert "".join(chunks).replace(" ", "") == ml.replace(" ", "")
+
+    assert tts_service.split_sentences("Fee is Rs. 500 only. Rate 10.5% p.a.", target=1) == [
+        "Fee is Rs. 500 only.", "Rate 10.5% p.a."
+    ]
+    assert tts_service.split_sentences("ഒന്ന്। രണ്ട്॥ മൂന്ന്", target=1) == ["ഒന്ന്।", "രണ്ട്॥", "മൂന്ന്"]
+
+
+def test_parallel_stream_keeps_order_and_bounds_sessions(monkeypatch):
+    active = {"now": 0, "peak": 0}
+
+    class SlowFirst(FakeCommunicate):
+        async def stream(self):
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            # Earlier sentences take longer, so completion order is reversed
+            await asyncio.sleep(0.05 if self.text.startswith("One") else 0.01)
+            active["now"] -= 1
+            yield {"type": "audio", "data": self.text.encode()}
+
+    monkeypatch.setattr(edge_tts, "Communicate", SlowFirst)
+    monkeypatch.setattr(tts_service, "TTS_MAX_SESSIONS", 2)
+    monkeypatch.setattr(tts_service, "TTS_CHUNK_TARGET", 1)
+    monkeypatch.setattr(tts_service, "_session_slots", __import__("weakref").WeakKeyDictionary())
+
+    async def collect():
+        stream = await tts_service.TTSService.generate_audio_stream("One. Two. Three. Four.", "en", chunked=True)
+        return [chunk async for chunk in stream]
+
+    assert asyncio.run(collect()) == [b"One.", b"Two.", b"Three.", b"Four."]
+    assert active["peak"] == 2
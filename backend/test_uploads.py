@@ -0,0 +1,126 @@
+import hashlib
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+import backend.main as main
+from backend.models import LegalReviewOutput
+from backend.utils.uploads import SpooledUpload, UploadTooLarge
+
+BOUNDARY = "credguardboundary"
+
+
+def multipart(payload: bytes, field: str = "file") -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="agreement.pdf"\r\n'
+        "Content-Type: application/pdf\r\n\r\n"
+    ).encode() + payload + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def chunks(body: bytes, size: int = 4096):
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+HEADERS = {"content-type": f"multipart/form-data; boundary={BOUNDARY}"}
+
+
+class RecordingAgent:
+    def __init__(self):
+        self.uploads = []
+
+    async def arun(self, upload, on_progress=None, force=False):
+        self.uploads.append((upload.size, upload.sha256, upload.path, upload.filename))
+        if upload.path:
+            assert os.path.exists(upload.path)
+        return LegalReviewOutput(risk_clauses=[], overall_risk="Safe", summary="ok")
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    recording = RecordingAgent()
+    monkeypatch.setattr(main, "get_legal_guardian_agent", lambda: recording)
+    return recording
+
+
+def test_spooled_upload_rolls_over_to_disk_and_hashes_while_writing():
+    data = os.urandom(10_000)
+    with SpooledUpload(spool_bytes=4096) as upload:
+        for chunk in chunks(data, 1000):
+            upload.write(chunk)
+        upload.finish()
+        path = upload.path
+        assert path and os.path.getsize(path) == len(data)
+        assert upload.sha256 == hashlib.sha256(data).hexdigest()
+        assert upload.source() == path
+    assert not os.path.exists(path)
+
+    small = SpooledUpload(spool_bytes=4096)
+    small.write(b"%PDF-1.4")
+    assert small.finish().source() == b"%PDF-1.4"
+    assert small.path is None
+
+
+def test_limit_is_enforced_while_writing():
+    upload = SpooledUpload(max_bytes=1000)
+    upload.write(b"x" * 900)
+    with pytest.raises(UploadTooLarge):
+        upload.write(b"x" * 200)
+    upload.close()
+
+
+def test_streamed_multipart_upload_reaches_agent_on_disk(agent, monkeypatch):
+    monkeypatch.setattr("backend.utils.uploads.UPLOAD_SPOOL_BYTES", 8192)
+    payload = os.urandom(50_000)
+
+    res = TestClient(main.app).post("/agents/legal-guardian", content=chunks(multipart(payload)), headers=HEADERS)
+    assert res.status_code == 200, res.text
+
+    size, sha, path, filename = agent.uploads[0]
+    assert size == len(payload)
+    assert sha == hashlib.sha256(payload).hexdigest()
+    assert filename == "agreement.pdf"
+    assert not os.path.exists(path) # Removed once the review finished
+
+
+def test_declared_oversize_is_rejected_before_reading(agent, monkeypatch):
+    monkeypatch.setattr(main, "LEGAL_PDF_MAX_BYTES", 10_000)
+    read = []
+
+    def body():
+        read.append(True)
+        yield multipart(b"x" * 200_000)
+
+    res = TestClient(main.app).post(
+        "/agents/legal-guardian", content=body(),
+        headers={**HEADERS, "content-length": str(len(multipart(b"x" * 200_000)))}
+    )
+    assert res.status_code == 413
+    assert agent.uploads == []
+
+
+def test_undeclared_oversize_is_rejected_while_streaming(agent, monkeypatch):
+    monkeypatch.setattr(main, "LEGAL_PDF_MAX_BYTES", 10_000)
+    res = TestClient(main.app).post("/agents/legal-guardian", content=chunks(multipart(b"x" * 200_000)), headers=HEADERS)
+    assert res.status_code == 413
+    assert agent.uploads == []
+
+
+def test_missing_file_part_is_rejected(agent):
+    res = TestClient(main.app).post("/agents/legal-guardian", content=multipart(b"%PDF", field="other"), headers=HEADERS)
+    assert res.status_code == 422
+
+
+def test_raw_pdf_body_is_accepted(agent):
+    res = TestClient(main.app).post("/agents/legal-guardian", content=b"%PDF-1.4 raw", headers={"content-type": "application/pdf"})
+    assert res.status_code == 200
+    assert agent.uploads[0][0] == len(b"%PDF-1.4 raw")
+
+
+def test_headers_split_across_network_chunks(agent):
+    res = TestClient(main.app).post("/agents/legal-guardian", content=chunks(multipart(b"%PDF-1.4 tiny"), 5), headers=HEADERS)
+    assert res.status_code == 200, res.text
+    assert agent.uploads[0][0] == len(b"%PDF-1.4 tiny")
+    assert agent.uploads[0][3] == "agreement.pdf"
@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+import backend.main as main
+from backend.utils.warmup import Warmup
+
+
+def test_warmup_reports_per_component_state_and_duration():
+    w = Warmup()
+    w.register("slow", lambda: time.sleep(0.05))
+    w.register("broken", lambda: 1 / 0)
+
+    async def fast():
+        return None
+
+    w.register("fast", fast)
+    w.register("skipped", lambda: None)
+
+    assert w.report()["status"] == "warming"
+    assert not w.report()["ready"]
+
+    asyncio.run(w.run(["slow", "broken", "fast"]))
+    report = w.report()
+    components = report["components"]
+
+    assert report["status"] == "degraded"
+    assert report["ready"]
+    assert components["slow"]["state"] == "ready"
+    assert components["slow"]["duration_ms"] >= 50
+    assert components["broken"]["state"] == "failed"
+    assert "division by zero" in components["broken"]["error"]
+    assert components["fast"]["state"] == "ready"
+    assert components["skipped"]["state"] == "disabled"
+    assert components["skipped"]["duration_ms"] is None
+
+
+def test_components_warm_concurrently():
+    w = Warmup()
+    for name in ("a", "b", "c"):
+        w.register(name, lambda: time.sleep(0.1))
+
+    started = time.perf_counter()
+    asyncio.run(w.run())
+    assert time.perf_counter() - started < 0.25
+    assert w.report()["status"] == "ready"
+
+
+def test_hung_component_times_out_as_failed():
+    w = Warmup(timeout_s=0.05)
+
+    async def hangs():
+        await asyncio.sleep(10)
+
+    w.register("hangs", hangs)
+    w.register("slow_thread", lambda: time.sleep(0.2))
+    w.register("fast", lambda: None)
+
+    started = time.perf_counter()
+    asyncio.run(w.run())
+    report = w.report()
+    assert time.perf_counter() - started < 1.0
+    assert report["status"] == "degraded"
+    assert report["ready"]
+    assert report["components"]["hangs"]["state"] == "failed"
+    assert "timed out" in report["components"]["hangs"]["error"]
+    assert report["components"]["slow_thread"]["state"] == "failed"
+    assert report["components"]["fast"]["state"] == "ready"
+
+
+def test_healthz_and_readyz(monkeypatch):
+    w = Warmup()
+    w.register("llm", lambda: None)
+    monkeypatch.setattr(main, "warmup", w)
+    client = TestClient(main.app)
+
+    assert client.get("/healthz").status_code == 200
+
+    res = client.get("/readyz")
+    assert res.status_code == 503
+    assert res.json()["components"]["llm"]["state"] == "pending"
+
+    asyncio.run(w.run())
+    res = client.get("/readyz")
+    assert res.status_code == 200
+    assert res.json()["status"] == "ready"
@@ -0,0 +1,113 @@
+import math
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Amortization over arrays: one loan or a million at once. Arguments are the
+# principal, the annual rate in percent and the tenure in months, as scalars or
+# arrays that broadcast together. A zero rate repays the principal in equal
+# parts; a tenure of zero or less means no instalments (EMI 0).
+# numpy is imported on first use, so emi_one() keeps single-loan requests free of it.
+
+
+def emi_one(principal: float, annual_rate_pct: float, months: float) -> float:
+    """emi() for one loan in plain Python: the same expm1/log1p form, without numpy."""
+    r = annual_rate_pct / 1200
+    if months <= 0:
+        return 0.0
+    if r == 0:
+        return principal / months
+    return principal * r / -math.expm1(-months * math.log1p(r))
+
+
+def total_payable_one(principal: float, annual_rate_pct: float, months: float) -> float:
+    return emi_one(principal, annual_rate_pct, months) * max(months, 0)
+
+
+def monthly_rate(annual_rate_pct):
+    import numpy as np
+
+    return np.asarray(annual_rate_pct, dtype=float) / 1200
+
+
+def emi(principal, annual_rate_pct, months) -> "np.ndarray":
+    """Equated monthly instalment, P*r*(1+r)^n / ((1+r)^n - 1)."""
+    import numpy as np
+
+    principal = np.asarray(principal, dtype=float)
+    r = monthly_rate(annual_rate_pct)
+    n = np.asarray(months, dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        # Same formula written as P*r / (1 - (1+r)^-n): expm1/log1p keep it exact
+        # for rates near zero and it doesn't overflow for long tenures
+        annuity = principal * r / -np.expm1(-n * np.log1p(r))
+        flat = principal / n
+    result = np.where(r == 0, flat, annuity)
+    return np.where(n > 0, result, 0.0)
+
+
+def total_payable(principal, annual_rate_pct, months) -> "np.ndarray":
+    import numpy as np
+
+    return emi(principal, annual_rate_pct, months) * np.maximum(np.asarray(months, dtype=float), 0)
+
+
+def total_interest(principal, annual_rate_pct, months) -> "np.ndarray":
+    import numpy as np
+
+    return total_payable(principal, annual_rate_pct, months) - np.asarray(principal, dtype=float)
+
+
+@dataclass
+class Schedule:
+    """Month-by-month schedules, shape (loans, months). Months past a loan's tenure are zero."""
+    emi: "np.ndarray" # (loans,)
+    payment: "np.ndarray"
+    interest: "np.ndarray"
+    principal: "np.ndarray"
+    balance: "np.ndarray" # Outstanding after each month's payment
+
+    @property
+    def total_interest(self) -> "np.ndarray":
+        return self.interest.sum(axis=1)
+
+
+def schedule(principal, annual_rate_pct, months) -> Schedule:
+    """
+    Full amortization schedules for a batch of loans, computed in closed form
+    (balance after k payments: P*(1+r)^k - EMI*((1+r)^k - 1)/r) rather than
+    month by month. Memory is loans x max(months) per array.
+    """
+    import numpy as np
+
+    principal, r, n = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(principal, dtype=float)),
+        np.atleast_1d(monthly_rate(annual_rate_pct)),
+        np.atleast_1d(np.asarray(months, dtype=int))
+    )
+    instalment = emi(principal, r * 1200, n)
+    horizon = int(n.max(initial=0))
+    k = np.arange(horizon + 1, dtype=float)[None, :] # 0..horizon payments made
+
+    P, rr, e = principal[:, None], r[:, None], instalment[:, None]
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        growth = np.expm1(k * np.log1p(rr)) # (1+r)^k - 1
+        compounded = P * (growth + 1) - e * growth / rr
+    balance = np.where(rr == 0, P - e * k, compounded)
+
+    active = k <= n[:, None]
+    # The last payment clears the loan exactly; rounding would otherwise leave ~1e-9 behind
+    balance = np.where(active & (k < n[:, None]), balance, 0.0)
+    within = active[:, 1:]
+    payment = np.where(within, e, 0.0)
+    interest = np.where(within, balance[:, :-1] * rr, 0.0) # On the balance outstanding during the month
+    return Schedule(
+        emi=instalment,
+        payment=payment,
+        interest=interest,
+        principal=payment - interest,
+        balance=balance[:, 1:]
+    )
@@ -1,52 +1,156 @@
-import yfinance as yf
-from typing import Dict, Any
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+from .metrics import metrics
+
+# 1 Troy Ounce = 31.1035 grams
+OZ_TO_GRAM = 31.1034768
+
+# Gold (GC=F), Silver (SI=F) and USD->INR (INR=X, 1 USD in INR)
+TICKERS = ("GC=F", "SI=F", "INR=X")
+
+# Used only until the first successful fetch
+STATIC_RATES = {"Gold": 7200.0, "Silver": 90.0}
+
+ASSET_PRICE_TTL_S = float(os.getenv("ASSET_PRICE_TTL_S", "900"))
+ASSET_PRICE_REFRESH_S = float(os.getenv("ASSET_PRICE_REFRESH_S", "600"))
+# Minimum gap between request-triggered refreshes, so an upstream outage isn't hit once per request
+ASSET_PRICE_RETRY_S = float(os.getenv("ASSET_PRICE_RETRY_S", "60"))
+
+
+def fetch_yfinance_quotes() -> Dict[str, float]:
+    """Latest close for every ticker in one batched yfinance download."""
+    import yfinance as yf # Heavy (pulls in pandas); only needed when we actually fetch
+
+    # 5d rather than 1d so weekends/holidays still have a last close
+    data = yf.download(" ".join(TICKERS), period="5d", interval="1d", progress=False, threads=False)
+    close = data["Close"]
+    return {ticker: float(close[ticker].dropna().iloc[-1]) for ticker in TICKERS}
+
 
 class AssetPriceService:
+    """
+    In-memory gold/silver price cache with stale-while-revalidate:
+    requests are always answered immediately from memory, and a stale or
+    missing value kicks off a refresh in the background, at most once per
+    `retry_interval` (capped at the TTL, so a success never delays the next
+    refresh). Failed refreshes keep the last good value. `fetcher` is
+    swappable (tests use a stub).
+    """
+
+    def __init__(self, fetcher: Callable[[], Dict[str, float]] = fetch_yfinance_quotes,
+                 ttl: float = ASSET_PRICE_TTL_S, refresh_interval: float = ASSET_PRICE_REFRESH_S,
+                 retry_interval: Optional[float] = None):
+        self.fetcher = fetcher
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.retry_interval = min(ASSET_PRICE_RETRY_S, ttl) if retry_interval is None else retry_interval
+        self._lock = threading.Lock()
+        self._rates: Optional[Dict[str, float]] = None
+        self._as_of: Optional[datetime] = None
+        self._fetched_at = 0.0
+        self._attempted_at: Optional[float] = None # Last refresh start, successful or not
+        self._refreshing = False
+
     @staticmethod
-    def get_live_rates() -> Dict[str, Any]:
-        """
-        Fetches live rates for Gold and Silver.
-        Returns price per Gram in INR.
-        """
-        rates = {
-            "Gold": {"rate": 7200.0, "unit": "gram", "currency": "INR", "source": "static_fallback"},
-            "Silver": {"rate": 90.0, "unit": "gram", "currency": "INR", "source": "static_fallback"}
+    def _to_inr_per_gram(quotes: Dict[str, float]) -> Dict[str, float]:
+        usd_inr = quotes["INR=X"]
+        return {
+            "Gold": round((quotes["GC=F"] / OZ_TO_GRAM) * usd_inr, 2),
+            "Silver": round((quotes["SI=F"] / OZ_TO_GRAM) * usd_inr, 2)
         }
 
+    def refresh(self) -> bool:
+        """Fetches upstream once. Returns True on success; on failure the last good value stays."""
+        started = time.perf_counter()
+        with self._lock:
+            self._attempted_at = time.monotonic()
         try:
-            # Fetch Gold (GC=F), Silver (SI=F) and USDINR (INR=X or DX-Y.NYB.. tricky, let's use INR=X)
-            # correct ticker for USD to INR is "INR=X" ? No, "INR=X" usually is 1 USD in INR.
-            tickers = yf.Tickers("GC=F SI=F INR=X")
-            
-            # 1 Troy Ounce = 31.1035 grams
-            OZ_TO_GRAM = 31.1034768
-            
-            usd_inr = tickers.tickers["INR=X"].history(period="1d")['Close'].iloc[-1]
-            
-            # Gold
-            gold_usd_oz = tickers.tickers["GC=F"].history(period="1d")['Close'].iloc[-1]
-            gold_inr_gram = (gold_usd_oz / OZ_TO_GRAM) * usd_inr
-            
-            # Silver
-            silver_usd_oz = tickers.tickers["SI=F"].history(period="1d")['Close'].iloc[-1]
-            silver_inr_gram = (silver_usd_oz / OZ_TO_GRAM) * usd_inr
-            
-            rates["Gold"] = {
-                "rate": round(gold_inr_gram, 2),
-                "unit": "gram",
-                "currency": "INR",
-                "source": "live"
-            }
-            
-            rates["Silver"] = {
-                "rate": round(silver_inr_gram, 2),
+            rates = self._to_inr_per_gram(self.fetcher())
+        except Exception as e:
+            print(f"Error fetching live rates: {e}")
+            metrics.incr("assets.refresh.error")
+            return False
+        finally:
+            metrics.observe("assets.refresh", (time.perf_counter() - started) * 1000)
+
+        with self._lock:
+            self._rates = rates
+            self._as_of = datetime.now(timezone.utc)
+            self._fetched_at = time.monotonic()
+        metrics.incr("assets.refresh.ok")
+        return True
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            if self._attempted_at is not None and time.monotonic() - self._attempted_at < self.retry_interval:
+                metrics.incr("assets.refresh.backoff")
+                return
+            self._refreshing = True
+
+        def worker():
+            try:
+                self.refresh()
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=worker, name="asset-price-refresh", daemon=True).start()
+
+    def warm(self) -> None:
+        """First fetch at start-up; raises so the warm-up report shows why prices aren't live."""
+        if not self.is_fresh() and not self.refresh():
+            raise RuntimeError("live asset prices unavailable; serving static rates")
+
+    def is_fresh(self) -> bool:
+        with self._lock:
+            return self._rates is not None and time.monotonic() - self._fetched_at < self.ttl
+
+    def get_live_rates(self) -> Dict[str, Any]:
+        """
+        Returns price per Gram in INR for Gold and Silver, never waiting on upstream.
+        `source` is "live" (within TTL), "stale" (last good value, refresh under way)
+        or "static_fallback" (nothing fetched yet).
+        """
+        with self._lock:
+            rates, as_of = self._rates, self._as_of
+            age = time.monotonic() - self._fetched_at
+
+        if rates is None:
+            source = "static_fallback"
+            rates = STATIC_RATES
+        elif age < self.ttl:
+            source = "live"
+        else:
+            source = "stale"
+
+        if source != "live":
+            self._refresh_in_background()
+        metrics.incr(f"assets.served.{source}")
+
+        return {
+            name: {
+                "rate": rate,
                 "unit": "gram",
                 "currency": "INR",
-                "source": "live"
+                "source": source,
+                "as_of": as_of.isoformat() if as_of else None
             }
-            
-        except Exception as e:
-            print(f"Error fetching live rates: {e}")
-            # Keep fallback values
-            
-        return rates
+            for name, rate in rates.items()
+        }
+
+    async def run_refresher(self, initial_delay: float = 0.0) -> None:
+        """Keeps the cache warm so requests rarely see a stale value."""
+        await asyncio.sleep(initial_delay)
+        while True:
+            await asyncio.to_thread(self.refresh)
+            await asyncio.sleep(self.refresh_interval)
+
+
+asset_price_service = AssetPriceService()
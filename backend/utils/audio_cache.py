@@ -0,0 +1,84 @@
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Optional
+
+from .metrics import metrics
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "credguard_tts"))
+TTS_CACHE_MAX_MB = float(os.getenv("TTS_CACHE_MAX_MB", "200"))
+
+
+class AudioCache:
+    """
+    Disk-backed MP3 cache keyed on (text hash, voice).
+    Files are written atomically, so a crash mid-synthesis never leaves a
+    truncated clip behind; the oldest clips are pruned past `max_bytes`.
+    """
+
+    def __init__(self, directory: str, max_bytes: Optional[int] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(text: str, voice: str) -> str:
+        return hashlib.sha256(f"{voice}\n{text}".encode("utf-8")).hexdigest()
+
+    def path(self, text: str, voice: str) -> str:
+        return os.path.join(self.directory, f"{self.key(text, voice)}.mp3")
+
+    def get(self, text: str, voice: str) -> Optional[bytes]:
+        path = self.path(text, voice)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            metrics.incr("tts.cache.miss")
+            return None
+        os.utime(path) # LRU by mtime for pruning
+        metrics.incr("tts.cache.hit")
+        return data
+
+    def put(self, text: str, voice: str, data: bytes) -> None:
+        if not data:
+            return
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self.path(text, voice))
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._prune()
+
+    def warm(self) -> None:
+        """Enforces the size budget left over from a previous run before the first listener arrives."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._prune()
+
+    def _prune(self) -> None:
+        if not self.max_bytes:
+            return
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if name.endswith(".mp3"):
+                    st = os.stat(os.path.join(self.directory, name))
+                    entries.append((st.st_mtime, st.st_size, name))
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+
+audio_cache = AudioCache(TTS_CACHE_DIR, max_bytes=int(TTS_CACHE_MAX_MB * 1024 * 1024))
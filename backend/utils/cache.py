@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from .metrics import metrics
+
+_MISSING = object()
+
+
+def _normalize(obj: Any, float_digits: int) -> Any:
+    if isinstance(obj, bool) or obj is None or isinstance(obj, str):
+        return obj
+    if isinstance(obj, (int, float)):
+        # 5, 5.0 and 5.0000000001 all hash the same
+        return repr(round(float(obj), float_digits))
+    if isinstance(obj, dict):
+        return {str(k): _normalize(v, float_digits) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_normalize(v, float_digits) for v in obj]
+    if hasattr(obj, "dict"):
+        return _normalize(obj.dict(), float_digits)
+    return str(obj)
+
+
+def canonical_hash(obj: Any, float_digits: int = 6) -> str:
+    """Stable SHA-256 of a JSON-like value (sorted keys, normalized numbers)."""
+    payload = json.dumps(_normalize(obj, float_digits), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    """Thread-safe, size-bounded LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, max_size: int = 256, ttl: Optional[float] = 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class SqliteCache:
+    """
+    On-disk key/value tier that survives restarts.
+    Values go through `encode`/`decode` (JSON by default) and are stored as BLOBs.
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = None,
+                 encode: Callable[[Any], bytes] = lambda v: json.dumps(v).encode("utf-8"),
+                 decode: Callable[[bytes], Any] = lambda b: json.loads(b.decode("utf-8"))):
+        self.path = path
+        self.ttl = ttl
+        self.encode = encode
+        self.decode = decode
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return default
+            if self.ttl and row[1] + self.ttl < time.time():
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return default
+        try:
+            return self.decode(row[0])
+        except Exception:
+            return default
+
+    def set(self, key: str, value: Any) -> None:
+        blob = self.encode(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created_at) VALUES (?, ?, ?)",
+                (key, sqlite3.Binary(blob), time.time())
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+class TieredCache:
+    """
+    Memory LRU in front of an optional persistent tier.
+    Hits/misses are counted under `<name>.hit.memory`, `<name>.hit.disk` and `<name>.miss`.
+    """
+
+    def __init__(self, name: str, memory: TTLCache, disk: Optional[SqliteCache] = None):
+        self.name = name
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            metrics.incr(f"{self.name}.hit.memory")
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key, _MISSING)
+            if value is not _MISSING:
+                metrics.incr(f"{self.name}.hit.disk")
+                self.memory.set(key, value)
+                return value
+        metrics.incr(f"{self.name}.miss")
+        return default
+
+    def set(self, key: str, value: Any) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value)
+            except Exception as e:
+                print(f"Cache '{self.name}' disk write failed: {e}")
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def warm(self) -> int:
+        """Opens and counts the persistent tier, so its file and index are loaded before the first lookup. Returns its size."""
+        return len(self.disk) if self.disk is not None else 0
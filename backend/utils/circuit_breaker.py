@@ -0,0 +1,79 @@
+import threading
+import time
+
+from .metrics import metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Counts consecutive upstream failures. After `failure_threshold` of them the
+    breaker opens and `allow()` returns False for `cooldown_s` seconds; then a
+    single trial call is let through (half-open) and its outcome decides whether
+    the breaker closes again or re-opens for another cool-down.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, cooldown_s: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+        metrics.gauge(f"{name}.state", lambda: self.state)
+        metrics.gauge(f"{name}.consecutive_failures", lambda: self._failures)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown_s:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at < self.cooldown_s:
+                metrics.incr(f"{self.name}.rejected")
+                return False
+            # Cool-down elapsed: let exactly one trial through
+            if self._trial_in_flight:
+                metrics.incr(f"{self.name}.rejected")
+                return False
+            self._state = HALF_OPEN
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    metrics.incr(f"{self.name}.opened")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Frees the half-open trial slot without an outcome (the call was cancelled), so the next call becomes the trial."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
@@ -0,0 +1,190 @@
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+# Flagged clauses go to the LLM in chunks of about this many tokens, at most LEGAL_MAX_CHUNKS per agreement
+LEGAL_CHUNK_TOKENS = int(os.getenv("LEGAL_CHUNK_TOKENS", "2500"))
+LEGAL_MAX_CHUNKS = int(os.getenv("LEGAL_MAX_CHUNKS", "8"))
+CHARS_PER_TOKEN = 4 # Rough average for English legal text
+# Clauses longer than this are split on sentence boundaries before scoring
+LEGAL_CLAUSE_MAX_CHARS = int(os.getenv("LEGAL_CLAUSE_MAX_CHARS", "1500"))
+
+# A clause heading at the start of a line: "7.", "7.2", "12)", "Clause 9", "Section 4.1", "Article IV"
+_HEADING = re.compile(
+    r"^[ \t]*(?:(?:clause|section|article)[ \t]+(?P<named>\d+(?:\.\d+)*|[ivxlc]+)\b[.:)]?"
+    r"|(?P<number>\d{1,3}(?:\.\d{1,3})+\.?|\d{1,3}[.)])(?=[ \t]+\S))",
+    re.IGNORECASE | re.MULTILINE
+)
+_SENTENCE_END = re.compile(r"(?<=[.;!?])\s+")
+
+# One combined, compiled alternation: a single pass over the clause finds every
+# category, `lastgroup` says which one matched.
+CATEGORY_PATTERNS = {
+    "prepayment": r"pre-?\s?pay(?:ment)?s?|fore-?\s?clos(?:ure|e|ing)|part[- ]?(?:pre)?payment|early\s+(?:re)?payment|repay(?:ment)?\s+(?:in\s+full\s+)?before",
+    "floating_rate": r"floating\s+(?:rate|interest)|variable\s+(?:rate|interest)|(?:interest|rate)\s+(?:shall|may|will)\s+(?:be\s+)?(?:revised|reset|changed|var(?:y|ied))"
+                     r"|(?:interest|rate)\s+reset|revision\s+of\s+(?:the\s+)?(?:interest|rate)|benchmark\s+rate|\bMCLR\b|repo[- ]linked|\bEBLR\b|spread\s+(?:shall|may)",
+    "arbitration": r"arbitrat(?:ion|or|ors|e|ed)|waive[sd]?\s+(?:\w+\s+){0,4}(?:rights?|jurisdiction|courts?)|exclusive\s+jurisdiction|class\s+action|jury\s+trial",
+    "late_fee": r"late\s+(?:payment\s+)?(?:fees?|charges?|penalt(?:y|ies))|penal\s+(?:interest|charges?)|default\s+interest|overdue\s+(?:interest|charges?)"
+                r"|bounce\s+charges?|(?:cheque|ecs|nach|mandate)\s+(?:return|dishonou?r|bounce)|additional\s+interest|compounded\s+(?:monthly|daily)",
+}
+# Terms that make a flagged clause worse, without being a category of their own
+AGGRAVATING_PATTERN = r"\d+(?:\.\d+)?\s*%|sole\s+(?:and\s+absolute\s+)?discretion|without\s+(?:any\s+)?(?:prior\s+)?notice|irrevocabl[ey]|non-?refundable|final\s+and\s+binding"
+
+_MATCHER = re.compile(
+    "|".join(f"(?P<{name}>{pattern})" for name, pattern in CATEGORY_PATTERNS.items())
+    + f"|(?P<aggravating>{AGGRAVATING_PATTERN})",
+    re.IGNORECASE
+)
+
+CATEGORY_WEIGHTS = {"arbitration": 3.0, "prepayment": 2.0, "floating_rate": 2.0, "late_fee": 2.0}
+
+CATEGORY_ADVICE = {
+    "prepayment": (
+        "Charges a fee or imposes conditions for repaying the loan early.",
+        "Ask for zero foreclosure/part-payment charges; RBI bars them on floating-rate loans to individuals."
+    ),
+    "floating_rate": (
+        "Lets the lender change your interest rate during the loan.",
+        "Confirm the benchmark, the spread and how often it resets, and ask for the rate change to be notified in advance."
+    ),
+    "arbitration": (
+        "Moves disputes to an arbitrator chosen under the lender's terms instead of a court.",
+        "Check who appoints the arbitrator and where; ask to keep access to consumer forums and the Banking Ombudsman."
+    ),
+    "late_fee": (
+        "Adds penal charges or extra interest when a payment is late or bounces.",
+        "Get the exact penal charge in writing and set up auto-debit with a buffer to avoid it."
+    ),
+}
+
+
+@dataclass
+class Clause:
+    index: int
+    number: str # Heading as printed ("7.2", "Article IV"), or "¶n" for unnumbered paragraphs
+    text: str
+    categories: Dict[str, int] = field(default_factory=dict) # category -> hit count
+    aggravating: int = 0
+    score: float = 0.0
+
+    @property
+    def flagged(self) -> bool:
+        return bool(self.categories)
+
+    @property
+    def risk_level(self) -> str:
+        if self.score >= 4:
+            return "High"
+        if self.score >= 3:
+            return "Medium"
+        return "Low"
+
+
+def _split_long(text: str, limit: int) -> List[str]:
+    if len(text) <= limit:
+        return [text]
+    parts, current = [], ""
+    for sentence in _SENTENCE_END.split(text):
+        if current and len(current) + len(sentence) + 1 > limit:
+            parts.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        parts.append(current)
+    return parts
+
+
+def segment_clauses(text: str, max_chars: int = LEGAL_CLAUSE_MAX_CHARS) -> List[Clause]:
+    """
+    Splits agreement text into clauses on numbered headings. Without at least two
+    headings it falls back to blank-line paragraphs. Over-long clauses are split
+    on sentence boundaries; the pieces keep their clause number.
+    """
+    headings = list(_HEADING.finditer(text))
+    if len(headings) >= 2:
+        spans = []
+        if text[:headings[0].start()].strip():
+            spans.append(("0", text[:headings[0].start()]))
+        for i, m in enumerate(headings):
+            end = headings[i + 1].start() if i + 1 < len(headings) else len(text)
+            if m.group("number"):
+                number = m.group("number").rstrip(".)")
+            else:
+                number = f"{m.group(0).split()[0].title()} {m.group('named')}"
+            spans.append((number, text[m.start():end]))
+    else:
+        spans = [(f"¶{i + 1}", p) for i, p in enumerate(re.split(r"\n\s*\n", text))]
+
+    clauses = []
+    for number, body in spans:
+        body = " ".join(body.split())
+        if not body:
+            continue
+        for piece in _split_long(body, max_chars):
+            clauses.append(Clause(index=len(clauses), number=number, text=piece))
+    return clauses
+
+
+def score_clause(clause: Clause) -> Clause:
+    categories: Dict[str, int] = {}
+    aggravating = 0
+    for m in _MATCHER.finditer(clause.text):
+        if m.lastgroup == "aggravating":
+            aggravating += 1
+        else:
+            categories[m.lastgroup] = categories.get(m.lastgroup, 0) + 1
+
+    score = sum(CATEGORY_WEIGHTS[c] + 0.5 * min(n - 1, 2) for c, n in categories.items())
+    if categories:
+        score += min(aggravating, 3)
+    clause.categories, clause.aggravating, clause.score = categories, aggravating, score
+    return clause
+
+
+def prefilter(text: str) -> List[Clause]:
+    """Segments and scores the whole agreement; returns every clause, scored."""
+    return [score_clause(c) for c in segment_clauses(text)]
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def dedupe(clauses: List[Clause]) -> List[Clause]:
+    """Flagged clauses with repeated wording (boilerplate restated in schedules) reduced to the first occurrence."""
+    seen, unique = set(), []
+    for clause in clauses:
+        # The heading number differs between copies; compare the wording after it
+        key = " ".join(re.findall(r"\w+", _HEADING.sub("", clause.text, count=1).lower()))
+        if clause.flagged and key not in seen:
+            seen.add(key)
+            unique.append(clause)
+    return unique
+
+
+def select_for_review(clauses: List[Clause], budget_tokens: int = LEGAL_CHUNK_TOKENS * LEGAL_MAX_CHUNKS) -> List[Clause]:
+    """Highest-scoring flagged clauses that fit in `budget_tokens` (the first one always does), in document order."""
+    chosen, used = [], 0
+    for clause in sorted(dedupe(clauses), key=lambda c: -c.score):
+        tokens = estimate_tokens(clause.text)
+        if chosen and used + tokens > budget_tokens:
+            continue
+        chosen.append(clause)
+        used += tokens
+    return sorted(chosen, key=lambda c: c.index)
+
+
+def chunk_clauses(clauses: List[Clause], chunk_tokens: int = LEGAL_CHUNK_TOKENS) -> List[List[Clause]]:
+    """Packs clauses, in order, into chunks of at most `chunk_tokens` (a longer single clause gets its own chunk)."""
+    chunks: List[List[Clause]] = []
+    used = 0
+    for clause in clauses:
+        tokens = estimate_tokens(clause.text)
+        if not chunks or used + tokens > chunk_tokens:
+            chunks.append([])
+            used = 0
+        chunks[-1].append(clause)
+        used += tokens
+    return chunks
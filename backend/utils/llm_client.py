@@ -1,6 +1,75 @@
 import os
-import google.genai as genai
-from typing import Dict, Any
+import json
+import time
+import asyncio
+import threading
+import weakref
+from typing import Dict, Any, Optional
+
+from .metrics import metrics
+from .cache import TTLCache, SqliteCache, TieredCache, canonical_hash
+from .singleflight import SingleFlight
+from .circuit_breaker import CircuitBreaker
+
+JSON_CONFIG = {'response_mime_type': 'application/json'}
+
+# Process-wide transport settings: every agent shares one client, one
+# connection pool and one concurrency budget.
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "30"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "10"))
+LLM_KEEPALIVE_EXPIRY_S = float(os.getenv("LLM_KEEPALIVE_EXPIRY_S", "90"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+
+# Verdict cache: identical DecisionSynthesisInput payloads (back-navigation,
+# language toggles, retries) are answered without another Gemini call.
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "512"))
+LLM_CACHE_TTL_S = float(os.getenv("LLM_CACHE_TTL_S", "3600"))
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB") # e.g. /var/data/llm_cache.sqlite; unset = memory only
+
+verdict_cache = TieredCache(
+    "llm.verdict_cache",
+    TTLCache(max_size=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL_S),
+    SqliteCache(LLM_CACHE_DB, ttl=LLM_CACHE_TTL_S) if LLM_CACHE_DB else None
+)
+
+_flights = SingleFlight("llm.singleflight")
+
+# Shared by every agent: after repeated timeouts/errors, skip Gemini for a cool-down
+breaker = CircuitBreaker(
+    "llm.breaker",
+    failure_threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", "3")),
+    cooldown_s=float(os.getenv("LLM_BREAKER_COOLDOWN_S", "30"))
+)
+_sync_slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+_async_slots = weakref.WeakKeyDictionary() # event loop -> asyncio.Semaphore
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+metrics.gauge("llm.in_flight", lambda: _in_flight)
+
+
+def _async_slot() -> asyncio.Semaphore:
+    # asyncio primitives belong to one loop; keep one semaphore per running loop
+    loop = asyncio.get_running_loop()
+    slot = _async_slots.get(loop)
+    if slot is None:
+        slot = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        _async_slots[loop] = slot
+    return slot
+
+
+def _track(delta: int) -> None:
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight += delta
+
+
+def _call_config(config: Optional[Dict[str, Any]], timeout: Optional[float]) -> Optional[Dict[str, Any]]:
+    if timeout is None:
+        return config
+    return {**(config or {}), 'http_options': {'timeout': int(timeout * 1000)}}
+
 
 class LLMClient:
     def __init__(self):
@@ -8,15 +77,80 @@ class LLMClient:
         if not api_key:
             print("Warning: GEMINI_API_KEY not found. LLM features will return mock data.")
         else:
-            self.client = genai.Client(api_key=api_key)
+            import google.genai as genai # Heavy; loaded when the first LLM agent is built
+
+            self.client = genai.Client(api_key=api_key, http_options=self._http_options())
             self.model_name = 'gemini-2.5-flash'
+            metrics.incr("llm.clients_created")
             print("Gemini API key kitti.")
 
-    def generate_explanation(self, context_json: Dict[str, Any]) -> str:
-        if not hasattr(self, 'client'):
-            return "LLM Explanation unavailable (Missing API Key)."
+    @staticmethod
+    def _http_options():
+        import httpx
+        import google.genai as genai
+
+        # Bounded pool with keep-alive so TLS handshakes are paid once per connection, not per call
+        limits = httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY_S
+        )
+        timeout = httpx.Timeout(LLM_TIMEOUT_S)
+        return genai.types.HttpOptions(
+            timeout=int(LLM_TIMEOUT_S * 1000),
+            httpx_client=httpx.Client(limits=limits, timeout=timeout),
+            httpx_async_client=httpx.AsyncClient(limits=limits, timeout=timeout)
+        )
+
+    def _flight_key(self, prompt: str, config: Optional[Dict[str, Any]]) -> str:
+        return canonical_hash({"model": self.model_name, "prompt": prompt, "config": config})
+
+    def _generate(self, prompt: str, config: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> str:
+        config = _call_config(config, timeout)
+        # Identical prompts already in flight (double submits, parallel tabs) share one upstream call
+        return _flights.do(self._flight_key(prompt, config), lambda: self._call_model(prompt, config))
 
-        prompt = f"""
+    async def _agenerate(self, prompt: str, config: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> str:
+        config = _call_config(config, timeout)
+        return await _flights.ado(self._flight_key(prompt, config), lambda: self._acall_model(prompt, config))
+
+    def _call_model(self, prompt: str, config: Optional[Dict[str, Any]]) -> str:
+        with _sync_slots:
+            _track(1)
+            started = time.perf_counter()
+            try:
+                response = self.client.models.generate_content(
+                    model=self.model_name,
+                    contents=prompt,
+                    config=config
+                )
+            finally:
+                _track(-1)
+                metrics.incr("llm.requests")
+                metrics.observe("llm.latency", (time.perf_counter() - started) * 1000)
+        return response.text
+
+    async def _acall_model(self, prompt: str, config: Optional[Dict[str, Any]]) -> str:
+        # genai's async surface: the wait is a coroutine, not a blocked worker thread
+        async with _async_slot():
+            _track(1)
+            started = time.perf_counter()
+            try:
+                response = await self.client.aio.models.generate_content(
+                    model=self.model_name,
+                    contents=prompt,
+                    config=config
+                )
+            finally:
+                _track(-1)
+                metrics.incr("llm.requests")
+                metrics.observe("llm.latency", (time.perf_counter() - started) * 1000)
+        return response.text
+
+    # --- Explanation ---
+
+    def _explanation_prompt(self, context_json: Dict[str, Any]) -> str:
+        return f"""
         You are a kind, empathetic, and wise Financial Mentor.
         Your goal is to explain the following financial decision to a user in plain English.
         
@@ -32,33 +166,49 @@ class LLMClient:
         OUTPUT:
         Produce a short, human-readable paragraph (2-3 sentences) explaining the situation and offering guidance.
         """
-        
+
+    def generate_explanation(self, context_json: Dict[str, Any], timeout: Optional[float] = None) -> str:
+        if not hasattr(self, 'client'):
+            return "LLM Explanation unavailable (Missing API Key)."
+
         try:
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt
-            )
-            print(response.text)
-            return response.text
+            text = self._generate(self._explanation_prompt(context_json), timeout=timeout)
+            print(text)
+            return text
         except Exception as e:
             return f"Error generating explanation: {str(e)}"
 
-    def generate_verdict_json(self, context_json: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Generates a comprehensive decision verdict in structured JSON format.
-        """
+    async def agenerate_explanation(self, context_json: Dict[str, Any], timeout: Optional[float] = None) -> str:
         if not hasattr(self, 'client'):
-            # Return Mock/Fallback if no API key
-            return {
-                "verdict": "Risky",
-                "confidence": 0.5,
-                "explanation": "Mock decision (API Key Missing).",
-                "score": 50,
-                "suggestions": [],
-                "financial_tips": ["Secure your API key to get real advice."]
-            }
-
-        prompt = f"""
+            return "LLM Explanation unavailable (Missing API Key)."
+
+        try:
+            return await self._agenerate(self._explanation_prompt(context_json), timeout=timeout)
+        except Exception as e:
+            return f"Error generating explanation: {str(e)}"
+
+    # --- Verdict ---
+
+    MOCK_VERDICT = {
+        "verdict": "Risky",
+        "confidence": 0.5,
+        "explanation": "Mock decision (API Key Missing).",
+        "score": 50,
+        "suggestions": [],
+        "financial_tips": ["Secure your API key to get real advice."]
+    }
+
+    FAILED_VERDICT = {
+        "verdict": "Risky",
+        "confidence": 0.0,
+        "explanation": "AI Analysis Failed. Please try again.",
+        "score": 50,
+        "suggestions": [],
+        "financial_tips": []
+    }
+
+    def _verdict_prompt(self, context_json: Dict[str, Any]) -> str:
+        return f"""
         Act as an expert Credit Risk Analyst and Financial Mentor.
         Analyze the following user financial data and loan request to provide a final verdict.
         
@@ -105,38 +255,115 @@ class LLMClient:
 
         Note: The user needs honest protection, not false hope. Be conservative.
         """
-        
+
+    def generate_verdict_json(self, context_json: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Generates a comprehensive decision verdict in structured JSON format.
+        """
+        if not hasattr(self, 'client'):
+            # Return Mock/Fallback if no API key
+            return dict(self.MOCK_VERDICT)
+
+        key = self._verdict_cache_key(context_json)
+        cached = verdict_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+
         try:
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt,
-                config={
-                    'response_mime_type': 'application/json'
-                }
-            )
-            import json
+            text = self._generate(self._verdict_prompt(context_json), JSON_CONFIG, timeout)
             print("gemini set aayeeee!")
-            return json.loads(response.text)
+            return self._remember_verdict(key, json.loads(text))
         except Exception as e:
             print(f"LLM Error: {e}")
-            # Fallback
-            return {
-                "verdict": "Risky",
-                "confidence": 0.0,
-                "explanation": "AI Analysis Failed. Please try again.",
-                "score": 50,
-                "suggestions": [],
-                "financial_tips": []
-            }
-
-    def generate_negotiation_script(self, context_json: Dict[str, Any]) -> str:
+            return dict(self.FAILED_VERDICT)
+
+    async def agenerate_verdict_json(self, context_json: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        if not hasattr(self, 'client'):
+            return dict(self.MOCK_VERDICT)
+
+        key = self._verdict_cache_key(context_json)
+        cached = verdict_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+
+        try:
+            text = await self._agenerate(self._verdict_prompt(context_json), JSON_CONFIG, timeout)
+            return self._remember_verdict(key, json.loads(text))
+        except Exception as e:
+            print(f"LLM Error: {e}")
+            return dict(self.FAILED_VERDICT)
+
+    def _verdict_cache_key(self, context_json: Dict[str, Any]) -> str:
+        return canonical_hash({"model": self.model_name, "kind": "verdict", "context": context_json})
+
+    @staticmethod
+    def _remember_verdict(key: str, verdict: Any) -> Any:
+        # Only genuine model answers are cached; the mock/failure dicts never reach here
+        if isinstance(verdict, dict):
+            verdict_cache.set(key, verdict)
+            return dict(verdict)
+        return verdict
+
+    # --- Clause Review ---
+
+    def _clause_review_prompt(self, context_json: Dict[str, Any]) -> str:
+        return f"""
+        Act as a consumer-protection lawyer reviewing an Indian loan agreement for the borrower.
+        The clauses below were pre-selected because they mention prepayment/foreclosure charges,
+        floating-rate resets, arbitration or waiver of court rights, or late-payment penalties.
+        
+        CLAUSES (JSON list of {{id, number, categories, text}}):
+        {context_json}
+        
+        OUTPUT SCHEMA (JSON):
+        {{
+            "clauses": [
+                {{
+                    "id": "The clause id exactly as given",
+                    "risk_level": "High" | "Medium" | "Low",
+                    "explanation": "What this clause means for the borrower, in one or two plain sentences.",
+                    "recommendation": "What to ask the lender for or check before signing."
+                }}
+            ],
+            "overall_risk": "Safe" | "Caution" | "Danger",
+            "summary": "Two or three sentences on the agreement as a whole."
+        }}
+        
+        RULES:
+        1. Return exactly one entry per clause id. Quote numbers (%, ₹) from the clause where relevant.
+        2. Judge only the text given; do not invent terms.
         """
-        Generates a highly personalized negotiation script.
+
+    def generate_clause_review_json(self, context_json: Dict[str, Any], timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Reviews pre-filtered agreement clauses. Returns None when the LLM is
+        unavailable or its answer can't be parsed; callers fall back to local scoring.
         """
         if not hasattr(self, 'client'):
-            return "Negotiation script unavailable (Missing API Key)."
+            return None
+
+        try:
+            review = json.loads(self._generate(self._clause_review_prompt(context_json), JSON_CONFIG, timeout))
+        except Exception as e:
+            print(f"LLM Error: {e}")
+            return None
+        return review if isinstance(review, dict) else None
 
-        prompt = f"""
+    async def agenerate_clause_review_json(self, context_json: Dict[str, Any], timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        if not hasattr(self, 'client'):
+            return None
+
+        try:
+            review = json.loads(await self._agenerate(self._clause_review_prompt(context_json), JSON_CONFIG, timeout))
+        except Exception as e:
+            print(f"LLM Error: {e}")
+            return None
+        return review if isinstance(review, dict) else None
+
+    # --- Negotiation Script ---
+
+    def _negotiation_prompt(self, context_json: Dict[str, Any]) -> str:
+        return f"""
         You are a tough but polite Loan Negotiation expert.
         Write a SHORT, direct script (3-4 text lines max) that the user can read or email to their bank manager to get a better interest rate.
         
@@ -154,12 +381,44 @@ class LLMClient:
         EXAMPLE OUPUT:
         "Hello Manager, I've been a loyal customer for years. Given my credit score of 780, I noticed other banks offering 10.5%. Can you match that rate for me?"
         """
-        
+
+    def generate_negotiation_script(self, context_json: Dict[str, Any], timeout: Optional[float] = None) -> str:
+        """
+        Generates a highly personalized negotiation script.
+        """
+        if not hasattr(self, 'client'):
+            return "Negotiation script unavailable (Missing API Key)."
+
         try:
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt
-            )
-            return response.text.replace('"', '').strip() # Clean quotes
+            text = self._generate(self._negotiation_prompt(context_json), timeout=timeout)
+            return text.replace('"', '').strip() # Clean quotes
         except Exception as e:
             return f"Error generating script: {str(e)}"
+
+    async def agenerate_negotiation_script(self, context_json: Dict[str, Any], timeout: Optional[float] = None) -> str:
+        if not hasattr(self, 'client'):
+            return "Negotiation script unavailable (Missing API Key)."
+
+        try:
+            text = await self._agenerate(self._negotiation_prompt(context_json), timeout=timeout)
+            return text.replace('"', '').strip()
+        except Exception as e:
+            return f"Error generating script: {str(e)}"
+
+
+_shared_client: Optional[LLMClient] = None
+_shared_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """
+    Process-wide LLMClient. All agents share its genai client, HTTP pool and
+    concurrency limit instead of each building their own.
+    """
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = LLMClient()
+        else:
+            metrics.incr("llm.client_reuse")
+        return _shared_client
@@ -0,0 +1,62 @@
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict
+
+
+class Metrics:
+    """
+    Minimal in-process metrics registry (counters, gauges, timings).
+    Exposed as JSON on /metrics; no external dependency needed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, Callable[[], Any]] = {}
+        self._timings: Dict[str, Dict[str, float]] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def gauge(self, name: str, fn: Callable[[], Any]) -> None:
+        """Registers a callback evaluated at snapshot time."""
+        with self._lock:
+            self._gauges[name] = fn
+
+    def observe(self, name: str, ms: float) -> None:
+        with self._lock:
+            t = self._timings.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            t["count"] += 1
+            t["total_ms"] += ms
+            t["max_ms"] = max(t["max_ms"], ms)
+
+    def counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            timings = {
+                k: {**v, "avg_ms": round(v["total_ms"] / v["count"], 2) if v["count"] else 0.0}
+                for k, v in self._timings.items()
+            }
+
+        gauge_values = {}
+        for name, fn in gauges.items():
+            try:
+                gauge_values[name] = fn()
+            except Exception as e:
+                gauge_values[name] = f"error: {e}"
+
+        return {"counters": counters, "gauges": gauge_values, "timings": timings}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+
+metrics = Metrics()
@@ -1,12 +1,19 @@
 from fpdf import FPDF
-from datetime import datetime
+from datetime import date, datetime, timezone
+from contextlib import contextmanager
+import time
 
 class PDFReport(FPDF):
-    def __init__(self, verdict_data, profile_data):
+    def __init__(self, verdict_data, profile_data, generated_on=None):
         super().__init__()
         self.verdict = verdict_data
         self.profile = profile_data
+        self.generated_on = generated_on or date.today()
+        # Pin the metadata timestamp (and the /ID derived from it) to the report date,
+        # so the same inputs on the same day always produce the same bytes
+        self.set_creation_date(datetime(self.generated_on.year, self.generated_on.month, self.generated_on.day, tzinfo=timezone.utc))
         self.set_auto_page_break(auto=True, margin=15)
+        self.section_timings = {} # section name -> render ms, filled by generate()
         # self.add_font('Arial', '', 'arial.ttf', uni=True) # Removed to avoid FileNotFoundError
         
     def sanitize(self, text):
@@ -38,7 +45,7 @@ class PDFReport(FPDF):
         
         self.set_font('Helvetica', 'I', 10)
         self.set_text_color(100, 116, 139) # Slate-500
-        self.cell(0, 5, self.sanitize(f'Financial Health Report - Generated on {datetime.now().strftime("%Y-%m-%d")}'), align='L', new_x="LMARGIN", new_y="NEXT")
+        self.cell(0, 5, self.sanitize(f'Financial Health Report - Generated on {self.generated_on.strftime("%Y-%m-%d")}'), align='L', new_x="LMARGIN", new_y="NEXT")
         self.ln(5)
         # Line break
         self.set_draw_color(226, 232, 240)
@@ -70,7 +77,13 @@ class PDFReport(FPDF):
             self.multi_cell(0, 6, self.sanitize(text[:100] + "... (truncated)"))
         self.ln()
 
-        return self.output()
+    @contextmanager
+    def section(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.section_timings[name] = round((time.perf_counter() - started) * 1000, 2)
 
     def calculate_technical_metrics(self):
         # Extract data with safe defaults
@@ -81,15 +94,12 @@ class PDFReport(FPDF):
         existing_emis = float(self.profile.get('existing_emis', 0))
 
         # 1. EMI Calculation (PMT)
-        emi = 0.0
-        if tenure > 0 and rate > 0:
-            r = rate / 1200
-            emi = (amount * r * ((1 + r) ** tenure)) / (((1 + r) ** tenure) - 1)
-        elif tenure > 0:
-            emi = amount / tenure
+        from . import amortization
+
+        emi = float(amortization.emi(amount, rate, tenure))
 
         # 2. Total Cost
-        total_payable = emi * tenure
+        total_payable = float(amortization.total_payable(amount, rate, tenure))
         total_interest = total_payable - amount
         interest_ratio = (total_interest / total_payable * 100) if total_payable > 0 else 0
 
@@ -165,68 +175,75 @@ class PDFReport(FPDF):
         self.add_page()
         
         # 1. Verdict Banner
-        risk = self.verdict.get('verdict', 'UNKNOWN').upper()
-        if risk == 'SAFE':
-            bg_color = (209, 250, 229) # Emerald-100
-            text_color = (6, 95, 70)   # Emerald-800
-        elif risk == 'RISKY':
-            bg_color = (254, 243, 199) # Amber-100
-            text_color = (146, 64, 14) # Amber-800
-        else:
-            bg_color = (255, 228, 230) # Rose-100
-            text_color = (159, 18, 57) # Rose-800
-            
-        self.set_fill_color(*bg_color)
-        self.set_text_color(*text_color)
-        self.set_font('Helvetica', 'B', 16)
-        self.cell(0, 15, self.sanitize(f"VERDICT: {risk}"), align='C', fill=True, new_x="LMARGIN", new_y="NEXT")
-        self.ln(5)
+        with self.section("verdict_banner"):
+            risk = self.verdict.get('verdict', 'UNKNOWN').upper()
+            if risk == 'SAFE':
+                bg_color = (209, 250, 229) # Emerald-100
+                text_color = (6, 95, 70)   # Emerald-800
+            elif risk == 'RISKY':
+                bg_color = (254, 243, 199) # Amber-100
+                text_color = (146, 64, 14) # Amber-800
+            else:
+                bg_color = (255, 228, 230) # Rose-100
+                text_color = (159, 18, 57) # Rose-800
+                
+            self.set_fill_color(*bg_color)
+            self.set_text_color(*text_color)
+            self.set_font('Helvetica', 'B', 16)
+            self.cell(0, 15, self.sanitize(f"VERDICT: {risk}"), align='C', fill=True, new_x="LMARGIN", new_y="NEXT")
+            self.ln(5)
         
         # 2. Executive Summary
-        self.chapter_title("Executive Summary")
-        self.chapter_body(self.verdict.get('explanation', ''))
+        with self.section("executive_summary"):
+            self.chapter_title("Executive Summary")
+            self.chapter_body(self.verdict.get('explanation', ''))
         
         # 3. Key Metrics Table (Financial Snapshot) - REDUCED to avoid duplication
-        self.chapter_title("Financial Snapshot")
-        self.set_font('Helvetica', '', 10)
-        self.set_fill_color(248, 250, 252)
-        
-        metrics = [
-            ("Monthly Income", f"{self.profile.get('monthly_income', 0):,.2f}"),
-            ("Monthly Expenses", f"{self.profile.get('monthly_expenses', 0):,.2f}"),
-            ("Credit Score Band", self.verdict.get('credit_score_band', 'N/A')),
-            ("Risk Score", f"{self.verdict.get('score', 0)}/100")
-        ]
-        
-        for key, value in metrics:
-            self.set_font('Helvetica', 'B', 10)
-            self.cell(60, 8, self.sanitize(key), border=1, fill=True)
+        with self.section("financial_snapshot"):
+            self.chapter_title("Financial Snapshot")
             self.set_font('Helvetica', '', 10)
-            self.cell(0, 8, self.sanitize(str(value)), border=1, new_x="LMARGIN", new_y="NEXT")
+            self.set_fill_color(248, 250, 252)
             
-        self.ln(10)
+            metrics = [
+                ("Monthly Income", f"{self.profile.get('monthly_income', 0):,.2f}"),
+                ("Monthly Expenses", f"{self.profile.get('monthly_expenses', 0):,.2f}"),
+                ("Credit Score Band", self.verdict.get('credit_score_band', 'N/A')),
+                ("Risk Score", f"{self.verdict.get('score', 0)}/100")
+            ]
+            
+            for key, value in metrics:
+                self.set_font('Helvetica', 'B', 10)
+                self.cell(60, 8, self.sanitize(key), border=1, fill=True)
+                self.set_font('Helvetica', '', 10)
+                self.cell(0, 8, self.sanitize(str(value)), border=1, new_x="LMARGIN", new_y="NEXT")
+                
+            self.ln(10)
 
         # 4. Technical Analysis (NEW)
-        self.chapter_technical_analysis()
-        self.ln(5)
+        with self.section("technical_analysis"):
+            self.chapter_technical_analysis()
+            self.ln(5)
         
         # 5. AI Recommendations
-        self.chapter_title("Financial Mentor Recommendations")
-        tips = self.verdict.get('financial_tips', [])
-        for tip in tips:
-            self.set_text_color(0, 0, 0)
-            full_text = f"- {self.sanitize(tip)}"
-            if self.get_x() > 20: self.ln()
-            try:
-                self.multi_cell(0, 6, full_text)
-            except Exception:
-                 self.multi_cell(0, 6, full_text[:100] + "...")
-        self.ln()
+        with self.section("recommendations"):
+            self.chapter_title("Financial Mentor Recommendations")
+            tips = self.verdict.get('financial_tips', [])
+            for tip in tips:
+                self.set_text_color(0, 0, 0)
+                full_text = f"- {self.sanitize(tip)}"
+                if self.get_x() > 20: self.ln()
+                try:
+                    self.multi_cell(0, 6, full_text)
+                except Exception:
+                     self.multi_cell(0, 6, full_text[:100] + "...")
+            self.ln()
             
         # 6. Disclaimer
-        self.ln(10)
-        self.set_font('Helvetica', 'I', 9)
-        self.set_text_color(100)
-        self.multi_cell(0, 5, self.sanitize("DISCLAIMER: This report is generated by an AI system for informational purposes only. It does not constitute professional financial advice. Please verify all figures with a certified financial advisor before making decisions."))
-
-        return self.output()
+        with self.section("disclaimer"):
+            self.ln(10)
+            self.set_font('Helvetica', 'I', 9)
+            self.set_text_color(100)
+            self.multi_cell(0, 5, self.sanitize("DISCLAIMER: This report is generated by an AI system for informational purposes only. It does not constitute professional financial advice. Please verify all figures with a certified financial advisor before making decisions."))
+
+        with self.section("output"):
+            return self.output()
@@ -0,0 +1,157 @@
+import mmap
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .metrics import metrics
+
+# Limits for uploaded agreements
+LEGAL_PDF_MAX_BYTES = int(float(os.getenv("LEGAL_PDF_MAX_MB", "15")) * 1024 * 1024)
+LEGAL_PDF_MAX_PAGES = int(os.getenv("LEGAL_PDF_MAX_PAGES", "300"))
+# Extraction stops once this many characters are collected (the whole of any real agreement)
+LEGAL_EXTRACT_MAX_CHARS = int(os.getenv("LEGAL_EXTRACT_MAX_CHARS", "1000000"))
+# Documents with at least this many pages are extracted in the process pool
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "24"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "4"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+# PDF bytes, or the path of an upload spooled to disk (read through mmap, never copied into memory)
+Source = Union[bytes, str]
+
+
+class PDFLimitError(ValueError):
+    """The document is over the configured byte or page limit."""
+
+
+@dataclass
+class ExtractionResult:
+    text: str
+    pages_total: int
+    pages_read: int
+    truncated: bool # Stopped before the last page because the text budget was met
+    mode: str # "serial" or "parallel"
+    total_ms: float
+    page_timings: List[Dict[str, Any]] = field(default_factory=list)
+
+    def stats(self) -> Dict[str, Any]:
+        return {k: v for k, v in self.__dict__.items() if k != "text"}
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: the server process has threads, which don't survive a fork
+        _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _size(source: Source) -> int:
+    return os.path.getsize(source) if isinstance(source, str) else len(source)
+
+
+@contextmanager
+def _open(source: Source):
+    if not isinstance(source, str):
+        yield BytesIO(source)
+        return
+    with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        yield mapped
+
+
+def _extract_pages(source: Source, indices: List[int], reader=None) -> List[Tuple[int, str, float]]:
+    """(page index, text, ms) for each page. Runs in a pool worker, so it re-opens the document."""
+    if reader is None:
+        import pypdf
+        with _open(source) as stream:
+            return _extract_pages(source, indices, pypdf.PdfReader(stream))
+
+    out = []
+    for i in indices:
+        started = time.perf_counter()
+        text = reader.pages[i].extract_text() or ""
+        out.append((i, text, (time.perf_counter() - started) * 1000))
+    return out
+
+
+def _result(parts: List[Tuple[int, str, float]], pages_total: int, max_chars: int,
+            mode: str, started: float) -> ExtractionResult:
+    parts = sorted(parts)
+    pages, size = [], 0
+    for part in parts:
+        if size >= max_chars:
+            break
+        pages.append(part)
+        size += len(part[1]) + 1
+
+    text = "\n".join(page_text for _, page_text, _ in pages)
+    timings = [{"page": i + 1, "ms": round(ms, 2), "chars": len(page_text)} for i, page_text, ms in pages]
+    for t in timings:
+        metrics.observe("legal.extract.page", t["ms"])
+    total_ms = round((time.perf_counter() - started) * 1000, 2)
+    metrics.observe(f"legal.extract.{mode}", total_ms)
+    return ExtractionResult(
+        text=text,
+        pages_total=pages_total,
+        pages_read=len(pages),
+        truncated=len(pages) < pages_total,
+        mode=mode,
+        total_ms=total_ms,
+        page_timings=timings
+    )
+
+
+def extract_text(source: Source, max_chars: int = LEGAL_EXTRACT_MAX_CHARS, max_pages: int = LEGAL_PDF_MAX_PAGES,
+                 max_bytes: int = LEGAL_PDF_MAX_BYTES, parallel_min_pages: int = PDF_PARALLEL_MIN_PAGES) -> ExtractionResult:
+    """
+    Extracts text page by page, in page order, until `max_chars` characters are
+    collected. Large documents are extracted in waves of PDF_WORKERS tasks in the
+    process pool; no further wave is submitted once the budget is met. Workers
+    get the spooled file's path rather than a pickled copy of the document.
+    Raises PDFLimitError over the byte/page limits; pypdf errors propagate.
+    """
+    size = _size(source)
+    if size > max_bytes:
+        raise PDFLimitError(f"PDF is {size / 1048576:.1f} MB; the limit is {max_bytes / 1048576:.1f} MB.")
+    if not size:
+        raise ValueError("empty file")
+
+    import pypdf
+
+    started = time.perf_counter()
+    with _open(source) as stream:
+        reader = pypdf.PdfReader(stream)
+        pages_total = len(reader.pages)
+        if pages_total > max_pages:
+            raise PDFLimitError(f"PDF has {pages_total} pages; the limit is {max_pages}.")
+
+        parts: List[Tuple[int, str, float]] = []
+        if pages_total < parallel_min_pages or PDF_WORKERS < 2:
+            collected = 0
+            for i in range(pages_total):
+                part = _extract_pages(source, [i], reader)[0]
+                parts.append(part)
+                collected += len(part[1]) + 1
+                if collected >= max_chars:
+                    break
+            return _result(parts, pages_total, max_chars, "serial", started)
+
+    batches = [list(range(i, min(i + PDF_PAGES_PER_TASK, pages_total)))
+               for i in range(0, pages_total, PDF_PAGES_PER_TASK)]
+    pool = _get_pool()
+    collected = 0
+    for w in range(0, len(batches), PDF_WORKERS):
+        futures = [pool.submit(_extract_pages, source, batch) for batch in batches[w:w + PDF_WORKERS]]
+        for future in futures:
+            for part in future.result():
+                parts.append(part)
+                collected += len(part[1]) + 1
+        if collected >= max_chars:
+            break
+    return _result(parts, pages_total, max_chars, "parallel", started)
@@ -0,0 +1,116 @@
+import asyncio
+import inspect
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Tuple
+
+
+@dataclass
+class Stage:
+    """
+    One node of the agent graph.
+    `func` receives the dict of results produced so far (keyed by stage name)
+    and may be a plain function (run in a worker thread) or a coroutine function.
+    """
+    name: str
+    func: Callable[[Dict[str, Any]], Any]
+    depends_on: Tuple[str, ...] = ()
+    optional: bool = False  # Failure is recorded instead of aborting the pipeline
+
+
+@dataclass
+class PipelineResult:
+    results: Dict[str, Any] = field(default_factory=dict)
+    timings: List[Dict[str, Any]] = field(default_factory=list)
+    errors: Dict[str, str] = field(default_factory=dict)
+    total_ms: float = 0.0
+
+
+class PipelineError(Exception):
+    def __init__(self, stage: str, error: Exception):
+        super().__init__(f"Stage '{stage}' failed: {error}")
+        self.stage = stage
+        self.error = error
+
+
+def _validate(stages: List[Stage]) -> None:
+    names = [s.name for s in stages]
+    if len(names) != len(set(names)):
+        raise ValueError("Duplicate stage names in pipeline")
+
+    # Reject unknown dependencies and cycles up front (Kahn's algorithm)
+    remaining = {s.name: set(s.depends_on) for s in stages}
+    for name, deps in remaining.items():
+        unknown = deps - remaining.keys()
+        if unknown:
+            raise ValueError(f"Stage '{name}' depends on unknown stage(s): {sorted(unknown)}")
+
+    while remaining:
+        ready = [n for n, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"Dependency cycle between stages: {sorted(remaining)}")
+        for n in ready:
+            del remaining[n]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+
+async def run_pipeline(stages: List[Stage]) -> PipelineResult:
+    """
+    Runs every stage as soon as all of its dependencies have finished,
+    so independent stages execute concurrently.
+    A failing required stage raises PipelineError; a failing optional stage
+    (or anything depending on it) is skipped and reported in `errors`.
+    """
+    _validate(stages)
+
+    out = PipelineResult()
+    done: Dict[str, asyncio.Event] = {s.name: asyncio.Event() for s in stages}
+    failed: set = set()
+    origin = time.perf_counter()
+
+    async def execute(stage: Stage):
+        for dep in stage.depends_on:
+            await done[dep].wait()
+
+        try:
+            blocked = [dep for dep in stage.depends_on if dep in failed]
+            if blocked:
+                failed.add(stage.name)
+                out.errors[stage.name] = f"Skipped: dependency {blocked[0]} failed"
+                return
+
+            started = time.perf_counter()
+            try:
+                if inspect.iscoroutinefunction(stage.func):
+                    result = await stage.func(out.results)
+                else:
+                    result = await asyncio.to_thread(stage.func, out.results)
+            except Exception as e:
+                if not stage.optional:
+                    raise PipelineError(stage.name, e) from e
+                failed.add(stage.name)
+                out.errors[stage.name] = str(e)
+                result = None
+            finished = time.perf_counter()
+
+            if stage.name not in failed:
+                out.results[stage.name] = result
+            out.timings.append({
+                "stage": stage.name,
+                "started_ms": round((started - origin) * 1000, 2),
+                "duration_ms": round((finished - started) * 1000, 2),
+            })
+        finally:
+            done[stage.name].set()
+
+    tasks = [asyncio.create_task(execute(s)) for s in stages]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for t in tasks:
+            t.cancel()
+
+    out.timings.sort(key=lambda t: t["started_ms"])
+    out.total_ms = round((time.perf_counter() - origin) * 1000, 2)
+    return out
@@ -0,0 +1,202 @@
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import date
+from typing import Any, Dict, Optional, Tuple
+
+from .cache import SqliteCache, TTLCache, TieredCache, canonical_hash
+from .metrics import metrics
+
+# fpdf2 is pure Python: renders run in worker processes so they don't hold the server's GIL
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+# POST /reports answers with the PDF itself if the render finishes within this, else with a job id
+REPORT_SYNC_WAIT_S = float(os.getenv("REPORT_SYNC_WAIT_S", "2"))
+REPORT_JOB_TTL_S = float(os.getenv("REPORT_JOB_TTL_S", "600"))
+REPORT_MAX_JOBS = int(os.getenv("REPORT_MAX_JOBS", "256"))
+
+# Rendered PDFs, keyed by a canonical hash of the decision, profile and report date (the
+# date is printed in the header and pins the PDF metadata, so it's part of the bytes)
+REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "64"))
+REPORT_CACHE_TTL_S = float(os.getenv("REPORT_CACHE_TTL_S", str(7 * 24 * 3600)))
+REPORT_CACHE_DB = os.getenv("REPORT_CACHE_DB", os.path.join(tempfile.gettempdir(), "credguard_reports.sqlite")) # "" = memory only
+# Bump when the report layout changes so older PDFs (and their ETags) aren't served
+REPORT_VERSION = "1"
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+report_cache = TieredCache(
+    "reports.cache",
+    TTLCache(max_size=REPORT_CACHE_SIZE, ttl=REPORT_CACHE_TTL_S),
+    SqliteCache(REPORT_CACHE_DB, ttl=REPORT_CACHE_TTL_S, encode=bytes, decode=bytes) if REPORT_CACHE_DB else None
+)
+
+# Renders in progress by cache key, so a double click or a retry waits on the same render
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the server process has threads, which don't survive a fork
+            _pool = ProcessPoolExecutor(max_workers=REPORT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def render_report(verdict_data: Dict[str, Any], profile_data: Dict[str, Any],
+                  generated_on: Optional[date] = None) -> Tuple[bytes, Dict[str, float]]:
+    """Runs in a pool worker: (PDF bytes, section -> ms)."""
+    from .pdf_generator import PDFReport
+
+    pdf = PDFReport(verdict_data=verdict_data, profile_data=profile_data, generated_on=generated_on)
+    return bytes(pdf.generate()), pdf.section_timings
+
+
+def _record(timings: Dict[str, float], total_ms: float) -> None:
+    # Metrics live in the server process; workers only report their numbers back
+    for section, ms in timings.items():
+        metrics.observe(f"reports.section.{section}", ms)
+    metrics.observe("reports.render", total_ms)
+
+
+def submit_render(verdict_data: Dict[str, Any], profile_data: Dict[str, Any],
+                  generated_on: Optional[date] = None) -> "Future[Tuple[bytes, Dict[str, float]]]":
+    started = time.perf_counter()
+    future = _get_pool().submit(render_report, verdict_data, profile_data, generated_on)
+
+    def done(f):
+        if f.cancelled() or f.exception() is not None:
+            metrics.incr("reports.failed")
+            return
+        _record(f.result()[1], (time.perf_counter() - started) * 1000)
+
+    future.add_done_callback(done)
+    return future
+
+
+def report_key(verdict_data: Dict[str, Any], profile_data: Dict[str, Any], generated_on: date) -> str:
+    """Cache key and strong ETag of the report for these inputs, rendered on `generated_on`."""
+    return canonical_hash({"version": REPORT_VERSION, "decision": verdict_data, "profile": profile_data,
+                           "generated_on": generated_on.isoformat()})
+
+
+def submit_cached(verdict_data: Dict[str, Any], profile_data: Dict[str, Any],
+                  generated_on: date) -> "Future[Tuple[bytes, Dict[str, float]]]":
+    """Like submit_render, but served from report_cache when possible; successful renders are stored there."""
+    key = report_key(verdict_data, profile_data, generated_on)
+    pdf_bytes = report_cache.get(key)
+    if pdf_bytes is not None:
+        future: Future = Future()
+        future.set_result((pdf_bytes, {}))
+        return future
+
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            metrics.incr("reports.cache.coalesced")
+            return future
+        future = submit_render(verdict_data, profile_data, generated_on)
+        _inflight[key] = future
+
+    def store(f):
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        if not f.cancelled() and f.exception() is None:
+            report_cache.set(key, f.result()[0])
+
+    future.add_done_callback(store)
+    return future
+
+
+async def render_async(verdict_data: Dict[str, Any], profile_data: Dict[str, Any], generated_on: date) -> bytes:
+    pdf_bytes, _ = await asyncio.wrap_future(submit_cached(verdict_data, profile_data, generated_on))
+    return pdf_bytes
+
+
+def warm_pool() -> None:
+    """Starts every worker and renders a throwaway report in each, so fpdf is imported there ahead of time."""
+    sample = ({"verdict": "Safe", "explanation": "Warm-up.", "score": 80, "financial_tips": []},
+              {"loan_amount": 100000, "interest_rate": 10, "tenure_months": 12, "monthly_income": 50000})
+    futures = [_get_pool().submit(render_report, *sample) for _ in range(REPORT_WORKERS)]
+    for future in futures:
+        future.result()
+
+
+class ReportJobs:
+    """
+    In-memory registry of report renders for the POST /reports -> GET /reports/{id}
+    flow. Finished jobs are kept for `ttl` seconds; the oldest are dropped past `max_jobs`.
+    """
+
+    def __init__(self, ttl: float = REPORT_JOB_TTL_S, max_jobs: int = REPORT_MAX_JOBS):
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+
+        metrics.gauge("reports.jobs", lambda: len(self._jobs))
+
+    def submit(self, verdict_data: Dict[str, Any], profile_data: Dict[str, Any], generated_on: date) -> str:
+        job_id = uuid.uuid4().hex
+        job = {"status": PENDING, "created_at": time.time(), "finished_at": None,
+               "etag": report_key(verdict_data, profile_data, generated_on),
+               "pdf": None, "error": None, "timings": {}, "future": None}
+        with self._lock:
+            self._expire()
+            self._jobs[job_id] = job
+
+        def finished(f):
+            with self._lock:
+                if f.cancelled() or f.exception() is not None:
+                    job.update(status=FAILED, error=str(f.exception() if not f.cancelled() else "cancelled"))
+                else:
+                    pdf_bytes, timings = f.result()
+                    job.update(status=DONE, pdf=pdf_bytes, timings=timings)
+                job["finished_at"] = time.time()
+
+        future = submit_cached(verdict_data, profile_data, generated_on)
+        job["future"] = future
+        future.add_done_callback(finished)
+        metrics.incr("reports.jobs.submitted")
+        return job_id
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Waits up to `timeout` for the job to finish (the render keeps going past it). Returns the job."""
+        job = self.get(job_id)
+        if job is None or job["status"] != PENDING:
+            return job
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job["future"])), timeout)
+        except asyncio.TimeoutError:
+            pass
+        except Exception:
+            pass # Recorded on the job by its callback
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def _expire(self) -> None:
+        now = time.time()
+        for job_id in [k for k, j in self._jobs.items() if j["finished_at"] and now - j["finished_at"] > self.ttl]:
+            del self._jobs[job_id]
+        while len(self._jobs) > self.max_jobs:
+            oldest = min(self._jobs, key=lambda k: self._jobs[k]["created_at"])
+            del self._jobs[oldest]
+
+
+report_jobs = ReportJobs()
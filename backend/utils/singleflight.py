@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict
+
+from .metrics import metrics
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller (the leader)
+    does the work, everyone else waits for and receives the same result or error.
+    Nothing is remembered once the call completes; that is the caches' job.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._tasks = weakref.WeakKeyDictionary() # event loop -> {key: Task}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            metrics.incr(f"{self.name}.shared")
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        metrics.incr(f"{self.name}.leader")
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        tasks = self._tasks.setdefault(loop, {})
+        task = tasks.get(key)
+
+        if task is None:
+            metrics.incr(f"{self.name}.leader")
+            # The upstream call runs as its own task so one waiter timing out
+            # (or disconnecting) doesn't cancel it for everybody else.
+            task = loop.create_task(fn())
+            tasks[key] = task
+
+            def _done(t, key=key):
+                if tasks.get(key) is t:
+                    del tasks[key]
+                if not t.cancelled():
+                    t.exception() # Mark retrieved even if every waiter went away
+
+            task.add_done_callback(_done)
+        else:
+            metrics.incr(f"{self.name}.shared")
+
+        return await asyncio.shield(task)
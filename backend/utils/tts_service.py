@@ -1,33 +1,251 @@
-import edge_tts
 import asyncio
-from io import BytesIO
+import os
+import re
+import weakref
+from typing import AsyncIterator, List, Optional
+
+from .audio_cache import audio_cache
+from .policy_knowledge_base import POLICY_KNOWLEDGE_BASE
+from .singleflight import SingleFlight
+
+# Voice Mapping for "Human Realistic" Sound
+# en: en-IN-NeerjaNeural (Soft, Professional Indian English)
+# ml: ml-IN-SobhanaNeural (Natural Malayalam)
+VOICES = {
+    "en": "en-IN-NeerjaNeural",
+    "ml": "ml-IN-SobhanaNeural"
+}
+
+# Policy bodies are identical for every user of a bank/language; only the
+# "Hi {name}" greeting in front of them changes. Longest first so the most
+# specific body wins when matching a suffix.
+POLICY_BODIES = sorted(
+    {text for policy in POLICY_KNOWLEDGE_BASE.values() for text in policy.values()},
+    key=len, reverse=True
+)
+
+CACHED_CHUNK_BYTES = 32 * 1024
+
+_renders = SingleFlight("tts.render")
+
+# Chunked mode: long texts are split into sentences and synthesized by a bounded
+# pool of concurrent edge-tts sessions, then streamed back in order.
+TTS_CHUNK_THRESHOLD = int(os.getenv("TTS_CHUNK_THRESHOLD", "400")) # chars; auto-enable above this
+TTS_CHUNK_TARGET = int(os.getenv("TTS_CHUNK_TARGET", "200")) # merge short sentences up to ~this many chars
+TTS_MAX_SESSIONS = int(os.getenv("TTS_MAX_SESSIONS", "4"))
+
+_session_slots = weakref.WeakKeyDictionary() # event loop -> asyncio.Semaphore
+
+# Sentence ends: Latin ./!/?, Devanagari danda/double danda (also used in Malayalam
+# texts) and line breaks. Decimals such as "10.5%" never split (no space after the dot).
+_SENTENCE_END = re.compile(r"(?<=[.!?\u0964\u0965])\s+|\n+")
+_ABBREVIATIONS = ("Rs.", "Dr.", "Mr.", "Mrs.", "Ms.", "No.", "e.g.", "i.e.", "etc.", "vs.", "St.")
+
+
+def split_sentences(text: str, target: Optional[int] = None) -> List[str]:
+    """
+    Splits text into sentence-aligned chunks of roughly `target` characters.
+    Abbreviations like "Rs." don't end a sentence, and short sentences are merged
+    so a clip isn't split into dozens of tiny sessions.
+    """
+    target = TTS_CHUNK_TARGET if target is None else target
+    pieces = []
+    for part in _SENTENCE_END.split(text.strip()):
+        part = part.strip()
+        if not part:
+            continue
+        if pieces and pieces[-1].endswith(_ABBREVIATIONS):
+            pieces[-1] = f"{pieces[-1]} {part}"
+        else:
+            pieces.append(part)
+
+    chunks = []
+    for piece in pieces:
+        if chunks and len(chunks[-1]) + len(piece) + 1 <= target:
+            chunks[-1] = f"{chunks[-1]} {piece}"
+        else:
+            chunks.append(piece)
+    return chunks
+
+
+def _session_slot() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    slot = _session_slots.get(loop)
+    if slot is None:
+        slot = asyncio.Semaphore(TTS_MAX_SESSIONS)
+        _session_slots[loop] = slot
+    return slot
+
+class TTSError(Exception):
+    """Synthesis failed before any audio was produced."""
 
 class TTSService:
     @staticmethod
-    async def generate_audio_stream(text: str, lang: str = 'en') -> BytesIO:
+    def voice_for(lang: str) -> str:
+        return VOICES.get(lang, VOICES["en"])
+
+    @staticmethod
+    async def stream_audio(text: str, lang: str = 'en') -> AsyncIterator[bytes]:
+        """
+        Yields MP3 chunks from Microsoft Edge TTS (Neural Voices) as they arrive.
+        Edge TTS is only read as fast as the consumer pulls, so a slow client
+        applies backpressure instead of us buffering the whole clip.
+        """
+        import edge_tts # Pulls in aiohttp; loaded on the first synthesis
+
+        communicate = edge_tts.Communicate(text, TTSService.voice_for(lang))
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                yield chunk["data"]
+
+    @staticmethod
+    def split_segments(text: str) -> List[str]:
+        """Splits a personalised policy narration into [greeting, shared body]."""
+        for body in POLICY_BODIES:
+            if text.endswith(body):
+                preamble = text[:-len(body)]
+                return [preamble, body] if preamble.strip() else [body]
+        return [text]
+
+    @staticmethod
+    async def synthesize(text: str, lang: str = 'en') -> bytes:
+        """Whole clip for `text`: from the audio cache, or synthesized once and stored."""
+        voice = TTSService.voice_for(lang)
+        cached = await asyncio.to_thread(audio_cache.get, text, voice)
+        if cached is not None:
+            return cached
+
+        async def render():
+            data = b"".join([chunk async for chunk in TTSService.stream_audio(text, lang)])
+            if not data:
+                raise TTSError("No audio was produced for the given text.")
+            await asyncio.to_thread(audio_cache.put, text, voice, data)
+            return data
+
+        # Concurrent first listens of the same body share one synthesis
+        return await _renders.ado(audio_cache.key(text, voice), render)
+
+    @staticmethod
+    async def _segment_stream(text: str, lang: str) -> AsyncIterator[bytes]:
+        voice = TTSService.voice_for(lang)
+        cached = await asyncio.to_thread(audio_cache.get, text, voice)
+        if cached is not None:
+            for i in range(0, len(cached), CACHED_CHUNK_BYTES):
+                yield cached[i:i + CACHED_CHUNK_BYTES]
+            return
+
+        # Live: stream to the client and keep a copy for the next listener
+        parts = []
+        async for chunk in TTSService.stream_audio(text, lang):
+            parts.append(chunk)
+            yield chunk
+        if parts:
+            await asyncio.to_thread(audio_cache.put, text, voice, b"".join(parts))
+
+    @staticmethod
+    async def parallel_stream(text: str, lang: str = 'en') -> AsyncIterator[bytes]:
         """
-        Generates audio from text using Microsoft Edge TTS (Neural Voices).
-        Returns a BytesIO stream.
+        Synthesizes sentence chunks concurrently (at most TTS_MAX_SESSIONS edge-tts
+        sessions process-wide) and yields their MP3 frames strictly in order.
+        Chunk 0 streams live; later chunks buffer until it's their turn.
         """
+        chunks = split_sentences(text)
+        queues = [asyncio.Queue() for _ in chunks]
+        done = object()
+
+        async def render(i: int, chunk: str):
+            try:
+                async with _session_slot():
+                    async for frame in TTSService._segment_stream(chunk, lang):
+                        queues[i].put_nowait(frame)
+                queues[i].put_nowait(done)
+            except Exception as e:
+                queues[i].put_nowait(e)
+
+        tasks = [asyncio.ensure_future(render(i, c)) for i, c in enumerate(chunks)]
         try:
-            # Voice Mapping for "Human Realistic" Sound
-            # en: en-IN-NeerjaNeural (Soft, Professional Indian English)
-            # ml: ml-IN-SobhanaNeural (Natural Malayalam)
-            voice = "en-IN-NeerjaNeural"
-            if lang == 'ml':
-                voice = "ml-IN-SobhanaNeural"
-            
-            communicate = edge_tts.Communicate(text, voice)
-            
-            # Edge TTS writes to file or yields bytes. We want bytes.
-            fp = BytesIO()
-            async for chunk in communicate.stream():
-                if chunk["type"] == "audio":
-                    fp.write(chunk["data"])
-            
-            fp.seek(0)
-            return fp
+            for queue in queues:
+                while True:
+                    item = await queue.get()
+                    if item is done:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
 
+    @staticmethod
+    async def cached_stream(text: str, lang: str = 'en', chunked: bool = False) -> AsyncIterator[bytes]:
+        """
+        Streams `text` through the audio cache. Policy narrations are stitched from
+        a separately cached greeting and the shared, pre-rendered policy body
+        (edge-tts emits bare MP3 frames, so the clips concatenate cleanly).
+        """
+        source = TTSService.parallel_stream if chunked else TTSService._segment_stream
+        segments = TTSService.split_segments(text)
+        if len(segments) == 1:
+            async for chunk in source(text, lang):
+                yield chunk
+            return
+
+        greeting, body = segments
+        # Fetch or render the body while the greeting plays
+        body_task = asyncio.ensure_future(TTSService.synthesize(body, lang))
+        try:
+            async for chunk in source(greeting, lang):
+                yield chunk
+            body_audio = await body_task
+        finally:
+            if not body_task.done():
+                body_task.cancel()
+        for i in range(0, len(body_audio), CACHED_CHUNK_BYTES):
+            yield body_audio[i:i + CACHED_CHUNK_BYTES]
+
+    @staticmethod
+    async def prerender_policies() -> int:
+        """Synthesizes every bank/language policy body into the audio cache. Returns the count rendered."""
+        rendered = 0
+        for bank, policy in POLICY_KNOWLEDGE_BASE.items():
+            for lang, body in policy.items():
+                try:
+                    await TTSService.synthesize(body, lang)
+                    rendered += 1
+                except Exception as e:
+                    print(f"Policy pre-render failed for {bank}/{lang}: {e}")
+        return rendered
+
+    @staticmethod
+    async def generate_audio_stream(text: str, lang: str = 'en', chunked: Optional[bool] = None) -> AsyncIterator[bytes]:
+        """
+        Starts synthesis and waits for the first audio chunk, so a failure is
+        raised as TTSError (and can become an HTTP error) before any bytes are sent.
+        Returns an async iterator over the whole clip, first chunk included.
+        `chunked=None` picks sentence-parallel synthesis for texts over TTS_CHUNK_THRESHOLD.
+        """
+        if chunked is None:
+            chunked = len(text) > TTS_CHUNK_THRESHOLD
+        stream = TTSService.cached_stream(text, lang, chunked)
+        try:
+            first = await stream.__anext__()
+        except StopAsyncIteration:
+            raise TTSError("No audio was produced for the given text.")
         except Exception as e:
             print(f"Edge TTS Error: {e}")
-            return BytesIO(b"Error generating audio")
+            raise TTSError(str(e)) from e
+
+        async def body():
+            try:
+                yield first
+                async for chunk in stream:
+                    yield chunk
+            except asyncio.CancelledError:
+                raise # Client went away
+            except Exception as e:
+                # Headers are already sent; all we can do is end the clip early
+                print(f"Edge TTS Error (mid-stream): {e}")
+            finally:
+                await stream.aclose()
+
+        return body()
@@ -0,0 +1,188 @@
+import hashlib
+import os
+import tempfile
+from typing import Optional, Union
+
+from .metrics import metrics
+
+# Uploads stay in memory up to this size, then go to a temp file on disk
+UPLOAD_SPOOL_BYTES = int(float(os.getenv("UPLOAD_SPOOL_MB", "1")) * 1024 * 1024)
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR") or tempfile.gettempdir()
+# Allowance for multipart boundaries and part headers when checking Content-Length
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadError(ValueError):
+    """The request body isn't a usable upload."""
+
+
+class UploadTooLarge(UploadError):
+    """The upload went over the byte limit (checked while it was still arriving)."""
+
+
+class SpooledUpload:
+    """
+    An upload body received chunk by chunk: held in memory up to `spool_bytes`,
+    then moved to a temp file. Size and SHA-256 are computed as the bytes arrive,
+    and `max_bytes` is enforced on every write.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, spool_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.spool_bytes = UPLOAD_SPOOL_BYTES if spool_bytes is None else spool_bytes
+        self.size = 0
+        self.path: Optional[str] = None
+        self.filename: Optional[str] = None
+        self._hash = hashlib.sha256()
+        self._buffer = bytearray()
+        self._data: Optional[bytes] = None
+        self._file = None
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SpooledUpload":
+        upload = cls()
+        upload.size = len(data)
+        upload._hash.update(data)
+        upload._data = data
+        return upload
+
+    def write(self, chunk: bytes) -> None:
+        if self.max_bytes is not None and self.size + len(chunk) > self.max_bytes:
+            metrics.incr("uploads.rejected.too_large")
+            raise UploadTooLarge(f"Upload is over the {self.max_bytes / 1048576:.1f} MB limit.")
+        self.size += len(chunk)
+        self._hash.update(chunk)
+
+        if self._file is None and len(self._buffer) + len(chunk) <= self.spool_bytes:
+            self._buffer += chunk
+            return
+        if self._file is None:
+            fd, self.path = tempfile.mkstemp(prefix="credguard_upload_", suffix=".pdf", dir=UPLOAD_TMP_DIR)
+            self._file = os.fdopen(fd, "wb")
+            self._file.write(self._buffer)
+            self._buffer = bytearray()
+            metrics.incr("uploads.spooled_to_disk")
+        self._file.write(chunk)
+
+    def finish(self) -> "SpooledUpload":
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        elif self._data is None:
+            self._data = bytes(self._buffer)
+            self._buffer = bytearray()
+        metrics.observe("uploads.size_kb", self.size / 1024)
+        return self
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    def source(self) -> Union[bytes, str]:
+        """The body for readers: the bytes if it stayed in memory, else the temp file's path."""
+        return self.path if self.path is not None else self._data
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+async def receive_upload(request, field: str = "file", max_bytes: Optional[int] = None,
+                         spool_bytes: Optional[int] = None) -> SpooledUpload:
+    """
+    Streams the request body into a SpooledUpload without buffering it whole.
+    Accepts multipart/form-data (the file in part `field`) or a raw body
+    (application/pdf, application/octet-stream). A declared Content-Length over
+    the limit is rejected before any of the body is read.
+    """
+    from python_multipart import MultipartParser
+    from python_multipart.multipart import parse_options_header
+
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    multipart = content_type == b"multipart/form-data"
+
+    declared = request.headers.get("content-length")
+    if max_bytes is not None and declared and declared.isdigit():
+        if int(declared) > max_bytes + (MULTIPART_OVERHEAD_BYTES if multipart else 0):
+            metrics.incr("uploads.rejected.too_large")
+            raise UploadTooLarge(f"Upload is over the {max_bytes / 1048576:.1f} MB limit.")
+
+    upload = SpooledUpload(max_bytes=max_bytes, spool_bytes=spool_bytes)
+    try:
+        if not multipart:
+            async for chunk in request.stream():
+                upload.write(chunk)
+            if not upload.size:
+                raise UploadError("Request body is empty.")
+            return upload.finish()
+
+        boundary = options.get(b"boundary")
+        if not boundary:
+            raise UploadError("Multipart body without a boundary.")
+
+        state = {"header": b"", "headers": {}, "target": False, "found": False}
+
+        def on_part_begin():
+            state["headers"] = {}
+
+        # Header names/values may arrive split across several network chunks
+        def on_header_field(data, start, end):
+            state["header"] += data[start:end].lower()
+
+        def on_header_value(data, start, end):
+            key = state["header"]
+            state["headers"][key] = state["headers"].get(key, b"") + data[start:end]
+
+        def on_header_end():
+            state["header"] = b""
+
+        def on_headers_finished():
+            _, disposition = parse_options_header(state["headers"].get(b"content-disposition", b""))
+            state["target"] = disposition.get(b"name") == field.encode() and not state["found"]
+            if state["target"]:
+                state["found"] = True
+                filename = disposition.get(b"filename")
+                upload.filename = filename.decode("utf-8", "replace") if filename else None
+
+        def on_part_data(data, start, end):
+            if state["target"]:
+                upload.write(data[start:end])
+
+        def on_part_end():
+            state["target"] = False
+
+        parser = MultipartParser(boundary, callbacks={
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        })
+        async for chunk in request.stream():
+            parser.write(chunk)
+        parser.finalize()
+
+        if not state["found"]:
+            raise UploadError(f"Multipart body has no '{field}' part.")
+        return upload.finish()
+    except UploadError:
+        upload.close()
+        raise
+    except Exception as e:
+        upload.close()
+        raise UploadError(f"Could not read upload: {e}") from e
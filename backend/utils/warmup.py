@@ -0,0 +1,91 @@
+import asyncio
+import inspect
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from .metrics import metrics
+
+PENDING = "pending"
+RUNNING = "running"
+READY = "ready"
+FAILED = "failed"
+DISABLED = "disabled"
+
+# A component that hasn't finished by then (a hung download, say) is marked failed, so /readyz can't stay "warming" forever
+WARMUP_TIMEOUT_S = float(os.getenv("WARMUP_TIMEOUT_S", "60"))
+
+
+class Warmup:
+    """
+    Named start-up tasks that prime expensive resources (clients, fonts,
+    sessions, caches) in the background. Components run concurrently; sync
+    ones in a worker thread. Each one's state and duration is kept for /readyz.
+    """
+
+    def __init__(self, timeout_s: float = WARMUP_TIMEOUT_S):
+        self.timeout_s = timeout_s
+        self._components: Dict[str, Callable[[], Any]] = {}
+        self._status: Dict[str, Dict[str, Any]] = {}
+
+    def register(self, name: str, fn: Callable[[], Any]) -> None:
+        self._components[name] = fn
+        self._status[name] = {"state": PENDING, "duration_ms": None, "error": None}
+
+    @property
+    def names(self):
+        return list(self._components)
+
+    async def _run_one(self, name: str) -> None:
+        fn = self._components[name]
+        self._status[name]["state"] = RUNNING
+        started = time.perf_counter()
+        try:
+            # A sync component that times out keeps its thread until it returns; only the wait is abandoned
+            work = fn() if inspect.iscoroutinefunction(fn) else asyncio.to_thread(fn)
+            await asyncio.wait_for(work, self.timeout_s)
+        except asyncio.TimeoutError:
+            print(f"Warm-up of '{name}' timed out after {self.timeout_s:g}s")
+            self._status[name].update(state=FAILED, error=f"timed out after {self.timeout_s:g}s")
+            metrics.incr(f"warmup.{name}.failed")
+        except Exception as e:
+            print(f"Warm-up of '{name}' failed: {e}")
+            self._status[name].update(state=FAILED, error=str(e))
+            metrics.incr(f"warmup.{name}.failed")
+        else:
+            self._status[name]["state"] = READY
+        finally:
+            duration_ms = round((time.perf_counter() - started) * 1000, 2)
+            self._status[name]["duration_ms"] = duration_ms
+            metrics.observe(f"warmup.{name}", duration_ms)
+
+    async def run(self, enabled: Optional[Iterable[str]] = None) -> None:
+        """Runs the `enabled` components (default: all); the rest are marked disabled."""
+        enabled = set(self._components if enabled is None else enabled)
+        for name in self._components:
+            if name not in enabled:
+                self._status[name]["state"] = DISABLED
+        await asyncio.gather(*(self._run_one(name) for name in self._components if name in enabled))
+
+    def disable_all(self) -> None:
+        for status in self._status.values():
+            status["state"] = DISABLED
+
+    def report(self) -> Dict[str, Any]:
+        """
+        `status` is "warming" while any component is pending or running, then
+        "ready", or "degraded" if some failed (the app still serves, using its
+        fallbacks for that resource).
+        """
+        components = {name: dict(status) for name, status in self._status.items()}
+        states = {c["state"] for c in components.values()}
+        if states & {PENDING, RUNNING}:
+            status = "warming"
+        elif FAILED in states:
+            status = "degraded"
+        else:
+            status = "ready"
+        return {"status": status, "ready": status != "warming", "components": components}
+
+
+warmup = Warmup()
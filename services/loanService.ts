@@ -6,6 +6,7 @@ export interface FinancialMentorOutput {
     advice: string[];
     recovery_plan: string;
     negotiation_script?: string; // New field
+    missing_sections?: string[]; // Sections that missed their deadline
 }
 
 export interface DebtConsolidationInput {
@@ -33,9 +34,16 @@ export interface LegalReviewOutput {
         risk_level: string;
         explanation: string;
         recommendation: string;
+        clause_number?: string | null;
+        categories?: string[];
     }[];
     overall_risk: string;
     summary: string;
+    clauses_total?: number;
+    clauses_flagged?: number;
+    chunks?: number;
+    source?: 'llm' | 'local';
+    cached?: 'raw' | 'text' | null;
 }
 
 interface FinancialProfileOutput {
@@ -73,6 +81,19 @@ interface DecisionSynthesisOutput {
     score: number;
     suggestions: Suggestion[];
     financial_tips: string[];
+    source?: string; // "llm", "rules" or "fallback"
+}
+
+interface PipelineEvaluateOutput {
+    financial_profile: FinancialProfileOutput;
+    loan_analyzer: LoanAnalyzerOutput;
+    loan_necessity: LoanNecessityOutput;
+    market_comparison: MarketComparisonOutput;
+    decision_synthesis: DecisionSynthesisOutput;
+    financial_mentor?: FinancialMentorOutput | null;
+    timings: { stage: string; started_ms: number; duration_ms: number }[];
+    total_ms: number;
+    errors: Record<string, string>;
 }
 
 import { CreditInsight } from "@/types";
@@ -84,7 +105,7 @@ export const calculateVerdict = async (
     language: string = 'en'
 ): Promise<FinalVerdict> => {
 
-    // 1. Get Financial Stability Score
+    // Request payloads (same shapes the individual /agents/* endpoints accept)
     const profileBody = {
         income: profile.monthlyIncome,
         expenses: profile.monthlyExpenses,
@@ -92,80 +113,37 @@ export const calculateVerdict = async (
         emergency_fund: profile.savings, // Assuming savings includes emergency fund
         assets: profile.assets,
         existing_emis: profile.existingEMIs,
-        dependents: profile.dependents,
-        language
+        dependents: profile.dependents
     };
 
-    // Allow error to propagate if this fails - UI should handle loading/error state
-    const financialRes = await api.post<FinancialProfileOutput>("/agents/financial-profile", profileBody);
-
-    // 2. Analyze Loan Burden
     const loanBody = {
         amount: loan.amount,
         interest_rate: loan.interestRate,
         tenure_months: loan.tenureMonths,
         lender_name: loan.lender || "Generic Lender",
         purpose: loan.purpose,
-        monthly_income: profile.monthlyIncome,
-        language
-    };
-
-    const analyzerRes = await api.post<LoanAnalyzerOutput>("/agents/loan-analyzer", loanBody);
-
-    // 3. Check Necessity
-    const necessityBody = {
-        loan_purpose: loan.purpose,
-        loan_amount: loan.amount,
-        financial_stability_score: financialRes.stability_score,
-        savings: profile.savings,
-        emergency_fund: profile.savings,
-        language
+        monthly_income: profile.monthlyIncome
     };
 
-    const necessityRes = await api.post<LoanNecessityOutput>("/agents/loan-necessity", necessityBody);
-
-    // 4. Check Market Fairness
-    const marketRes = await api.post<MarketComparisonOutput>("/agents/market-comparison", loanBody);
-
-    // 5. Final Decision Synthesis
-    // Use the actual credit band from the earlier step
-    const decisionBody = {
-        financial_stability_score: financialRes.stability_score,
+    // One round trip: the backend runs the whole agent graph (profile, analyzer,
+    // necessity, market, decision, mentor) and runs independent stages concurrently.
+    // Allow error to propagate if this fails - UI should handle loading/error state
+    const pipelineRes = await api.post<PipelineEvaluateOutput>("/pipeline/evaluate", {
+        profile: profileBody,
+        loan: loanBody,
         credit_score_band: creditInsight.band,
-        loan_burden_score: analyzerRes.burden_score,
-        loan_necessity_level: necessityRes.necessity_level,
-        market_is_fair: marketRes.is_fair,
         language,
-        // Detailed Financial Context for Personalized Suggestions
-        monthly_income: profile.monthlyIncome,
-        monthly_expenses: profile.monthlyExpenses,
-        loan_amount: loan.amount,
-        existing_emis: profile.existingEMIs,
-        desired_emi: analyzerRes.total_payable / loan.tenureMonths // Approximation
-    };
+        include_mentor: true
+    });
 
-    const finalRes = await api.post<DecisionSynthesisOutput>("/agents/decision-synthesis", decisionBody);
+    const financialRes = pipelineRes.financial_profile;
+    const analyzerRes = pipelineRes.loan_analyzer;
+    const finalRes = pipelineRes.decision_synthesis;
 
-    // 6. Get Negotiation Script (Financial Mentor)
-    const mentorBody = {
-        financial_profile: {
-            ...profileBody,
-            // Inject Loan Details for Dynamic Negotiation Script
-            lender_name: loan.lender || "the Bank",
-            loan_amount: loan.amount,
-            interest_rate: loan.interestRate
-        },
-        decision_synthesis: finalRes,
-        language
-    };
-
-    let negotiationScript = "";
-    try {
-        const mentorRes = await api.post<FinancialMentorOutput>("/agents/financial-mentor", mentorBody);
-        negotiationScript = mentorRes.negotiation_script || "";
-    } catch (e) {
-        console.warn("Failed to fetch negotiation script", e);
+    if (pipelineRes.errors?.financial_mentor) {
+        console.warn("Failed to fetch negotiation script", pipelineRes.errors.financial_mentor);
     }
+    const negotiationScript = pipelineRes.financial_mentor?.negotiation_script || "";
 
     // Map to Frontend Verdict
     let riskLevel: RiskLevel = "RISKY";
@@ -285,3 +263,70 @@ export const checkDebtConsolidation = async (input: DebtConsolidationInput): Pro
 export const analyzeContract = async (file: File): Promise<LegalReviewOutput> => {
     return await api.postFile<LegalReviewOutput>("/agents/legal-guardian", file);
 };
+
+// What-if grid (amount x tenure x rate) for the sliders: computed once, interpolated locally
+
+export interface GridRange {
+    start: number;
+    stop: number;
+    steps: number;
+}
+
+export interface SensitivityInput {
+    profile: {
+        income: number;
+        expenses: number;
+        savings: number;
+        emergency_fund?: number;
+        assets: number;
+        existing_emis: number;
+        dependents: number;
+    };
+    loan_purpose: string;
+    credit_score_band?: string;
+    credit?: {
+        missed_payments: number;
+        credit_utilization_ratio: number;
+        credit_age_years: number;
+        active_loans: number;
+        cibil_score?: number;
+    };
+    amount: GridRange;
+    tenure_months: GridRange;
+    interest_rate: GridRange;
+}
+
+export interface PackedMatrix {
+    dtype: "float32" | "uint16" | "uint8"; // little-endian
+    scale: number;
+    data: string; // base64
+}
+
+export interface SensitivityOutput {
+    axes: { amount: number[]; tenure_months: number[]; interest_rate: number[] };
+    shape: [number, number, number]; // Metrics are flat, C order: [i][j][k] at i*T*R + j*R + k
+    metrics: Record<"emi" | "burden_score" | "dti" | "score" | "verdict", PackedMatrix>;
+    verdict_labels: string[];
+    stability_score: number;
+    credit_score_band: string;
+    necessity_level: string;
+    elapsed_ms: number;
+}
+
+export const unpackMatrix = (matrix: PackedMatrix): Float64Array => {
+    const bytes = Uint8Array.from(atob(matrix.data), (c) => c.charCodeAt(0));
+    const view = new DataView(bytes.buffer);
+    const width = matrix.dtype === "float32" ? 4 : matrix.dtype === "uint16" ? 2 : 1;
+    const out = new Float64Array(bytes.length / width);
+    for (let i = 0; i < out.length; i++) {
+        const stored = matrix.dtype === "float32" ? view.getFloat32(i * 4, true)
+            : matrix.dtype === "uint16" ? view.getUint16(i * 2, true)
+            : view.getUint8(i);
+        out[i] = stored * matrix.scale;
+    }
+    return out;
+};
+
+export const getSensitivityGrid = async (input: SensitivityInput): Promise<SensitivityOutput> => {
+    return await api.post<SensitivityOutput>("/analysis/sensitivity", input);
+};